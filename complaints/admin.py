@@ -1,25 +1,124 @@
 from django.contrib import admin
-from .models import Category, Complaint, Comment, Like
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import search, stats
+from .changes import mark_changed
+from .models import BadWord, Category, Complaint, Comment, Job, Like
+
+
+# ================= ESTIMATED COUNTS =================
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that estimates the size of an unfiltered large table instead
+    of counting it: Postgres' planner statistics, or the highest id on
+    SQLite (deleted rows make that an overestimate, so the last pages may
+    come up short). Filtered lists are still counted; their filters are
+    indexed.
+    """
+    # below this many rows an exact COUNT(*) is cheap
+    exact_below = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = _estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.exact_below:
+                return estimate
+        return super().count
+
+
+def _estimated_rows(model, using):
+    if connections[using].vendor == 'postgresql':
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 until the table is first analyzed
+        return row[0] if row and row[0] >= 0 else None
+    return model.objects.using(using).aggregate(n=Max('pk'))['n'] or 0
+
+
+# ================= STATUS ACTIONS =================
+def _status_action(status, label):
+    @admin.action(description=f"Mark selected complaints as {label.lower()}")
+    def action(modeladmin, request, queryset):
+        # one UPDATE; it bypasses save() and its signals, so invalidate by hand
+        resolved_at = timezone.now() if status == 'resolved' else None
+        with transaction.atomic():
+            changing = queryset.exclude(status=status)
+            rows = list(changing.select_for_update().values_list(*stats.ROW_FIELDS))
+            updated = changing.update(
+                status=status, resolved_at=resolved_at, card_version=F('card_version') + 1,
+            )
+            stats.record(
+                added=[(created_at, category_id, status, resolved_at) for created_at, category_id, _, _ in rows],
+                removed=rows,
+            )
+        mark_changed()
+        modeladmin.message_user(request, f"{updated} complaints marked as {label.lower()}.")
+
+    action.__name__ = f'mark_{status}'
+    return action
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['id', 'name']
+    search_fields = ['name']
 
 
 @admin.register(Complaint)
 class ComplaintAdmin(admin.ModelAdmin):
     list_display = ['title', 'user', 'category', 'status', 'created_at']
+    list_select_related = ['user', 'category']
     list_filter = ['status', 'category']
+    # no COUNT(*) over the whole table per page view
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = ['user', 'category']
+    actions = [_status_action(value, label) for value, label in Complaint.STATUS_CHOICES]
+    # matched through the full-text index (search.py), see get_search_results
     search_fields = ['title', 'description', 'address']
+    search_help_text = "Words in the title, description or address; the last word may be partial."
     readonly_fields = ['latitude', 'longitude', 'address']
 
+    def get_search_results(self, request, queryset, search_term):
+        # one index lookup instead of three LIKE '%term%' scans
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_matching(queryset, search_term), False
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ['user', 'complaint', 'created_at']
+    list_select_related = ['user', 'complaint']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = ['user', 'complaint']
 
 
 @admin.register(Like)
 class LikeAdmin(admin.ModelAdmin):
-    list_display = ['user', 'complaint']
\ No newline at end of file
+    list_display = ['user', 'complaint']
+    list_select_related = ['user', 'complaint']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = ['user', 'complaint']
+
+
+@admin.register(BadWord)
+class BadWordAdmin(admin.ModelAdmin):
+    list_display = ['word', 'updated_at']
+    search_fields = ['word']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'attempts', 'run_after', 'locked_by', 'finished_at']
+    list_filter = ['status', 'task']
+    readonly_fields = ['locked_until', 'locked_by', 'last_error', 'finished_at']
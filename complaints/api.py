@@ -0,0 +1,210 @@
+"""
+Versioned JSON API (``/api/v1/``) for the mobile app.
+
+Rows are read with ``values()`` and serialized straight from the dicts,
+so a page never builds model instances. Every complaint carries the
+requesting user's like state, fetched for the whole response in one
+query (see likes.py). Writes use the session and CSRF token like the
+rest of the site.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+
+from . import categories, counters, likes, search, stats
+from .models import Complaint
+from .pagination import PAGE_SIZE, apriority_page
+
+MAX_PAGE_SIZE = 50
+MAX_BULK_IDS = 100
+
+FIELDS = (
+    'id', 'title', 'description', 'status', 'category_id', 'user__username',
+    'latitude', 'longitude', 'address', 'image', 'image_variants',
+    'created_at', 'likes_count', 'comments_count', 'priority_score', 'similar_to_id',
+)
+
+
+def _rows():
+    return Complaint.objects.values(*FIELDS)
+
+
+def _image_url(row):
+    # None until the EXIF-free renditions exist; the original is never linked
+    thumb = row['image_variants'].get('thumb')
+    return default_storage.url(thumb['jpeg']) if thumb else None
+
+
+def _serialize(row, liked, category_names):
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'description': row['description'],
+        'status': row['status'],
+        'category': category_names.get(row['category_id']),
+        'user': row['user__username'],
+        'lat': row['latitude'],
+        'lon': row['longitude'],
+        'address': row['address'],
+        'image': _image_url(row),
+        'created_at': row['created_at'].isoformat(),
+        'likes': max(0, row['likes_count'] + counters.pending(row['id'])[0]),
+        'comments': row['comments_count'],
+        'duplicate_of': row['similar_to_id'],
+        'liked': row['id'] in liked,
+    }
+
+
+async def _serialize_all(request, rows):
+    user = await request.auser()
+    liked = await likes.aliked_ids(user, [row['id'] for row in rows])
+    category_names = {c.pk: c.name for c in await categories.aget_categories()}
+    return [_serialize(row, liked, category_names) for row in rows]
+
+
+def _page_size(params):
+    try:
+        page_size = int(params.get('page_size', PAGE_SIZE))
+    except ValueError:
+        raise ValueError("page_size must be an integer") from None
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    return page_size
+
+
+def _parse_ids(values):
+    """Distinct complaint ids in the order given."""
+    try:
+        ids = list(dict.fromkeys(int(v) for v in values))
+    except (ValueError, TypeError):
+        raise ValueError("ids must be integers") from None
+    if not ids:
+        raise ValueError("No ids given")
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f"At most {MAX_BULK_IDS} ids per request")
+    return ids
+
+
+# ================= COMPLAINTS: ONE PAGE =================
+@require_GET
+async def complaints_page(request):
+    """The priority-ordered list, ``page_size`` complaints after ``cursor``."""
+    try:
+        rows, next_cursor = await apriority_page(
+            _rows(),
+            request.GET.get('cursor'),
+            _page_size(request.GET)
+        )
+    except ValueError as exc:
+        # InvalidCursor is a ValueError too
+        return JsonResponse({'error': str(exc) or 'Invalid cursor'}, status=400)
+
+    return JsonResponse({
+        'complaints': await _serialize_all(request, rows),
+        'next_cursor': next_cursor,
+    })
+
+
+# ================= COMPLAINTS: MANY BY ID =================
+@require_GET
+async def complaints_bulk(request):
+    """``?ids=1,2,3``: those complaints in the order asked for."""
+    try:
+        ids = _parse_ids(filter(None, request.GET.get('ids', '').split(',')))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    by_id = {row['id']: row async for row in _rows().filter(id__in=ids)}
+    rows = [by_id[pk] for pk in ids if pk in by_id]
+
+    return JsonResponse({
+        'complaints': await _serialize_all(request, rows),
+        'missing': [pk for pk in ids if pk not in by_id],
+    })
+
+
+# ================= SEARCH =================
+@require_GET
+async def search_complaints(request):
+    """``?q=``: complaints matching the words, best match first (see search.py)."""
+    try:
+        page_size = _page_size(request.GET)
+        offset = int(request.GET.get('offset', 0))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    if not 0 <= offset < settings.SEARCH_CANDIDATES:
+        return JsonResponse({'error': f"offset must be below {settings.SEARCH_CANDIDATES}"}, status=400)
+
+    ids = await sync_to_async(search.search)(request.GET.get('q', ''), page_size, offset)
+    by_id = {row['id']: row async for row in _rows().filter(id__in=ids)}
+    rows = [by_id[pk] for pk in ids if pk in by_id]
+
+    more = len(ids) == page_size and offset + page_size < settings.SEARCH_CANDIDATES
+    return JsonResponse({
+        'complaints': await _serialize_all(request, rows),
+        'next_offset': offset + page_size if more else None,
+    })
+
+
+# ================= DASHBOARD STATS =================
+@require_GET
+async def stats_summary(request):
+    """``?category=&since=&until=``: the dashboard counts (see stats.py)."""
+    try:
+        category_id, since, until = stats.parse_filters(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    summary = await sync_to_async(stats.summary)(category_id, since, until)
+    names = {c.pk: c.name for c in await categories.aget_categories()}
+    return JsonResponse({
+        **summary,
+        'by_category': [
+            {'category': names.get(cat), 'category_id': cat or None, **counts}
+            for cat, counts in summary['by_category'].items()
+        ],
+    })
+
+
+# ================= LIKES: TOGGLE MANY =================
+@require_POST
+async def likes_bulk(request):
+    """``{"ids": [...]}``: like each complaint not liked yet, unlike the others."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Login required'}, status=401)
+
+    try:
+        ids = json.loads(request.body)['ids']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON body like {"ids": [1, 2]}'}, status=400)
+
+    try:
+        ids = _parse_ids(ids)
+    except (ValueError, TypeError) as exc:
+        # TypeError: "ids" was not a list
+        return JsonResponse({'error': str(exc) or 'ids must be a list'}, status=400)
+
+    liked = await sync_to_async(likes.toggle_many)(user, ids)
+
+    counts = {
+        pk: count async for pk, count in
+        Complaint.objects.filter(id__in=liked).values_list('id', 'likes_count')
+    }
+
+    return JsonResponse({
+        'likes': [
+            {
+                'id': pk,
+                'liked': liked[pk],
+                'likes': max(0, counts.get(pk, 0) + counters.pending(pk)[0]),
+            }
+            for pk in ids if pk in liked
+        ],
+        'missing': [pk for pk in ids if pk not in liked],
+    })
@@ -6,22 +6,6 @@ class ComplaintsConfig(AppConfig):
     name = 'complaints'
 
     def ready(self):
-        from django.db.utils import OperationalError
-        try:
-            from .models import Category
-
-            default_categories = [
-                "Water Problem",
-                "Road Damage",
-                "Electricity Issue",
-                "Garbage Issue",
-                "Drainage Problem",
-                "Street Light Not Working",
-            ]
-
-            for cat in default_categories:
-                Category.objects.get_or_create(name=cat)
-
-        except OperationalError:
-            # database not ready during migrations
-            pass
\ No newline at end of file
+        # default categories are seeded by migration 0010_seed_categories
+        # metrics: its connection_created receiver must be in place before the first query
+        from . import metrics, signals, tasks  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Bad-word detection with a compiled Aho-Corasick automaton.
+
+All patterns are merged into one automaton, so a text is scanned once
+whatever the size of the word list. Patterns and text go through the
+same normalization: NFKC, case folding, zero-width/format characters
+removed, common Latin look-alikes and leetspeak folded, Devanagari
+nukta/chandrabindu variants unified. Runs of three or more letters are
+collapsed to two in the patterns; the text is searched with them
+collapsed to two ("killll" -> "kill") and to one ("stuuupid" ->
+"stupid"), so stretching never hides a word and its own double letters
+still count.
+
+Words come from ``settings.BAD_WORDS_FILE`` (one per line, ``#`` for
+comments) plus the ``BadWord`` table. The automaton is rebuilt when
+either changes, checked at most every BAD_WORDS_RELOAD_SECONDS, so edits
+take effect without a restart.
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+
+from django.conf import settings
+
+# zero-width space/joiners, word joiner, BOM, soft hyphen
+_INVISIBLE = dict.fromkeys(map(ord, '\u200b\u200c\u200d\u2060\ufeff\u00ad'))
+
+# separators people put between letters to dodge filters ("s.t.u.p.i.d")
+_SEPARATORS = dict.fromkeys(map(ord, '.-_*~|'))
+
+_FOLD = str.maketrans({
+    # leetspeak
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's', '!': 'i',
+    # Cyrillic / Greek look-alikes of Latin letters
+    '\u0430': 'a', '\u0435': 'e', '\u043e': 'o', '\u0440': 'p', '\u0441': 'c',
+    '\u0443': 'y', '\u0445': 'x', '\u0456': 'i',
+    '\u03bf': 'o', '\u03b1': 'a', '\u03b5': 'e', '\u03b9': 'i',
+    # Devanagari: drop nukta, chandrabindu -> anusvara
+    '\u093c': None, '\u0901': '\u0902',
+})
+
+_STRETCHED = re.compile(r'(.)\1{2,}')
+
+
+def _fold(text):
+    text = unicodedata.normalize('NFKC', text or '')
+    text = text.casefold()
+    text = text.translate(_INVISIBLE).translate(_SEPARATORS)
+    # NFD splits precomposed nukta letters (e.g. U+0958) so the nukta can be dropped
+    text = unicodedata.normalize('NFD', text).translate(_FOLD)
+    return unicodedata.normalize('NFC', text)
+
+
+def normalize(text):
+    return _STRETCHED.sub(r'\1\1', _fold(text))
+
+
+# ================= AUTOMATON =================
+class Automaton:
+    """Aho-Corasick matcher answering "does any pattern occur in the text?"."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.terminal = [False]
+        self.size = 0
+
+        for pattern in patterns:
+            pattern = normalize(pattern).strip()
+            if pattern:
+                self._insert(pattern)
+                self.size += 1
+
+        self._link()
+
+    def _insert(self, pattern):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.terminal.append(False)
+                self.goto[node][ch] = nxt
+            node = nxt
+        self.terminal[node] = True
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+
+                # a node matches if any suffix of its path is a pattern
+                self.terminal[child] = self.terminal[child] or self.terminal[self.fail[child]]
+
+    def search(self, text):
+        """True if any pattern occurs in ``text`` (already normalized)."""
+        goto, fail, terminal = self.goto, self.fail, self.terminal
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if terminal[node]:
+                return True
+        return False
+
+    def contains(self, text):
+        if not text:
+            return False
+        folded = _fold(text)
+        if self.search(_STRETCHED.sub(r'\1\1', folded)):
+            return True
+        single = _STRETCHED.sub(r'\1', folded)
+        return single != folded and self.search(single)
+
+
+# ================= WORD LIST + HOT RELOAD =================
+def _read_file(path):
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return [line.split('#', 1)[0].strip() for line in fh]
+    except FileNotFoundError:
+        return []
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _table_stamp():
+    from django.db.models import Count, Max
+    from .models import BadWord
+
+    state = BadWord.objects.aggregate(n=Count('id'), changed=Max('updated_at'))
+    return state['n'], state['changed']
+
+
+class BadWordMatcher:
+    def __init__(self):
+        self._automaton = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._checked_at = 0.0
+
+    def automaton(self):
+        now = time.monotonic()
+        if self._automaton is not None and now - self._checked_at < settings.BAD_WORDS_RELOAD_SECONDS:
+            return self._automaton
+
+        with self._lock:
+            path = str(settings.BAD_WORDS_FILE)
+            stamp = (_file_stamp(path), _table_stamp())
+            if self._automaton is None or stamp != self._stamp:
+                from .models import BadWord
+
+                words = _read_file(path)
+                words.extend(BadWord.objects.values_list('word', flat=True))
+                self._automaton = Automaton(words)
+                self._stamp = stamp
+            self._checked_at = now
+            return self._automaton
+
+    def contains(self, text):
+        if not text:
+            return False
+        return self.automaton().contains(text)
+
+
+matcher = BadWordMatcher()
@@ -0,0 +1,84 @@
+"""
+Process-local copy of the Category table.
+
+Categories are a handful of rows that almost never change, but the
+complaint form and the list/heatmap pages need them on every request.
+Each process keeps them in memory and reloads them when the category
+stamp file (CATEGORY_STAMP_FILE, touched by signals on every save/delete)
+has moved, so checking for changes costs one stat() call.
+"""
+import threading
+
+from django.conf import settings
+
+from .changes import last_changed_ns, mark_changed
+
+_lock = threading.Lock()
+_categories = None
+_by_id = {}
+_stamp = None
+
+
+def _queryset():
+    from .models import Category
+    return Category.objects.order_by('name', 'id')
+
+
+def _stale_stamp():
+    """The current stamp if the cached copy is out of date, else None."""
+    stamp = last_changed_ns(settings.CATEGORY_STAMP_FILE)
+    if _categories is None or stamp != _stamp:
+        return stamp
+    return None
+
+
+def _store(categories, stamp):
+    global _categories, _by_id, _stamp
+    with _lock:
+        _by_id = {c.pk: c for c in categories}
+        _categories = categories
+        _stamp = stamp
+
+
+def _load():
+    stamp = _stale_stamp()
+    if stamp is not None:
+        _store(list(_queryset()), stamp)
+
+
+async def _aload():
+    stamp = _stale_stamp()
+    if stamp is not None:
+        _store([c async for c in _queryset()], stamp)
+
+
+def get_categories():
+    """All categories, ordered by name."""
+    _load()
+    return _categories
+
+
+async def aget_categories():
+    """``get_categories()`` for async views."""
+    await _aload()
+    return _categories
+
+
+def get_category(pk):
+    _load()
+    return _by_id.get(pk)
+
+
+def attach(complaints):
+    """Fill ``complaint.category`` from the cache instead of a join."""
+    _load()
+    for c in complaints:
+        category = _by_id.get(c.category_id)
+        # unknown ids keep the normal lazy lookup
+        if category is not None:
+            c.category = category
+    return complaints
+
+
+def invalidate():
+    mark_changed(settings.CATEGORY_STAMP_FILE)
@@ -0,0 +1,36 @@
+"""
+"Complaints last changed at" stamp shared by every worker process.
+
+The stamp is the mtime of a small file, so reading it is one stat() call
+with no database or cache round trip, and all workers on the host see
+the same value. Signals touch it on every Complaint save/delete; code
+that bypasses signals (bulk_create, QuerySet.update) calls
+``mark_changed()`` itself. Other tables can keep their own stamp by
+passing a different ``path``.
+"""
+import os
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+
+def mark_changed(path=None):
+    path = path or settings.CHANGE_STAMP_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    now = time.time_ns()
+    with open(path, 'a'):
+        os.utime(path, ns=(now, now))
+
+
+def last_changed_ns(path=None):
+    path = path or settings.CHANGE_STAMP_FILE
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mark_changed(path)
+        return os.stat(path).st_mtime_ns
+
+
+def last_changed():
+    return datetime.fromtimestamp(last_changed_ns() / 1e9, tz=timezone.utc)
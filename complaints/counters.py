@@ -0,0 +1,151 @@
+"""
+Like / comment counters on Complaint.
+
+Every change is a single ``UPDATE ... SET likes_count = likes_count + n``
+so concurrent requests never lose increments, and only the counter
+columns (plus the derived priority_score) are written.
+
+With ``COUNTER_WRITE_BEHIND = True`` deltas are buffered in-process and
+flushed as one batched UPDATE every COUNTER_FLUSH_INTERVAL seconds or
+COUNTER_FLUSH_SIZE events, whichever comes first. Counts may then lag by
+that interval; ``manage.py reconcile_counters`` repairs any drift.
+"""
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Complaint
+
+_buffer = defaultdict(lambda: [0, 0])
+_buffer_lock = threading.Lock()
+_buffered_events = 0
+_oldest_event = None
+_timer = None
+
+
+def _clamped(field, delta):
+    return Greatest(F(field) + delta, Value(0))
+
+
+def apply_deltas(deltas):
+    """Apply ``{complaint_id: (likes_delta, comments_delta)}`` in one UPDATE."""
+    deltas = {pk: d for pk, d in deltas.items() if d[0] or d[1]}
+    if not deltas:
+        return 0
+
+    if len(deltas) == 1:
+        (pk, (likes, comments)), = deltas.items()
+        likes_delta, comments_delta = Value(likes), Value(comments)
+    else:
+        likes_delta = Case(
+            *[When(pk=pk, then=Value(d[0])) for pk, d in deltas.items()],
+            default=Value(0), output_field=IntegerField()
+        )
+        comments_delta = Case(
+            *[When(pk=pk, then=Value(d[1])) for pk, d in deltas.items()],
+            default=Value(0), output_field=IntegerField()
+        )
+
+    new_likes = _clamped('likes_count', likes_delta)
+    new_comments = _clamped('comments_count', comments_delta)
+
+    # the comment count shows in the cached card ("Show N earlier comments"), the like count does not
+    commented = [pk for pk, d in deltas.items() if d[1]]
+
+    # SET expressions all read the pre-update row, so priority is derived from the same values
+    return Complaint.objects.filter(pk__in=deltas).update(
+        likes_count=new_likes,
+        comments_count=new_comments,
+        priority_score=(
+            new_likes * Complaint.LIKE_WEIGHT +
+            new_comments * Complaint.COMMENT_WEIGHT
+        ),
+        card_version=F('card_version') + Case(
+            When(pk__in=commented, then=Value(1)),
+            default=Value(0), output_field=IntegerField()
+        ),
+    )
+
+
+def bump(complaint_id, likes=0, comments=0):
+    if not settings.COUNTER_WRITE_BEHIND:
+        apply_deltas({complaint_id: (likes, comments)})
+        return
+
+    global _buffered_events, _oldest_event
+    with _buffer_lock:
+        entry = _buffer[complaint_id]
+        entry[0] += likes
+        entry[1] += comments
+        _buffered_events += 1
+        if _oldest_event is None:
+            _oldest_event = time.monotonic()
+            _schedule_flush()
+
+        due = (
+            _buffered_events >= settings.COUNTER_FLUSH_SIZE or
+            time.monotonic() - _oldest_event >= settings.COUNTER_FLUSH_INTERVAL
+        )
+
+    if due:
+        flush()
+
+
+def bump_many(deltas):
+    """``bump`` for ``{complaint_id: (likes_delta, comments_delta)}``, one UPDATE when not buffering."""
+    if not settings.COUNTER_WRITE_BEHIND:
+        apply_deltas(deltas)
+        return
+
+    for pk, (likes, comments) in deltas.items():
+        bump(pk, likes=likes, comments=comments)
+
+
+def pending(complaint_id):
+    """Buffered, not yet written (likes, comments) deltas for one complaint."""
+    with _buffer_lock:
+        likes, comments = _buffer.get(complaint_id, (0, 0))
+    return likes, comments
+
+
+def flush():
+    global _buffered_events, _oldest_event
+    with _buffer_lock:
+        if not _buffer:
+            return 0
+        deltas = {pk: tuple(d) for pk, d in _buffer.items()}
+        _buffer.clear()
+        _buffered_events = 0
+        _oldest_event = None
+
+    updated = 0
+    items = list(deltas.items())
+    for start in range(0, len(items), settings.COUNTER_FLUSH_SIZE):
+        updated += apply_deltas(dict(items[start:start + settings.COUNTER_FLUSH_SIZE]))
+    return updated
+
+
+def _schedule_flush():
+    global _timer
+    if _timer is not None and _timer.is_alive():
+        return
+    _timer = threading.Timer(settings.COUNTER_FLUSH_INTERVAL, _flush_in_background)
+    _timer.daemon = True
+    _timer.start()
+
+
+def _flush_in_background():
+    close_old_connections()
+    try:
+        flush()
+    finally:
+        connection.close()
+
+
+atexit.register(flush)
@@ -0,0 +1,99 @@
+"""
+Complaint export for ward reports: CSV or NDJSON, streamed in chunks.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` with the
+user and category names joined in, and written out one chunk at a time,
+so memory stays flat however many complaints match. The same columns are
+read back by ``import_complaints``.
+"""
+import csv
+import io
+import json
+
+from .models import Complaint
+
+EXPORT_CHUNK = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column, values_list field); user and category by name, so files move between databases
+COLUMNS = (
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('status', 'status'),
+    ('category', 'category__name'),
+    ('user', 'user__username'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('address', 'address'),
+    ('image', 'image'),
+    ('created_at', 'created_at'),
+    ('resolved_at', 'resolved_at'),
+    ('likes_count', 'likes_count'),
+    ('comments_count', 'comments_count'),
+    ('similar_to', 'similar_to_id'),
+)
+HEADER = [name for name, _ in COLUMNS]
+_DATETIMES = [HEADER.index('created_at'), HEADER.index('resolved_at')]
+
+
+def export_rows(filters=None, chunk_size=EXPORT_CHUNK):
+    """Matching complaints as value tuples in COLUMNS order, oldest first."""
+    return Complaint.objects.filter(
+        **(filters or {})
+    ).order_by('id').values_list(
+        *(field for _, field in COLUMNS)
+    ).iterator(chunk_size=chunk_size)
+
+
+def _cells(row):
+    cells = list(row)
+    for i in _DATETIMES:
+        if cells[i] is not None:
+            cells[i] = cells[i].isoformat()
+    return cells
+
+
+def _csv_chunks(rows, chunk_size):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(HEADER)
+    for n, row in enumerate(rows, 1):
+        writer.writerow(_cells(row))
+        if n % chunk_size == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(rows, chunk_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(HEADER, _cells(row))), ensure_ascii=False))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines.clear()
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_chunks(fmt, filters=None, chunk_size=EXPORT_CHUNK):
+    """The export as text chunks of ``chunk_size`` complaints each."""
+    rows = export_rows(filters, chunk_size)
+    if fmt == 'ndjson':
+        return _ndjson_chunks(rows, chunk_size)
+    return _csv_chunks(rows, chunk_size)
+
+
+def read_rows(stream, fmt):
+    """Dicts keyed by column name from an export file, one at a time."""
+    if fmt == 'ndjson':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(stream)
@@ -0,0 +1,53 @@
+"""
+Content fingerprints of complaint descriptions.
+
+``content_hash`` identifies texts that are equal after normalization
+(case, punctuation, whitespace); ``simhash`` is a 64-bit SimHash over
+character 3-grams, so small edits flip only a few bits and near-copies
+can be found by Hamming distance.
+"""
+import hashlib
+import re
+
+SHINGLE_SIZE = 3
+SIMHASH_BITS = 64
+
+_PUNCTUATION = re.compile(r'[^\w\s]+')
+
+
+def normalize(text):
+    text = _PUNCTUATION.sub(' ', (text or '').casefold())
+    return ' '.join(text.split())
+
+
+def content_hash(text):
+    return hashlib.sha1(normalize(text).encode('utf-8')).hexdigest()
+
+
+def _to_signed(value):
+    # BigIntegerField is signed 64-bit
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def simhash(text):
+    text = normalize(text)
+    if not text:
+        return 0
+
+    grams = (
+        [text] if len(text) <= SHINGLE_SIZE
+        else [text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)]
+    )
+
+    weights = [0] * SIMHASH_BITS
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'little')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    value = sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+    return _to_signed(value)
+
+
+def hamming(a, b):
+    return ((a ^ b) & ((1 << SIMHASH_BITS) - 1)).bit_count()
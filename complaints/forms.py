@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.contrib.auth.forms import AuthenticationForm
+from django.utils.choices import CallableChoiceIterator
+from .categories import get_categories, get_category
 from .models import Complaint, Comment
 
 
@@ -38,6 +40,36 @@ class LoginForm(AuthenticationForm):
 
 
 # ================= COMPLAINT =================
+class CategoryChoiceField(forms.ModelChoiceField):
+    """Category select served from the process-local cache (see categories.py)."""
+
+    def _category_choices(self):
+        if self.empty_label is not None:
+            yield ('', self.empty_label)
+        for category in get_categories():
+            yield (category.pk, str(category))
+
+    @property
+    def choices(self):
+        # evaluated per render, not when the form class is built
+        return CallableChoiceIterator(self._category_choices)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            category = get_category(int(value))
+        except (TypeError, ValueError):
+            category = None
+        if category is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return category
+
+
 class ComplaintForm(forms.ModelForm):
     class Meta:
         model = Complaint
@@ -51,6 +83,10 @@ class ComplaintForm(forms.ModelForm):
             'address'
         ]
 
+        field_classes = {
+            'category': CategoryChoiceField,
+        }
+
         widgets = {
             'title': forms.TextInput(attrs={
                 'class': 'form-control',
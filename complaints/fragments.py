@@ -0,0 +1,61 @@
+"""
+Rendered-HTML cache for the parts of a complaint card that look the same
+to every visitor (see the ``cardcache`` template tag).
+
+Fragment keys include ``Complaint.card_version``, a counter in the
+complaint row, so bumping it makes every cached fragment of that card
+unreachable. It is read with the rest of the row, so every worker sees a
+bump as soon as it commits whatever cache backend holds the fragments;
+a process-local cache only costs hit rate. Versions are bumped by
+signals on Complaint and Comment and by the code paths that write with
+``update()`` (counter flushes, background jobs, admin actions). Likes
+are rendered outside the fragments and bump nothing.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from .models import Complaint
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.FRAGMENT_CACHE]
+
+
+def bump(*complaint_ids):
+    """Invalidate the cached fragments of these complaints, with the current transaction."""
+    # same transaction as the change, so no reader sees new data under the old version
+    Complaint.objects.filter(pk__in=complaint_ids).update(card_version=F('card_version') + 1)
+
+
+def cached(complaint, part, render):
+    """The ``part`` fragment of ``complaint``'s card, rendering it with ``render()`` on a miss."""
+    key = f'card:{complaint.pk}:{complaint.card_version}:{part}:{get_language()}'
+    cache = _cache()
+
+    html = cache.get(key)
+    with _stats_lock:
+        _stats['hits' if html is not None else 'misses'] += 1
+
+    if html is None:
+        html = render()
+        cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+
+    return mark_safe(html)
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
@@ -0,0 +1,50 @@
+"""
+Fixed-cell spatial grid used to narrow duplicate detection
+to complaints near the new one.
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+# 0.01° ≈ 1.1 km north-south, so a 1 km search touches ~3x3 cells
+GRID_CELL_DEG = 0.01
+KM_PER_DEG_LAT = 111.32
+
+
+def grid_cell(lat, lon):
+    """Return the grid key ("row:col") for a point, or "" without coordinates."""
+    if lat is None or lon is None:
+        return ""
+    row = math.floor(lat / GRID_CELL_DEG)
+    col = math.floor(lon / GRID_CELL_DEG)
+    return f"{row}:{col}"
+
+
+def cells_within(lat, lon, radius_km):
+    """Grid keys of every cell overlapping the radius' bounding box."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    dlon = radius_km / (KM_PER_DEG_LAT * cos_lat)
+
+    row_min = math.floor((lat - dlat) / GRID_CELL_DEG)
+    row_max = math.floor((lat + dlat) / GRID_CELL_DEG)
+    col_min = math.floor((lon - dlon) / GRID_CELL_DEG)
+    col_max = math.floor((lon + dlon) / GRID_CELL_DEG)
+
+    return [
+        f"{row}:{col}"
+        for row in range(row_min, row_max + 1)
+        for col in range(col_min, col_max + 1)
+    ]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+
+    a = (
+        math.sin(dphi / 2) ** 2 +
+        math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,124 @@
+"""
+Server-side heatmap aggregation.
+
+The map is divided into square tiles of ``360 / 2**zoom`` degrees (one
+256px Leaflet tile wide), each split into TILE_CELLS x TILE_CELLS cells
+of roughly the heat layer's blur radius. Complaints are counted per cell
+in SQL and every tile's cells are cached separately, so panning around
+mostly re-reads cached tiles. Cache keys carry the complaints
+last-changed stamp (see changes.py), so edits invalidate every tile.
+"""
+import math
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F
+from django.db.models.functions import Floor
+
+from .changes import last_changed_ns
+from .models import Complaint
+
+MIN_ZOOM = 3
+MAX_ZOOM = 18
+TILE_CELLS = 8
+MAX_TILES = 64
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class TooManyTiles(ValueError):
+    pass
+
+
+def tile_size(zoom):
+    return 360.0 / (2 ** zoom)
+
+
+def cell_size(zoom):
+    return tile_size(zoom) / TILE_CELLS
+
+
+def parse_bbox(value):
+    """``"south,west,north,east"`` in degrees; ValueError unless finite, in range and ordered."""
+    south, west, north, east = (float(v) for v in value.split(','))
+    if not all(map(math.isfinite, (south, west, north, east))):
+        raise ValueError("bbox must be finite")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        raise ValueError("bbox must be south,west,north,east within -90..90 and -180..180")
+    return south, west, north, east
+
+
+def tiles_for_bbox(zoom, south, west, north, east, max_tiles=MAX_TILES):
+    size = tile_size(zoom)
+    x0, x1 = int(west // size), int(east // size)
+    y0, y1 = int(south // size), int(north // size)
+
+    if max_tiles and (x1 - x0 + 1) * (y1 - y0 + 1) > max_tiles:
+        raise TooManyTiles(f"bbox covers more than {max_tiles} tiles at zoom {zoom}")
+
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def _filter_key(filters):
+    return ','.join(f'{k}={v}' for k, v in sorted(filters.items())) or 'all'
+
+
+def tile_queryset(zoom, tiles, filters):
+    """Complaint counts per heat cell over the bounding box of ``tiles``."""
+    size = tile_size(zoom)
+    cell = cell_size(zoom)
+
+    xs = [x for x, _ in tiles]
+    ys = [y for _, y in tiles]
+
+    return Complaint.objects.filter(
+        latitude__gte=min(ys) * size,
+        latitude__lt=(max(ys) + 1) * size,
+        longitude__gte=min(xs) * size,
+        longitude__lt=(max(xs) + 1) * size,
+        **filters
+    ).annotate(
+        cell_y=Floor(F('latitude') / cell),
+        cell_x=Floor(F('longitude') / cell),
+    ).values(
+        'cell_y', 'cell_x'
+    ).annotate(
+        n=Count('id'),
+        lat=Avg('latitude'),
+        lon=Avg('longitude'),
+    ).order_by()
+
+
+def aggregate_tiles(zoom, tiles, filters):
+    """``{tile: [[lat, lon, count], ...]}`` for ``tiles``, in one grouped query."""
+    result = {tile: [] for tile in tiles}
+    for row in tile_queryset(zoom, tiles, filters):
+        tile = (int(row['cell_x']) // TILE_CELLS, int(row['cell_y']) // TILE_CELLS)
+        if tile in result:
+            result[tile].append([round(row['lat'], 4), round(row['lon'], 4), row['n']])
+    return result
+
+
+def cached_tiles(zoom, tiles, filters):
+    """``{tile: cells}`` from the cache, aggregating whatever is missing."""
+    prefix = f'heatmap:{last_changed_ns()}:{zoom}:{_filter_key(filters)}'
+    keys = {tile: f'{prefix}:{tile[0]}:{tile[1]}' for tile in tiles}
+
+    cached = cache.get_many(keys.values())
+    missing = [tile for tile in tiles if keys[tile] not in cached]
+
+    if missing:
+        fresh = aggregate_tiles(zoom, missing, filters)
+        cache.set_many({keys[tile]: cells for tile, cells in fresh.items()}, CACHE_TIMEOUT)
+        cached.update({keys[tile]: cells for tile, cells in fresh.items()})
+
+    return {tile: cached[keys[tile]] for tile in tiles}
+
+
+def heat_points(zoom, bbox, filters):
+    """Weighted cell centres for every tile overlapping ``bbox``."""
+    zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+    tiles = tiles_for_bbox(zoom, *bbox)
+
+    points = []
+    for cells in cached_tiles(zoom, tiles, filters).values():
+        points.extend(cells)
+    return points
@@ -0,0 +1,184 @@
+"""
+Resized, EXIF-free derivatives of complaint photos.
+
+The uploaded original is re-encoded without any metadata first (phones
+record the GPS position and camera serial in EXIF and XMP), and it is never linked
+until its renditions exist.
+
+Each upload gets thumb/medium/large renditions in WebP and JPEG, written
+next to the media files as ``complaints/derived/<id>/<size>.<ext>``.
+Their paths and pixel sizes are stored in ``Complaint.image_variants``::
+
+    {"medium": {"width": 800, "height": 600,
+                "webp": "complaints/derived/7/medium.webp",
+                "jpeg": "complaints/derived/7/medium.jpg"}, ...}
+
+Encoding runs on a small thread pool (Pillow releases the GIL while
+resizing and encoding) so the upload request does not wait for it.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from PIL import Image, ImageOps
+
+from . import fragments
+from .models import Complaint
+
+logger = logging.getLogger(__name__)
+
+# longest edge in pixels; never upscaled
+VARIANTS = {
+    'thumb': 320,
+    'medium': 800,
+    'large': 1600,
+}
+
+FORMATS = [
+    ('webp', 'webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+# the original keeps its format; MPO is what many phones call their JPEGs
+ORIGINAL_FORMATS = {'MPO': 'JPEG'}
+ORIGINAL_OPTIONS = {
+    'JPEG': {'quality': 90},
+    'WEBP': {'quality': 90},
+}
+
+_executor = None
+
+
+def _derived_path(complaint_id, name, ext):
+    return f'complaints/derived/{complaint_id}/{name}.{ext}'
+
+
+def _load(field):
+    with field.open('rb') as fh:
+        img = Image.open(fh)
+        # apply the camera's orientation tag before the metadata is dropped
+        img = ImageOps.exif_transpose(img)
+        img.load()
+
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def strip_metadata(complaint):
+    """
+    Re-encode ``complaint.image`` from its pixels alone, which drops EXIF,
+    XMP, IPTC and comments alike, and point the row at the new file.
+    """
+    field = complaint.image
+    with field.open('rb') as fh:
+        img = Image.open(fh)
+        fmt = ORIGINAL_FORMATS.get(img.format, img.format)
+        img = ImageOps.exif_transpose(img)
+        img.load()
+
+    buf = BytesIO()
+    # as with the renditions, no exif=/xmp=/icc_profile= arguments
+    img.save(buf, fmt, **ORIGINAL_OPTIONS.get(fmt, {}))
+
+    # the new file first: if saving fails the photo is still there
+    old = field.name
+    saved = field.storage.save(old, ContentFile(buf.getvalue()))
+    Complaint.objects.filter(pk=complaint.pk).update(image=saved)
+    complaint.image = saved
+    if saved != old:
+        field.storage.delete(old)
+
+
+def build_variants(complaint):
+    """Strip the original, encode every rendition of ``complaint.image`` and record them on the row."""
+    strip_metadata(complaint)
+    original = _load(complaint.image)
+    variants = {}
+
+    for name, edge in VARIANTS.items():
+        img = original.copy()
+        img.thumbnail((edge, edge), Image.LANCZOS)
+        entry = {'width': img.width, 'height': img.height}
+
+        for key, ext, fmt, options in FORMATS:
+            buf = BytesIO()
+            # no exif= argument: the saved file carries no metadata
+            img.save(buf, fmt, **options)
+
+            path = _derived_path(complaint.pk, name, ext)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            entry[key] = default_storage.save(path, ContentFile(buf.getvalue()))
+
+        variants[name] = entry
+
+    Complaint.objects.filter(pk=complaint.pk).update(image_variants=variants)
+    fragments.bump(complaint.pk)
+    complaint.image_variants = variants
+    return variants
+
+
+def delete_variants(variants):
+    for entry in (variants or {}).values():
+        for key, *_ in FORMATS:
+            if entry.get(key):
+                default_storage.delete(entry[key])
+
+
+def process_complaint_image(complaint_id):
+    complaint = Complaint.objects.filter(pk=complaint_id).only('id', 'image').first()
+    if complaint is None or not complaint.image:
+        return None
+
+    try:
+        return build_variants(complaint)
+    except (OSError, Image.DecompressionBombError):
+        logger.exception("Could not process image of complaint %s", complaint_id)
+        return None
+
+
+def _process_in_thread(complaint_id):
+    close_old_connections()
+    try:
+        process_complaint_image(complaint_id)
+    finally:
+        connection.close()
+
+
+def _log_failure(complaint_id, future):
+    # anything process_complaint_image() did not catch would vanish with the future
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Image processing of complaint %s failed", complaint_id, exc_info=exc)
+
+
+def _submit(complaint_id):
+    future = _get_executor().submit(_process_in_thread, complaint_id)
+    future.add_done_callback(partial(_log_failure, complaint_id))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='complaint-images',
+        )
+    return _executor
+
+
+def schedule(complaint_id):
+    """Process a complaint's image after the current transaction commits."""
+    if settings.IMAGE_WORKERS:
+        transaction.on_commit(lambda: _submit(complaint_id))
+    else:
+        transaction.on_commit(lambda: process_complaint_image(complaint_id))
@@ -0,0 +1,141 @@
+"""
+A small job queue stored in the database, for work that should not hold
+up a request (no broker needed; SQLite and Postgres both work).
+
+Tasks are plain functions registered by name::
+
+    @jobs.task('detect_duplicate')
+    def detect_duplicate(complaint_id): ...
+
+    jobs.enqueue('detect_duplicate', complaint_id=7)
+
+``manage.py run_worker`` claims due jobs and runs them. A claim is a
+conditional UPDATE on the job row, so two workers can never take the same
+job, and it leases the job for JOB_VISIBILITY_TIMEOUT seconds: if the
+worker dies mid-job the lease expires and another worker retries it.
+Failed jobs are retried with exponential backoff up to ``max_attempts``;
+a job whose lease runs out on its last attempt is marked failed, so one
+that keeps killing its worker is not retried forever.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, delay=0, max_attempts=None, **payload):
+    """Queue ``task_name(**payload)``; it becomes visible once the transaction commits."""
+    return Job.objects.create(
+        task=task_name,
+        payload=payload,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def _claimable(now):
+    return (
+        Q(status='queued', run_after__lte=now) |
+        Q(status='running', locked_until__lt=now, attempts__lt=F('max_attempts'))
+    )
+
+
+def expire(now):
+    """Fail running jobs whose lease ran out on their last attempt; returns how many."""
+    return Job.objects.filter(
+        status='running', locked_until__lt=now, attempts__gte=F('max_attempts')
+    ).update(
+        status='failed',
+        locked_until=None,
+        finished_at=now,
+        last_error="Lease expired on the last attempt (worker died or timed out)",
+    )
+
+
+def claim(worker_id, limit=10):
+    """Lease up to ``limit`` due jobs for ``worker_id`` and return them."""
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT)
+
+    expired = expire(now)
+    if expired:
+        logger.warning("%s job(s) failed: lease expired on the last attempt", expired)
+
+    candidates = Job.objects.filter(
+        _claimable(now)
+    ).order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+
+    claimed = []
+    for job_id in list(candidates):
+        # only one worker's UPDATE can match while the row is still claimable
+        won = Job.objects.filter(_claimable(now), id=job_id).update(
+            status='running',
+            locked_until=lease,
+            locked_by=worker_id,
+            attempts=F('attempts') + 1,
+        )
+        if won:
+            claimed.append(job_id)
+
+    return list(Job.objects.filter(id__in=claimed).order_by('run_after', 'id'))
+
+
+def run(job):
+    """Run one claimed job and record the outcome. Returns True on success."""
+    func = TASKS.get(job.task)
+
+    try:
+        if func is None:
+            raise LookupError(f"unknown task {job.task!r}")
+        # no wrapping transaction: on SQLite a read that later writes cannot wait for the lock
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s failed (attempt %s/%s)", job, job.attempts, job.max_attempts)
+
+        if job.attempts >= job.max_attempts:
+            _finish(job, 'failed', last_error=error)
+        else:
+            backoff = settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            _finish(
+                job, 'queued',
+                last_error=error,
+                run_after=timezone.now() + timedelta(seconds=backoff),
+                finished_at=None,
+            )
+        return False
+
+    _finish(job, 'done', last_error='')
+    return True
+
+
+def _finish(job, status, **fields):
+    fields.setdefault('finished_at', timezone.now())
+    # a job whose lease expired may have been re-claimed; leave that worker's run alone
+    Job.objects.filter(id=job.id, locked_by=job.locked_by, status='running').update(
+        status=status,
+        locked_until=None,
+        **fields
+    )
+
+
+def purge(older_than):
+    """Delete finished jobs that ended before ``older_than``."""
+    deleted, _ = Job.objects.filter(status='done', finished_at__lt=older_than).delete()
+    return deleted
@@ -0,0 +1,67 @@
+"""
+Per-user like state, looked up and changed for many complaints at once.
+
+``liked_ids`` answers "which of these complaints has this user liked?"
+with one query for the whole page, so the like buttons of a list never
+cost a query per card. ``toggle_many`` flips a user's likes on a batch
+of complaints with a few queries (lock, reads, one DELETE, one INSERT,
+one counter UPDATE), however many ids are sent; the like button's single
+toggle goes through it too.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import counters
+from .models import Complaint, Like
+
+
+def _liked(user, complaint_ids):
+    return Like.objects.filter(
+        user=user,
+        complaint_id__in=complaint_ids
+    ).values_list('complaint_id', flat=True)
+
+
+def liked_ids(user, complaint_ids):
+    """The subset of ``complaint_ids`` that ``user`` has liked."""
+    if not user.is_authenticated or not complaint_ids:
+        return set()
+    return set(_liked(user, complaint_ids))
+
+
+async def aliked_ids(user, complaint_ids):
+    """``liked_ids`` for async views."""
+    if not user.is_authenticated or not complaint_ids:
+        return set()
+    return {pk async for pk in _liked(user, complaint_ids)}
+
+
+def toggle_many(user, complaint_ids):
+    """
+    Like the complaints ``user`` has not liked yet and unlike the rest.
+    Ids of missing complaints are ignored. Returns ``{complaint_id: liked}``
+    for the complaints that exist.
+    """
+    with transaction.atomic():
+        # serializes one user's toggles, so a double submit cannot count a like twice
+        list(User.objects.select_for_update().filter(pk=user.pk).values_list('pk'))
+
+        existing = set(
+            Complaint.objects.filter(id__in=complaint_ids).values_list('id', flat=True)
+        )
+        liked = set(_liked(user, existing))
+
+        if liked:
+            Like.objects.filter(user=user, complaint_id__in=liked).delete()
+        Like.objects.bulk_create(
+            [Like(user=user, complaint_id=pk) for pk in existing - liked],
+            ignore_conflicts=True
+        )
+        # ignore_conflicts skips rows that were there already; count only the new ones
+        inserted = set(_liked(user, existing - liked))
+
+    counters.bump_many({
+        **{pk: (1, 0) for pk in inserted},
+        **{pk: (-1, 0) for pk in liked},
+    })
+    return {pk: pk not in liked for pk in existing}
@@ -0,0 +1,63 @@
+"""
+Synthetic Dhule-area complaint text shared by the benchmark commands.
+(Leading underscore: Django does not treat this module as a command.)
+"""
+
+DHULE_LAT = 20.9042
+DHULE_LON = 74.7749
+
+PROBLEMS = [
+    "water pipeline leaking",
+    "no water supply since morning",
+    "big pothole on the road",
+    "road damaged after rain",
+    "street light not working",
+    "garbage not collected",
+    "drainage overflowing",
+    "electricity cut for hours",
+    "पाणीपुरवठा बंद आहे",
+    "रस्त्यावर मोठा खड्डा आहे",
+    "कचरा उचलला जात नाही",
+    "गटार तुंबले आहे",
+]
+
+PLACES = [
+    "near bus stand", "behind market", "opposite school", "near temple",
+    "at main square", "near hospital", "in colony lane", "near railway gate",
+    "Deopur", "Sakri road", "Agra road", "Shivaji nagar", "Mohadi", "Chalisgaon road",
+]
+
+DETAILS = [
+    "since two days", "for a week", "please repair quickly", "causing accidents",
+    "bad smell everywhere", "children are at risk", "reported earlier also",
+    "कृपया लवकर दुरुस्ती करा", "नागरिकांना त्रास होत आहे", "",
+]
+
+FILLERS = ["please", "very", "urgent", "sir", "the", "area", "again"]
+
+
+def random_description(rng):
+    return " ".join(filter(None, [
+        rng.choice(PROBLEMS),
+        rng.choice(PLACES),
+        f"ward {rng.randint(1, 40)}",
+        rng.choice(DETAILS),
+    ]))
+
+
+def perturb(rng, text, max_edits=4):
+    """A near-duplicate of ``text``: dropped letters, extra or removed words, swaps."""
+    words = text.split()
+    for _ in range(rng.randint(0, max_edits)):
+        i = rng.randrange(len(words))
+        op = rng.random()
+        if op < 0.3 and len(words[i]) > 2:
+            words[i] = words[i][:-1]
+        elif op < 0.6:
+            words.insert(i, rng.choice(FILLERS))
+        elif op < 0.8 and len(words) > 3:
+            del words[i]
+        else:
+            j = rng.randrange(len(words))
+            words[i], words[j] = words[j], words[i]
+    return " ".join(words)
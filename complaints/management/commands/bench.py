@@ -0,0 +1,262 @@
+import json
+import platform
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from complaints import categories, ratelimit
+from complaints.models import BadWord, Complaint
+from complaints.pagination import encode_cursor, priority_page
+
+from ._synthetic import DHULE_LAT, DHULE_LON, random_description
+from .seed_bench import SEED_PREFIX
+
+# a cache of its own: rate-limit counters and cards from earlier runs must not leak in
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+USER_POOL = 200
+DHULE_BBOX = '20.85,74.70,20.95,74.85'
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main views and every spam-guard path through the test client "
+        "against data from seed_bench. Reports p50/p95 latency and queries per "
+        "request and compares them with a baseline JSON: more queries than the "
+        "baseline, or a p95 beyond --tolerance, fails the command. Writes happen "
+        "inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='+', metavar='SCENARIO', help="Run only these scenarios.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--baseline', default=str(settings.BASE_DIR / 'bench_baseline.json'),
+            help="Baseline to compare with (default: bench_baseline.json).",
+        )
+        parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help="Allowed p95 slowdown over the baseline, as a fraction.",
+        )
+        parser.add_argument(
+            '--min-slack', type=float, default=2.0,
+            help="Milliseconds of p95 slowdown always allowed (timer noise on fast requests).",
+        )
+
+    def handle(self, *args, **opts):
+        users = list(User.objects.filter(username__startswith=SEED_PREFIX).order_by('id')[:USER_POOL])
+        if len(users) < 10:
+            raise CommandError("No seed data found: run manage.py seed_bench first.")
+
+        # one accepted post per user, so none reaches the rate limit or the cooldown
+        if opts['iterations'] + opts['warmup'] > len(users) - 2:
+            raise CommandError(f"--iterations is too high for {len(users)} seeded users")
+
+        self.rng = random.Random(opts['seed'])
+        self.users = users
+        self.clients = {}
+
+        with override_settings(CACHES=BENCH_CACHES):
+            try:
+                with transaction.atomic():
+                    results = self._run(opts)
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        self._report(results)
+
+        meta = self._meta()
+        if opts['save_baseline']:
+            with open(opts['baseline'], 'w') as f:
+                json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {opts['baseline']}"))
+            return
+
+        try:
+            with open(opts['baseline']) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            self.stdout.write(f"No baseline at {opts['baseline']}; run with --save-baseline to create one.")
+            return
+
+        self._compare(baseline, meta, results, opts)
+
+    # ================= SCENARIOS =================
+    def _client(self, user=None):
+        if user is None:
+            return self.clients.setdefault(None, Client())
+        if user.pk not in self.clients:
+            client = Client()
+            client.force_login(user)
+            self.clients[user.pk] = client
+        return self.clients[user.pk]
+
+    def _user(self, i):
+        return self.users[i % len(self.users)]
+
+    def _complaint_data(self, description):
+        return {
+            'title': description.split(' ward ')[0][:200],
+            'description': description,
+            'category': categories.get_categories()[0].pk,
+            'latitude': DHULE_LAT + self.rng.gauss(0, 0.02),
+            'longitude': DHULE_LON + self.rng.gauss(0, 0.02),
+            'address': 'Dhule',
+        }
+
+    def _scenarios(self):
+        """``{name: (user(i), request(client, i), expected status, expected redirect)}``."""
+        complaint_ids = list(Complaint.objects.order_by('-id').values_list('id', flat=True)[:1000])
+        first_page, _ = priority_page(Complaint.objects.all())
+        cursor = encode_cursor(first_page[-1])
+
+        list_url = reverse('complaint_list')
+        post_url = reverse('post_complaint')
+        # rolled back with everything else; the matcher reloads on the signal
+        bad_word = BadWord.objects.create(word='benchbadword').word
+
+        # already at the complaint limit
+        limited = self._user(-1)
+        for _ in range(settings.RATE_LIMITS['complaint']['limit']):
+            ratelimit.hit('complaint', limited.pk)
+
+        # posted a moment ago, so posting it again hits the cooldown
+        repeater, repeated = self._user(-2), random_description(self.rng)
+        Complaint.objects.create(user=repeater, title="repeat", description=repeated)
+
+        def complaint_id():
+            return self.rng.choice(complaint_ids)
+
+        def anonymous(i):
+            return None
+
+        return {
+            'complaint_list': (
+                self._user, lambda c, i: c.get(list_url), 200, None),
+            'complaint_list_more': (
+                self._user, lambda c, i: c.get(reverse('complaint_list_more'), {'cursor': cursor}), 200, None),
+            'heatmap_view': (
+                anonymous, lambda c, i: c.get(reverse('heatmap')), 200, None),
+            'heatmap_tiles': (
+                anonymous, lambda c, i: c.get(reverse('heatmap_tiles'), {'zoom': 13, 'bbox': DHULE_BBOX}),
+                200, None),
+            # accepted: runs every spam check and find_similar_complaint, then saves
+            'post_complaint': (
+                self._user, lambda c, i: c.post(post_url, self._complaint_data(random_description(self.rng))),
+                302, list_url),
+            'post_complaint:rate_limited': (
+                lambda i: limited,
+                lambda c, i: c.post(post_url, self._complaint_data(random_description(self.rng))),
+                302, post_url),
+            'post_complaint:bad_words': (
+                self._user,
+                lambda c, i: c.post(post_url, self._complaint_data(f"{random_description(self.rng)} {bad_word}")),
+                302, post_url),
+            'post_complaint:duplicate_cooldown': (
+                lambda i: repeater, lambda c, i: c.post(post_url, self._complaint_data(repeated)),
+                302, post_url),
+            'toggle_like': (
+                self._user, lambda c, i: c.post(reverse('toggle_like', args=[complaint_id()])), 200, None),
+            'add_comment': (
+                self._user,
+                lambda c, i: c.post(reverse('add_comment', args=[complaint_id()]), {'text': "Same problem here, please fix"}),
+                302, list_url),
+        }
+
+    def _run(self, opts):
+        scenarios = self._scenarios()
+        if opts['only']:
+            unknown = set(opts['only']) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = {name: s for name, s in scenarios.items() if name in opts['only']}
+
+        results = {}
+        for name, (user, request, status, location) in scenarios.items():
+            timings, queries = [], []
+            for i in range(opts['warmup'] + opts['iterations']):
+                # logging in is not part of the request being measured
+                client = self._client(user(i))
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = request(client, i)
+                    elapsed = time.perf_counter() - start
+
+                if response.status_code != status or (location and response.url != location):
+                    raise CommandError(
+                        f"{name}: got {response.status_code} {getattr(response, 'url', '')}, "
+                        f"expected {status} {location or ''}"
+                    )
+                if i >= opts['warmup']:
+                    timings.append(elapsed * 1000)
+                    queries.append(len(ctx.captured_queries))
+
+            timings.sort()
+            results[name] = {
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(timings[max(0, int(len(timings) * 0.95) - 1)], 2),
+                'queries': max(queries),
+            }
+        return results
+
+    # ================= REPORT / BASELINE =================
+    def _meta(self):
+        return {
+            'complaints': Complaint.objects.count(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        }
+
+    def _report(self, results):
+        self.stdout.write(f"{'scenario':<36} {'p50':>9} {'p95':>9} {'queries':>8}")
+        for name, r in results.items():
+            self.stdout.write(f"{name:<36} {r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms {r['queries']:>8}")
+
+    def _compare(self, baseline, meta, results, opts):
+        old_meta = baseline.get('meta', {})
+        if old_meta.get('complaints') != meta['complaints'] or old_meta.get('database') != meta['database']:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was taken on {old_meta.get('complaints')} complaints ({old_meta.get('database')}), "
+                f"this run has {meta['complaints']} ({meta['database']}); timings may not compare."
+            ))
+
+        regressions = []
+        for name, r in results.items():
+            old = baseline['results'].get(name)
+            if old is None:
+                continue
+            allowed = max(old['p95_ms'] * (1 + opts['tolerance']), old['p95_ms'] + opts['min_slack'])
+            if r['queries'] > old['queries']:
+                regressions.append(f"{name}: {r['queries']} queries, baseline {old['queries']}")
+            if r['p95_ms'] > allowed:
+                regressions.append(f"{name}: p95 {r['p95_ms']:.1f}ms, baseline {old['p95_ms']:.1f}ms")
+
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f"REGRESSION  {line}"))
+            raise CommandError(f"{len(regressions)} regressions against {opts['baseline']}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {opts['baseline']}"))
@@ -0,0 +1,65 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaints.badwords import Automaton, normalize
+
+from ._synthetic import random_description
+
+
+def substring_scan(words, text):
+    """The previous check: every word tested as a substring of the text."""
+    text_lower = text.lower()
+    return any(word in text_lower for word in words)
+
+
+class Command(BaseCommand):
+    help = "Compare the Aho-Corasick bad-word matcher with the old per-word substring scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=10000)
+        parser.add_argument('--texts', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=11)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+
+        # random "words" that will not occur in the texts, so every scan runs to the end
+        words = {
+            ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10))) + 'q'
+            for _ in range(opts['words'])
+        }
+        words = sorted(words)
+
+        texts = [
+            ' '.join(random_description(rng) for _ in range(rng.randint(1, 6)))
+            for _ in range(opts['texts'])
+        ]
+        total_chars = sum(map(len, texts))
+
+        start = time.perf_counter()
+        automaton = Automaton(words)
+        compile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts:
+            substring_scan(words, text)
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts:
+            automaton.search(normalize(text))
+        ac_time = time.perf_counter() - start
+
+        n = len(texts)
+        self.stdout.write(f"{len(words)} words, {n} texts, {total_chars / n:.0f} chars/text on average")
+        self.stdout.write(f"compile:          {compile_time * 1000:8.1f}ms ({len(automaton.goto)} states)")
+        self.stdout.write(
+            f"substring scan:   {scan_time / n * 1e6:8.1f}µs/text  {total_chars / scan_time / 1e6:6.2f} Mchars/s"
+        )
+        self.stdout.write(
+            f"aho-corasick:     {ac_time / n * 1e6:8.1f}µs/text  {total_chars / ac_time / 1e6:6.2f} Mchars/s"
+            f"  (incl. normalization)"
+        )
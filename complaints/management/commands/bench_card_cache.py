@@ -0,0 +1,108 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from complaints import fragments
+from complaints.models import Comment, Complaint
+from complaints.utils import bulk_create_complaints
+from complaints.views import _prepare_cards, complaint_cards_queryset
+
+from ._synthetic import DHULE_LAT, DHULE_LON, random_description
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering complaint cards with a cold and a warm fragment cache. "
+        "Rows are inserted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=4, help="Comments per complaint.")
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='__bench_card_cache__')
+                self._populate(user, rng, opts['cards'], opts['comments'])
+                self._report(user, opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _populate(self, user, rng, cards, comments):
+        complaints = bulk_create_complaints([
+            Complaint(
+                user=user,
+                title=f"Complaint {i}",
+                description=random_description(rng),
+                latitude=DHULE_LAT + rng.uniform(-0.05, 0.05),
+                longitude=DHULE_LON + rng.uniform(-0.05, 0.05),
+                address="Dhule",
+                comments_count=comments,
+            )
+            for i in range(cards)
+        ])
+
+        Comment.objects.bulk_create(
+            [
+                Comment(complaint=c, user=user, text=random_description(rng))
+                for c in complaints
+                for _ in range(comments)
+            ],
+            batch_size=2000,
+        )
+
+    def _render(self, request, complaints):
+        start = time.perf_counter()
+        render_to_string('complaint_cards.html', {'complaints': complaints}, request=request)
+        return time.perf_counter() - start
+
+    def _report(self, user, opts):
+        # a signed-in visitor: comment forms are rendered, delete buttons are not
+        request = RequestFactory().get('/complaints/')
+        request.user = User.objects.create(username='__bench_card_viewer__')
+
+        start = time.perf_counter()
+        complaints = list(complaint_cards_queryset().filter(user=user).order_by('-id'))
+        _prepare_cards(complaints)
+        query_time = time.perf_counter() - start
+
+        cold, warm = [], []
+        fragments.reset_stats()
+
+        for _ in range(opts['rounds']):
+            # fresh versions: every fragment key is new, as after each card changed
+            for c in complaints:
+                c.card_version += 1
+            cold.append(self._render(request, complaints))
+
+            for _ in range(opts['rounds']):
+                warm.append(self._render(request, complaints))
+
+        n = len(complaints)
+        stats = fragments.stats()
+        self.stdout.write(f"{n} cards, {opts['comments']} comments each; fetching them took {query_time * 1000:.0f}ms")
+        self.stdout.write(
+            f"cold cache: {statistics.median(cold) * 1000:8.1f}ms/page  "
+            f"{statistics.median(cold) / n * 1e6:7.1f}µs/card"
+        )
+        self.stdout.write(
+            f"warm cache: {statistics.median(warm) * 1000:8.1f}ms/page  "
+            f"{statistics.median(warm) / n * 1e6:7.1f}µs/card"
+        )
+        self.stdout.write(f"fragment cache: {stats['hits']} hits, {stats['misses']} misses")
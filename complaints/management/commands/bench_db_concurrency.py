@@ -0,0 +1,137 @@
+import multiprocessing
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from complaints import counters
+from complaints.models import Comment, Complaint, Like
+from complaints.pagination import priority_page
+from complaints.utils import bulk_create_complaints
+from complaints.views import complaint_cards_queryset
+
+from ._synthetic import DHULE_LAT, DHULE_LON, random_description
+
+BENCH_PREFIX = '__bench_db__'
+
+
+def _read(rng, user, complaint_ids):
+    # first page of the complaint list
+    list(priority_page(complaint_cards_queryset())[0])
+
+
+def _like(rng, user, complaint_ids):
+    complaint_id = rng.choice(complaint_ids)
+    with transaction.atomic():
+        removed, _ = Like.objects.filter(user=user, complaint_id=complaint_id).delete()
+        if not removed:
+            Like.objects.create(user=user, complaint_id=complaint_id)
+        counters.apply_deltas({complaint_id: (-1 if removed else 1, 0)})
+
+
+def _comment(rng, user, complaint_ids):
+    complaint_id = rng.choice(complaint_ids)
+    with transaction.atomic():
+        Comment.objects.create(complaint_id=complaint_id, user=user, text=random_description(rng))
+        counters.apply_deltas({complaint_id: (0, 1)})
+
+
+# roughly the page-view / like / comment mix of the live site
+WORKLOAD = [(_read, 0.8), (_like, 0.15), (_comment, 0.05)]
+
+
+def _worker(n, seconds, complaint_ids, results):
+    # forked children must open their own connections
+    connections.close_all()
+    rng = random.Random(n)
+    user = User.objects.get(username=f'{BENCH_PREFIX}{n}')
+    ops, weights = zip(*WORKLOAD)
+
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        start = time.perf_counter()
+        try:
+            op(rng, user, complaint_ids)
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append((op.__name__, time.perf_counter() - start))
+
+    connection.close()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer the configured database from several processes with a mixed "
+        "read/like/comment workload and report throughput, latency and lock errors. "
+        "Compare SQLite profiles by running it twice on fresh files, e.g. "
+        "SQLITE_TUNING=False SQLITE_PATH=/tmp/plain.sqlite3 (WAL mode persists in a file)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--complaints', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=3)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+        settings_dict = connection.settings_dict
+        self.stdout.write(
+            f"{connection.vendor} {settings_dict['NAME']}  options={settings_dict.get('OPTIONS') or {}}"
+        )
+
+        users = [User.objects.create(username=f'{BENCH_PREFIX}{n}') for n in range(opts['workers'])]
+        try:
+            complaint_ids = [c.id for c in bulk_create_complaints([
+                Complaint(
+                    user=rng.choice(users),
+                    title="bench",
+                    description=random_description(rng),
+                    latitude=DHULE_LAT + rng.uniform(-0.05, 0.05),
+                    longitude=DHULE_LON + rng.uniform(-0.05, 0.05),
+                )
+                for _ in range(opts['complaints'])
+            ])]
+            self._run(complaint_ids, opts)
+        finally:
+            # cascades to the complaints, likes and comments
+            User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+
+    def _run(self, complaint_ids, opts):
+        connections.close_all()
+        ctx = multiprocessing.get_context('fork')
+        results = ctx.Queue()
+
+        procs = [
+            ctx.Process(target=_worker, args=(n, opts['seconds'], complaint_ids, results))
+            for n in range(opts['workers'])
+        ]
+        for proc in procs:
+            proc.start()
+        collected = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+        latencies = [item for worker, _ in collected for item in worker]
+        errors = sum(e for _, e in collected)
+
+        self.stdout.write(
+            f"{opts['workers']} processes, {opts['seconds']:.0f}s: "
+            f"{len(latencies) / opts['seconds']:.0f} ops/s, {errors} 'database is locked' errors"
+        )
+        for op, _ in WORKLOAD:
+            timings = sorted(t for name, t in latencies if name == op.__name__)
+            if not timings:
+                continue
+            p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+            self.stdout.write(
+                f"  {op.__name__[1:]:<8} {len(timings):>7} ops  "
+                f"p50={statistics.median(timings) * 1000:7.2f}ms  p95={p95 * 1000:7.2f}ms"
+            )
@@ -0,0 +1,86 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from complaints import ratelimit
+from complaints.models import Comment, Complaint
+
+
+class _Rollback(Exception):
+    pass
+
+
+def count_query_limited(user, limit=10):
+    """The previous check: COUNT(*) over the user's comments in the last hour."""
+    one_hour_ago = timezone.now() - timedelta(hours=1)
+    return Comment.objects.filter(user=user, created_at__gte=one_hour_ago).count() >= limit
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the cache-backed comment rate limit with the old COUNT(*) query. "
+        "Synthetic rows are inserted inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--checks', type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                self._run(opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, opts):
+        rng = random.Random(3)
+
+        users = User.objects.bulk_create([
+            User(username=f'__bench_rl_{i}') for i in range(opts['users'])
+        ])
+        owner = users[0]
+        complaint = Complaint.objects.create(user=owner, title="bench", description="bench")
+
+        Comment.objects.bulk_create(
+            [
+                Comment(complaint=complaint, user=rng.choice(users), text="bench")
+                for _ in range(opts['comments'])
+            ],
+            batch_size=5000,
+        )
+
+        limiter = ratelimit.get_limiter('comment')
+        for _ in range(limiter.limit):
+            limiter.hit(owner.pk)
+
+        checks = opts['checks']
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for _ in range(checks):
+                count_query_limited(owner, limiter.limit)
+            count_time = time.perf_counter() - start
+        count_queries = len(ctx.captured_queries) / checks
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for _ in range(checks):
+                rejected = limiter.is_limited(owner.pk)
+            cache_time = time.perf_counter() - start
+        cache_queries = len(ctx.captured_queries) / checks
+
+        self.stdout.write(f"{opts['comments']} comments from {opts['users']} users, {checks} checks each")
+        self.stdout.write(f"COUNT(*) query:  {count_time / checks * 1e6:8.1f}µs/check  {count_queries:.0f} queries/check")
+        self.stdout.write(
+            f"{limiter.__class__.__name__}: {cache_time / checks * 1e6:8.1f}µs/check  "
+            f"{cache_queries:.0f} queries/check  (rejected={rejected})"
+        )
@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from complaints import search
+from complaints.models import Complaint
+
+from ._synthetic import DHULE_LAT, DHULE_LON, random_description
+
+BATCH = 5000
+
+# common words match a large share of the synthetic rows, the rest narrow it down
+QUERIES = [
+    'pothole', 'water', 'garbage not', 'street light', 'खड्डा',
+    'pothole deopur', 'drainage hospital ward 17', 'electricity mohadi', 'sakri road water supp',
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ranked full-text search against the LIKE '%term%' scan the admin used "
+        "to run. Rows are inserted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=11)
+        parser.add_argument(
+            '--skip-like', action='store_true',
+            help="Do not time the LIKE scan (slow on large tables).",
+        )
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='__bench_search__')
+                start = time.perf_counter()
+                self._populate(user, rng, opts['rows'])
+                self.stdout.write(
+                    f"{opts['rows']} complaints inserted and indexed in {time.perf_counter() - start:.1f}s"
+                )
+                self._report(opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _populate(self, user, rng, rows):
+        # plain bulk_create: the search index is kept by triggers, no model save() needed
+        for start in range(0, rows, BATCH):
+            batch = []
+            for _ in range(min(BATCH, rows - start)):
+                description = random_description(rng)
+                likes = int(rng.expovariate(0.2))
+                batch.append(Complaint(
+                    user=user,
+                    title=description.split(' ward ')[0][:200],
+                    description=description,
+                    latitude=DHULE_LAT + rng.uniform(-0.05, 0.05),
+                    longitude=DHULE_LON + rng.uniform(-0.05, 0.05),
+                    likes_count=likes,
+                    priority_score=likes * Complaint.LIKE_WEIGHT,
+                ))
+            Complaint.objects.bulk_create(batch)
+
+    def _time(self, fn, rounds):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def _like_scan(self, query):
+        condition = Q()
+        for word in query.split():
+            condition &= Q(title__icontains=word) | Q(description__icontains=word) | Q(address__icontains=word)
+        return list(Complaint.objects.filter(condition).order_by('-priority_score', '-id').values_list('id', flat=True)[:20])
+
+    def _report(self, opts):
+        self.stdout.write(f"{'query':<28} {'matches':>8} {'ranked top 20':>14} {'LIKE scan':>10}")
+        for query in QUERIES:
+            matches = search.filter_matching(Complaint.objects.all(), query).count()
+            ranked = self._time(lambda: search.search(query, 20), opts['rounds'])
+            like = '-' if opts['skip_like'] else f"{self._time(lambda: self._like_scan(query), 1):8.1f}ms"
+            self.stdout.write(f"{query:<28} {matches:>8} {ranked:12.1f}ms {like:>10}")
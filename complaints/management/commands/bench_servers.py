@@ -0,0 +1,188 @@
+import asyncio
+import os
+import random
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from complaints.models import Complaint
+from complaints.utils import bulk_create_complaints
+
+from ._synthetic import DHULE_LAT, DHULE_LON, random_description
+
+BENCH_USER = '__bench_servers__'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def _request(port, method, path, headers, trickle=0):
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = [f'{method} {path} HTTP/1.1', 'Host: localhost', 'Connection: close', 'Content-Length: 0']
+    head += [f'{k}: {v}' for k, v in headers.items()]
+
+    if trickle:
+        # a phone on a bad network: the request arrives a line at a time
+        for line in head:
+            writer.write((line + '\r\n').encode())
+            await writer.drain()
+            await asyncio.sleep(trickle / len(head))
+        writer.write(b'\r\n')
+    else:
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode())
+    await writer.drain()
+
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    status = int(status_line.split()[1]) if status_line else 0
+    return status, time.perf_counter() - start
+
+
+async def _load(port, requests, concurrency, seconds, slow_clients, trickle):
+    latencies, failures = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(n):
+        nonlocal failures
+        rng = random.Random(n)
+        weights = [r[0] for r in requests]
+        delay = trickle if n < slow_clients else 0
+        while time.perf_counter() < deadline:
+            _, method, path, headers = rng.choices(requests, weights)[0]
+            try:
+                status, elapsed = await _request(port, method, path, headers, delay)
+            except OSError:
+                failures += 1
+                continue
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                failures += 1
+
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return latencies, failures
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn with the wsgi and then the asgi profile (config/gunicorn.conf.py) "
+        "and drive both with the same concurrent load on the load-more list, heatmap "
+        "page and like toggle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--workers', type=int, default=1, help="gunicorn workers per profile.")
+        parser.add_argument('--complaints', type=int, default=200)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help="How many of the clients send their requests slowly.",
+        )
+        parser.add_argument(
+            '--trickle', type=float, default=1.0,
+            help="Seconds a slow client takes to send one request.",
+        )
+
+    def handle(self, *args, **opts):
+        rng = random.Random(5)
+        user = User.objects.create(username=BENCH_USER)
+        try:
+            complaints = bulk_create_complaints([
+                Complaint(
+                    user=user,
+                    title="bench",
+                    description=random_description(rng),
+                    latitude=DHULE_LAT + rng.uniform(-0.05, 0.05),
+                    longitude=DHULE_LON + rng.uniform(-0.05, 0.05),
+                )
+                for _ in range(opts['complaints'])
+            ])
+            requests = self._requests(user, complaints)
+
+            for profile in ('wsgi', 'asgi'):
+                self._bench(profile, requests, opts)
+        finally:
+            User.objects.filter(username=BENCH_USER).delete()
+
+    def _requests(self, user, complaints):
+        client = Client()
+        client.force_login(user)
+        csrf = secrets.token_hex(16)
+        cookies = f"sessionid={client.cookies[settings.SESSION_COOKIE_NAME].value}; csrftoken={csrf}"
+
+        signed_in = {'Cookie': cookies}
+        like = {'Cookie': cookies, 'X-CSRFToken': csrf}
+
+        # (weight, method, path, headers): mostly reads, some likes
+        return [
+            (4, 'GET', '/complaints/more/', signed_in),
+            (3, 'GET', '/complaints/more/', {}),
+            (1, 'GET', '/heatmap/', {}),
+        ] + [
+            (2 / 20, 'POST', f'/like/{c.id}/', like)
+            for c in complaints[:20]
+        ]
+
+    def _bench(self, profile, requests, opts):
+        port = _free_port()
+        env = {**os.environ, 'SERVER_PROFILE': profile, 'PYTHONWARNINGS': 'ignore'}
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '-c', str(settings.BASE_DIR / 'config' / 'gunicorn.conf.py'),
+                '--bind', f'127.0.0.1:{port}',
+                '--workers', str(opts['workers']),
+                '--access-logfile', '/dev/null',
+                '--error-logfile', '/dev/null',
+            ],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        try:
+            self._wait_for(port, server)
+            latencies, failures = asyncio.run(
+                _load(
+                    port, requests, opts['concurrency'], opts['seconds'],
+                    opts['slow_clients'], opts['trickle'],
+                )
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        if not latencies:
+            raise CommandError(f"{profile}: no successful requests ({failures} failures)")
+
+        latencies.sort()
+        self.stdout.write(
+            f"{profile}: {len(latencies) / opts['seconds']:7.1f} req/s  "
+            f"p50={statistics.median(latencies) * 1000:7.1f}ms  "
+            f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f}ms  "
+            f"failures={failures}  "
+            f"({opts['concurrency']} clients, {opts['slow_clients']} slow, {opts['workers']} worker)"
+        )
+
+    def _wait_for(self, port, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("gunicorn exited during startup")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"gunicorn did not listen on port {port}")
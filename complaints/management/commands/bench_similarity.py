@@ -0,0 +1,125 @@
+import math
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from complaints.geo import KM_PER_DEG_LAT
+from complaints.models import Complaint
+from complaints.utils import bulk_create_complaints, find_similar_complaint, text_similarity
+
+from ._synthetic import DHULE_LAT, DHULE_LON, random_description
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time find_similar_complaint against synthetic archives of growing size. "
+        "Rows are inserted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int,
+            default=[1000, 10000, 100000, 500000],
+        )
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument(
+            '--density', type=float, default=25.0,
+            help="Complaints per km² around the query points (kept constant as the archive grows).",
+        )
+        parser.add_argument(
+            '--legacy-max', type=int, default=10000,
+            help="Also time the old full-table scan for sizes up to this value.",
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='__bench_similarity__')
+                inserted = 0
+
+                for size in sorted(opts['sizes']):
+                    self._grow(user, rng, inserted, size, opts['density'])
+                    inserted = size
+                    self._report(rng, size, opts)
+
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _grow(self, user, rng, start, size, density):
+        # spread points over a square whose area grows with the archive
+        half_side_km = math.sqrt(size / density) / 2
+        dlat = half_side_km / KM_PER_DEG_LAT
+        dlon = half_side_km / (KM_PER_DEG_LAT * math.cos(math.radians(DHULE_LAT)))
+
+        batch = []
+        for _ in range(start, size):
+            lat = DHULE_LAT + rng.uniform(-dlat, dlat)
+            lon = DHULE_LON + rng.uniform(-dlon, dlon)
+            batch.append(Complaint(
+                user=user,
+                title="bench",
+                description=random_description(rng),
+                latitude=lat,
+                longitude=lon,
+            ))
+            if len(batch) >= 5000:
+                bulk_create_complaints(batch)
+                batch = []
+
+        if batch:
+            bulk_create_complaints(batch)
+
+    def _report(self, rng, size, opts):
+        queries = [
+            (random_description(rng),
+             DHULE_LAT + rng.uniform(-0.01, 0.01),
+             DHULE_LON + rng.uniform(-0.01, 0.01))
+            for _ in range(opts['queries'])
+        ]
+
+        timings = self._time(find_similar_complaint, queries)
+        line = f"{size:>8} complaints  indexed  p50={self._ms(timings, 50)}  p95={self._ms(timings, 95)}"
+
+        if size <= opts['legacy_max']:
+            legacy = self._time(self._legacy_scan, queries)
+            line += f"  |  full scan  p50={self._ms(legacy, 50)}  p95={self._ms(legacy, 95)}"
+
+        self.stdout.write(line)
+
+    @staticmethod
+    def _time(fn, queries):
+        timings = []
+        for description, lat, lon in queries:
+            start = time.perf_counter()
+            fn(description, lat, lon)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    @staticmethod
+    def _ms(timings, pct):
+        if len(timings) < 2:
+            return f"{timings[0] * 1000:.1f}ms"
+        value = statistics.quantiles(timings, n=100)[pct - 1]
+        return f"{value * 1000:.1f}ms"
+
+    @staticmethod
+    def _legacy_scan(description, lat, lon, threshold=0.7):
+        """The original implementation: every geotagged complaint is compared."""
+        best_match, best_score = None, 0
+        for comp in Complaint.objects.exclude(latitude=None).exclude(longitude=None):
+            score = text_similarity(description, comp.description)
+            if score > threshold and score > best_score:
+                best_match, best_score = comp, score
+        return best_match, best_score
@@ -0,0 +1,128 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from complaints import jobs, search
+from complaints.heatmap import tile_queryset, tiles_for_bbox
+from complaints.models import Comment, Complaint, Like, SimilarityBucket
+from complaints.pagination import PRIORITY_ORDER
+from complaints.views import complaint_cards_queryset, latest_comments_queryset
+
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?: AS \w+)?(.*)$')
+# FTS5 reports a MATCH lookup as "VIRTUAL TABLE INDEX <n>:M<column>"
+FTS_MATCH = re.compile(r'VIRTUAL TABLE INDEX \d+:\S*M')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def _hot_queries():
+    """``(name, queryset or (sql, params))`` for the queries behind the busiest pages and checks."""
+    now = timezone.now()
+    since = now - timedelta(minutes=10)
+    last_hour = now - timedelta(hours=1)
+    sample_ids = [1, 2, 3]
+    tiles = tiles_for_bbox(13, 20.85, 74.70, 20.95, 74.85)
+
+    return [
+        ('complaint list: priority page',
+         complaint_cards_queryset().order_by(*PRIORITY_ORDER)[:21]),
+        ('complaint list: latest comments',
+         latest_comments_queryset().filter(complaint_id__in=sample_ids)),
+        ('all comments of a complaint',
+         Comment.objects.filter(complaint_id=1).order_by('created_at', 'id')),
+        ('spam guard: duplicate cooldown (exact)',
+         Complaint.objects.filter(user_id=1, created_at__gte=since, content_hash='x')),
+        ('spam guard: duplicate cooldown (simhash)',
+         Complaint.objects.filter(user_id=1, created_at__gte=since).values_list('simhash', flat=True)),
+        # spam_guard._reserve counts these rows when the limit cache is per process
+        ('rate limit: complaints in the window (COUNT)',
+         Complaint.objects.filter(user_id=1, created_at__gte=last_hour).values('id')),
+        ('rate limit: comments in the window (COUNT)',
+         Comment.objects.filter(user_id=1, created_at__gte=last_hour).values('id')),
+        ('admin: status filter',
+         Complaint.objects.filter(status='pending').order_by('-id')[:100]),
+        ('admin: category filter',
+         Complaint.objects.filter(category_id=1).order_by('-id')[:100]),
+        ('heatmap tiles', tile_queryset(13, tiles, {})),
+        ('heatmap tiles: status + date filter',
+         tile_queryset(13, tiles, {'status': 'pending', 'created_at__gte': since})),
+        ('duplicate search: LSH candidates',
+         Complaint.objects.filter(
+             id__in=SimilarityBucket.objects.filter(bucket__in=[1, 2, 3]).values('complaint_id'),
+             grid_cell__in=['2090:7477', '2090:7478'],
+         ).only('id', 'description', 'latitude', 'longitude')),
+        ('search: ranked page',
+         search.ranked_sql(search.parse('pothole near school'), 20)),
+        ('admin: search',
+         search.filter_matching(Complaint.objects.order_by('-id'), 'pothole')[:100]),
+        ('like toggle',
+         Like.objects.filter(user_id=1, complaint_id=1)),
+        ('job queue: claim',
+         jobs.Job.objects.filter(jobs._claimable(now)).order_by('run_after', 'id').values_list('id', flat=True)[:5]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot queries and fail if any of them reads a whole table "
+        "instead of using an index."
+    )
+
+    def handle(self, *args, **opts):
+        vendor = connection.vendor
+        if vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f"Unsupported database backend: {vendor}")
+
+        tables = set(connection.introspection.table_names())
+
+        if vendor == 'postgresql':
+            # on small tables Postgres prefers a seq scan; ask whether an index could be used at all
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+        failures = []
+        for name, queryset in _hot_queries():
+            plan = self._explain(vendor, queryset)
+            scanned = self._full_scans(vendor, plan, tables)
+
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {name}: {', '.join(scanned)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok         {name}"))
+
+            if opts['verbosity'] >= 2 or scanned:
+                for line in plan.splitlines():
+                    self.stdout.write(f"               {line}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries fall back to a full table scan")
+
+    def _explain(self, vendor, query):
+        if isinstance(query, tuple):
+            sql, params = query
+        else:
+            # QuerySet.explain() puts EXPLAIN inside the subquery Django builds for window filters
+            sql, params = query.query.sql_with_params()
+        prefix = 'EXPLAIN QUERY PLAN ' if vendor == 'sqlite' else 'EXPLAIN '
+
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def _full_scans(self, vendor, plan, tables):
+        if vendor == 'postgresql':
+            return sorted({m.group(1) for m in POSTGRES_SCAN.finditer(plan)})
+
+        scanned = set()
+        for line in plan.splitlines():
+            match = SQLITE_SCAN.search(line)
+            # "SCAN t USING [COVERING] INDEX" walks an index; subqueries are not tables
+            if (
+                match and match.group(1) in tables and
+                'USING' not in match.group(2) and not FTS_MATCH.search(match.group(2))
+            ):
+                scanned.add(match.group(1))
+        return sorted(scanned)
@@ -0,0 +1,154 @@
+import random
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from complaints import tfidf
+
+from complaints.geo import cells_within, haversine_km
+from complaints.models import Complaint
+from complaints.utils import bulk_create_complaints, find_similar_complaint, text_similarity
+
+from ._synthetic import DHULE_LAT, DHULE_LON, perturb, random_description
+
+
+class _Rollback(Exception):
+    pass
+
+
+def exact_similar_complaint(description, lat, lon, radius_km=1.0, threshold=0.7):
+    """Reference answer: SequenceMatcher against every complaint in the radius."""
+    best_match, best_score, compared = None, 0, 0
+
+    complaints = Complaint.objects.filter(
+        grid_cell__in=cells_within(lat, lon, radius_km)
+    ).only('id', 'description', 'latitude', 'longitude')
+
+    for comp in complaints:
+        if haversine_km(lat, lon, comp.latitude, comp.longitude) > radius_km:
+            continue
+        compared += 1
+        score = text_similarity(description, comp.description)
+        if score > threshold and score > best_score:
+            best_match, best_score = comp, score
+
+    return best_match, best_score, compared
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the configured duplicate detection backend with an exhaustive "
+        "SequenceMatcher scan and report recall and precision."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=20000,
+            help="Synthetic complaints to insert (inside a rolled-back transaction).",
+        )
+        parser.add_argument(
+            '--existing', action='store_true',
+            help="Use the complaints already in the database instead of synthetic ones.",
+        )
+        parser.add_argument('--queries', type=int, default=300)
+        parser.add_argument('--threshold', type=float, default=0.7)
+        parser.add_argument('--backend', choices=['minhash', 'tfidf'], default='minhash')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **opts):
+        with tempfile.TemporaryDirectory() as index_dir, override_settings(
+            SIMILARITY_BACKEND=opts['backend'],
+            SIMILARITY_INDEX_DIR=index_dir,
+        ):
+            self._run(opts)
+
+    def _run(self, opts):
+        rng = random.Random(opts['seed'])
+
+        if opts['existing']:
+            self._build_index(opts)
+            self._compare(rng, opts)
+            return
+
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='__compare_similarity__')
+                bulk_create_complaints([
+                    Complaint(
+                        user=user,
+                        title="bench",
+                        description=random_description(rng),
+                        latitude=DHULE_LAT + rng.uniform(-0.04, 0.04),
+                        longitude=DHULE_LON + rng.uniform(-0.04, 0.04),
+                    )
+                    for _ in range(opts['size'])
+                ])
+                self._build_index(opts)
+                self._compare(rng, opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _build_index(self, opts):
+        if opts['backend'] == 'tfidf':
+            tfidf.get_index().rebuild(Complaint.objects.values_list('id', 'description'))
+
+    def _queries(self, rng, count):
+        sample = list(
+            Complaint.objects.exclude(grid_cell='')
+            .order_by('?')
+            .values_list('description', 'latitude', 'longitude')[:count // 2]
+        )
+        queries = [
+            (perturb(rng, description), lat + rng.uniform(-0.003, 0.003), lon + rng.uniform(-0.003, 0.003))
+            for description, lat, lon in sample
+        ]
+        while len(queries) < count:
+            queries.append((
+                random_description(rng),
+                DHULE_LAT + rng.uniform(-0.04, 0.04),
+                DHULE_LON + rng.uniform(-0.04, 0.04),
+            ))
+        return queries
+
+    def _compare(self, rng, opts):
+        threshold = opts['threshold']
+        tp = fn = fp = same_best = 0
+        exact_time = backend_time = 0.0
+        exact_compared = 0
+
+        queries = self._queries(rng, opts['queries'])
+        for description, lat, lon in queries:
+            start = time.perf_counter()
+            ref, ref_score, compared = exact_similar_complaint(
+                description, lat, lon, threshold=threshold
+            )
+            exact_time += time.perf_counter() - start
+            exact_compared += compared
+
+            start = time.perf_counter()
+            got, got_score = find_similar_complaint(description, lat, lon, threshold=threshold)
+            backend_time += time.perf_counter() - start
+
+            if ref and got:
+                tp += 1
+                same_best += ref.id == got.id
+            elif ref:
+                fn += 1
+            elif got:
+                fp += 1
+
+        n = len(queries)
+        recall = tp / (tp + fn) if tp + fn else 1.0
+        precision = tp / (tp + fp) if tp + fp else 1.0
+
+        self.stdout.write(f"queries:           {n} ({tp + fn} with a duplicate above {threshold})")
+        self.stdout.write(f"recall:            {recall:.3f}  (missed {fn})")
+        self.stdout.write(f"precision:         {precision:.3f}  (spurious {fp})")
+        self.stdout.write(f"same best match:   {same_best}/{tp}")
+        self.stdout.write(f"exact scan:        {exact_time / n * 1000:.1f}ms/query, {exact_compared / n:.0f} rows compared")
+        self.stdout.write(f"{opts['backend'] + ':':<19}{backend_time / n * 1000:.1f}ms/query")
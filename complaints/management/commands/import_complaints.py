@@ -0,0 +1,150 @@
+import sys
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from complaints.exports import FORMATS, read_rows
+from complaints.models import Category, Complaint
+from complaints.utils import bulk_create_complaints
+
+BATCH = 2000
+STATUSES = {value for value, _ in Complaint.STATUS_CHOICES}
+
+
+def _float(value):
+    return None if value in ('', None) else float(value)
+
+
+def _int(value):
+    return 0 if value in ('', None) else int(value)
+
+
+def _datetime(value, default=None):
+    if not value:
+        return default
+    moment = datetime.fromisoformat(value)
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load complaints from an export_complaints file with bulk_create in batches, "
+        "recomputing priority, grid cell and text fingerprints. Users and categories "
+        "are matched by name; ids and duplicate links are not kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File to read, or - for stdin.")
+        parser.add_argument('--format', choices=sorted(FORMATS), help="Default: from the file extension, else csv.")
+        parser.add_argument('--batch-size', type=int, default=BATCH)
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help="Create unknown users (without a usable password) instead of failing.",
+        )
+
+    def handle(self, *args, **opts):
+        fmt = opts['format'] or ('ndjson' if opts['input'].endswith('.ndjson') else 'csv')
+        if opts['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        self.create_users = opts['create_users']
+        self.user_ids = {}
+        self.category_ids = {c.name: c.pk for c in Category.objects.all()}
+        self.new_users = 0
+
+        start = time.perf_counter()
+        stream = sys.stdin if opts['input'] == '-' else open(opts['input'], encoding='utf-8', newline='')
+        imported = 0
+        try:
+            batch = []
+            # line 1 is the CSV header
+            for line, row in enumerate(read_rows(stream, fmt), 2 if fmt == 'csv' else 1):
+                try:
+                    batch.append(self._complaint(row))
+                except (KeyError, ValueError, TypeError) as exc:
+                    raise CommandError(f"Row {line}: {exc!r}") from None
+                if len(batch) == opts['batch_size']:
+                    imported += self._save(batch)
+                    batch = []
+                    if imported % (opts['batch_size'] * 25) == 0:
+                        self.stdout.write(f"  {imported} complaints")
+            if batch:
+                imported += self._save(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if settings.SIMILARITY_BACKEND == 'tfidf' and imported:
+            # bulk_create skips the signal that indexes new descriptions
+            call_command('build_similarity_index', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} complaints ({self.new_users} new users) "
+            f"in {time.perf_counter() - start:.1f}s"
+        ))
+
+    def _complaint(self, row):
+        status = row.get('status') or 'pending'
+        if status not in STATUSES:
+            raise ValueError(f"unknown status {status}")
+        if not row['title']:
+            raise ValueError("title is empty")
+
+        # the user and category are resolved per batch in _save
+        complaint = Complaint(
+            title=row['title'],
+            description=row.get('description') or '',
+            status=status,
+            latitude=_float(row.get('latitude')),
+            longitude=_float(row.get('longitude')),
+            address=row.get('address') or '',
+            image=row.get('image') or None,
+            created_at=_datetime(row.get('created_at'), timezone.now()),
+            # files from before resolved_at existed have no resolution time
+            resolved_at=_datetime(row.get('resolved_at')) if status == 'resolved' else None,
+            likes_count=_int(row.get('likes_count')),
+            comments_count=_int(row.get('comments_count')),
+        )
+        complaint._username = row['user']
+        complaint._category_name = row.get('category') or None
+        return complaint
+
+    def _resolve_users(self, usernames):
+        missing = usernames - self.user_ids.keys()
+        if not missing:
+            return
+        self.user_ids.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        missing -= self.user_ids.keys()
+        if not missing:
+            return
+        if not self.create_users:
+            raise CommandError(
+                f"Unknown users: {', '.join(sorted(missing)[:10])}"
+                f"{' ...' if len(missing) > 10 else ''} (use --create-users)"
+            )
+
+        # one hash shared by all: none of them can log in until they reset it
+        password = make_password(None)
+        User.objects.bulk_create([User(username=name, password=password) for name in missing])
+        self.user_ids.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        self.new_users += len(missing)
+
+    def _save(self, batch):
+        with transaction.atomic():
+            self._resolve_users({c._username for c in batch})
+            for name in {c._category_name for c in batch} - self.category_ids.keys() - {None}:
+                self.category_ids[name] = Category.objects.create(name=name).pk
+
+            for complaint in batch:
+                complaint.user_id = self.user_ids[complaint._username]
+                complaint.category_id = self.category_ids.get(complaint._category_name)
+
+            bulk_create_complaints(batch)
+        return len(batch)
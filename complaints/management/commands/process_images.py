@@ -0,0 +1,46 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from complaints.images import process_complaint_image
+from complaints.models import Complaint
+
+
+def _process(complaint_id):
+    close_old_connections()
+    try:
+        return process_complaint_image(complaint_id) is not None
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Strip EXIF from complaint images and generate their resized WebP/JPEG derivatives, "
+        "for images that do not have them yet (all of them with --force)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Regenerate derivatives even where they already exist.",
+        )
+
+    def handle(self, *args, **opts):
+        pending = Complaint.objects.exclude(image='').exclude(image=None)
+        if not opts['force']:
+            pending = pending.filter(image_variants={})
+
+        ids = list(pending.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f"Processing {len(ids)} images with {opts['workers']} workers...")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts['workers']) as pool:
+            done = sum(pool.map(_process, ids))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {done}/{len(ids)} images in {time.perf_counter() - start:.1f}s"
+        ))
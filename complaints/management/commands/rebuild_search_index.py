@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from complaints import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate missing full-text search triggers and re-index every complaint. "
+        "Only needed on SQLite after restoring data with the triggers disabled; "
+        "on Postgres the search column is generated and always current."
+    )
+
+    def handle(self, *args, **opts):
+        search.install()
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt ({connection.vendor})."))
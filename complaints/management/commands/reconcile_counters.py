@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from complaints import counters
+from complaints.models import Comment, Complaint, Like
+
+
+def _count_of(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(complaint=OuterRef('pk'))
+            .order_by()
+            .values('complaint')
+            .annotate(n=Count('id'))
+            .values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recompute likes_count, comments_count and priority_score from the Like/Comment tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report out-of-sync complaints without fixing them.",
+        )
+
+    def handle(self, *args, **opts):
+        counters.flush()
+
+        batch_size = opts['batch_size']
+        last_id = Complaint.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        checked = fixed = 0
+
+        for start in range(0, last_id + 1, batch_size):
+            window = Complaint.objects.filter(id__gte=start, id__lt=start + batch_size)
+            checked += window.count()
+
+            stale = window.annotate(
+                real_likes=_count_of(Like),
+                real_comments=_count_of(Comment),
+            ).exclude(
+                likes_count=F('real_likes'),
+                comments_count=F('real_comments'),
+                priority_score=(
+                    F('real_likes') * Complaint.LIKE_WEIGHT +
+                    F('real_comments') * Complaint.COMMENT_WEIGHT
+                ),
+            ).values_list('id', 'real_likes', 'real_comments')
+
+            updates = [
+                Complaint(
+                    id=pk,
+                    likes_count=likes,
+                    comments_count=comments,
+                    priority_score=likes * Complaint.LIKE_WEIGHT + comments * Complaint.COMMENT_WEIGHT,
+                )
+                for pk, likes, comments in stale
+            ]
+            fixed += len(updates)
+
+            if updates and not opts['dry_run']:
+                Complaint.objects.bulk_update(
+                    updates,
+                    ['likes_count', 'comments_count', 'priority_score'],
+                    batch_size=500,
+                )
+
+        verb = "out of sync" if opts['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} complaints, {fixed} {verb}."))
@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+from django.utils import timezone
+
+from complaints import jobs
+
+
+def _work(worker_id, stop, poll_interval, batch, once):
+    """Claim and run jobs until ``stop`` is set (or the queue is empty with ``once``)."""
+    done = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            claimed = jobs.claim(worker_id, limit=batch)
+
+            if not claimed:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+
+            for job in claimed:
+                jobs.run(job)
+                done += 1
+    finally:
+        connection.close()
+    return done
+
+
+def _process_main(worker_id, poll_interval, batch, once):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    _work(worker_id, stop, poll_interval, batch, once)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (duplicate checks, ...) from the database job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2)
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help="Run workers as threads of this process or as child processes.",
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--batch', type=int, default=5, help="Jobs claimed per query.")
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit once no due jobs are left instead of polling.",
+        )
+        parser.add_argument(
+            '--purge-after', type=int, default=7,
+            help="Delete jobs that finished more than this many days ago (0 keeps them).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts['purge_after']:
+            purged = jobs.purge(timezone.now() - timedelta(days=opts['purge_after']))
+            if purged:
+                self.stdout.write(f"Purged {purged} finished jobs.")
+
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        args = (opts['poll_interval'], opts['batch'], opts['once'])
+
+        self.stdout.write(
+            f"Starting {opts['concurrency']} {opts['pool']} workers ({prefix})..."
+        )
+
+        if opts['pool'] == 'process':
+            self._run_processes(prefix, opts['concurrency'], args)
+        else:
+            self._run_threads(prefix, opts['concurrency'], args)
+
+        self.stdout.write(self.style.SUCCESS("Worker stopped."))
+
+    def _run_threads(self, prefix, concurrency, args):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        threads = [
+            threading.Thread(target=_work, args=(f'{prefix}:{n}', stop, *args), daemon=True)
+            for n in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _run_processes(self, prefix, concurrency, args):
+        # children must not share the parent's database connection
+        connections.close_all()
+
+        procs = [
+            multiprocessing.Process(target=_process_main, args=(f'{prefix}:{n}', *args))
+            for n in range(concurrency)
+        ]
+        for proc in procs:
+            proc.start()
+
+        def forward(signum, frame):
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+
+        signal.signal(signal.SIGTERM, forward)
+        try:
+            for proc in procs:
+                proc.join()
+        except KeyboardInterrupt:
+            # children received the same SIGINT and finish their current job
+            for proc in procs:
+                proc.join()
@@ -0,0 +1,146 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from complaints import categories
+from complaints.changes import mark_changed
+from complaints.models import Comment, Complaint, Like
+from complaints.utils import bulk_create_complaints
+
+from ._synthetic import DETAILS, DHULE_LAT, DHULE_LON, PLACES, random_description
+
+SEED_PREFIX = 'seed_'
+BATCH = 5000
+
+# share of complaints per status on the live site
+STATUS_WEIGHTS = {'pending': 6, 'progress': 2, 'resolved': 2}
+
+COMMENTS = [
+    "Same problem in our lane", "Please fix this soon", "Reported to the ward office",
+    "Still not resolved", "Thank you for raising this", "आमच्याकडेही हीच समस्या आहे",
+    "लवकर काम करा", *filter(None, DETAILS),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic Dhule-area users, complaints, comments and "
+        f"likes for the bench command. Seeded users are named {SEED_PREFIX}<n>; "
+        "--clear removes them and everything they posted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=10_000)
+        parser.add_argument('--users', type=int, help="Default: one per 20 complaints, at least 200.")
+        parser.add_argument('--comments', type=float, default=3, help="Average comments per complaint.")
+        parser.add_argument('--likes', type=float, default=5, help="Average likes per complaint.")
+        parser.add_argument('--days', type=int, default=365, help="Spread created_at over this many days.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help="Delete earlier seed data first.")
+
+    def handle(self, *args, **opts):
+        if opts['clear']:
+            self._clear()
+        if not opts['complaints']:
+            return
+
+        rng = random.Random(opts['seed'])
+        n_users = opts['users'] or max(200, opts['complaints'] // 20)
+        start = time.perf_counter()
+
+        user_ids = self._users(n_users)
+        category_ids = [c.pk for c in categories.get_categories()]
+
+        done = 0
+        while done < opts['complaints']:
+            size = min(BATCH, opts['complaints'] - done)
+            with transaction.atomic():
+                self._batch(rng, size, user_ids, category_ids, opts)
+            done += size
+            if done % (BATCH * 10) == 0 or opts['verbosity'] >= 2:
+                self.stdout.write(f"  {done} complaints")
+
+        mark_changed()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {n_users} users and {done} complaints in {time.perf_counter() - start:.1f}s"
+        ))
+
+    def _clear(self):
+        seeded = Complaint.objects.filter(user__username__startswith=SEED_PREFIX)
+        removed = 0
+        # in chunks: the cascade collects every row it deletes in memory
+        while ids := list(seeded.values_list('id', flat=True)[:BATCH]):
+            with transaction.atomic():
+                Complaint.objects.filter(id__in=ids).delete()
+            removed += len(ids)
+        users, _ = User.objects.filter(username__startswith=SEED_PREFIX).delete()
+        self.stdout.write(f"Removed {removed} seeded complaints ({users} rows with their users)")
+
+    def _users(self, n):
+        existing = User.objects.filter(username__startswith=SEED_PREFIX).count()
+        # one hash shared by all: hashing is deliberately slow
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=f'{SEED_PREFIX}{i:07d}', password=password) for i in range(existing, n)],
+            batch_size=BATCH,
+        )
+        return list(
+            User.objects.filter(username__startswith=SEED_PREFIX).order_by('id').values_list('id', flat=True)
+        )
+
+    def _batch(self, rng, size, user_ids, category_ids, opts):
+        now = timezone.now()
+        statuses, weights = zip(*STATUS_WEIGHTS.items())
+
+        complaints, n_comments, n_likes = [], [], []
+        for _ in range(size):
+            description = random_description(rng)
+            comments = min(int(rng.expovariate(1 / opts['comments'])), 50) if opts['comments'] else 0
+            likes = min(int(rng.expovariate(1 / opts['likes'])), len(user_ids)) if opts['likes'] else 0
+            n_comments.append(comments)
+            n_likes.append(likes)
+            # most complaints are geotagged, spread over the city
+            geotagged = rng.random() < 0.9
+            status = rng.choices(statuses, weights)[0]
+            created_at = now - timedelta(seconds=rng.uniform(0, opts['days'] * 86400))
+            # resolved after a few days on average, never in the future
+            resolved_at = min(now, created_at + timedelta(days=rng.expovariate(1 / 4))) if status == 'resolved' else None
+            complaints.append(Complaint(
+                user_id=rng.choice(user_ids),
+                title=description.split(' ward ')[0][:200],
+                description=description,
+                category_id=rng.choice(category_ids) if category_ids else None,
+                latitude=DHULE_LAT + rng.gauss(0, 0.02) if geotagged else None,
+                longitude=DHULE_LON + rng.gauss(0, 0.02) if geotagged else None,
+                address=rng.choice(PLACES),
+                status=status,
+                created_at=created_at,
+                resolved_at=resolved_at,
+                likes_count=likes,
+                comments_count=comments,
+            ))
+
+        created = bulk_create_complaints(complaints)
+
+        Comment.objects.bulk_create(
+            [
+                Comment(complaint_id=c.id, user_id=rng.choice(user_ids), text=rng.choice(COMMENTS))
+                for c, n in zip(created, n_comments)
+                for _ in range(n)
+            ],
+            batch_size=BATCH,
+        )
+        Like.objects.bulk_create(
+            [
+                Like(complaint_id=c.id, user_id=user_id)
+                for c, n in zip(created, n_likes)
+                for user_id in rng.sample(user_ids, n)
+            ],
+            batch_size=BATCH,
+        )
@@ -0,0 +1,64 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# runs in a fresh interpreter, like a newly forked/started worker
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+import django
+from django.db import connections
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+django.setup(set_prefix=False)
+setup_done = time.perf_counter()
+import {urlconf}
+end = time.perf_counter()
+print(json.dumps({{
+    'setup': setup_done - start,
+    'total': end - start,
+    'db_opened': any(c.connection is not None for c in connections.all(initialized_only=True)),
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how long a fresh process takes to import Django, run django.setup() "
+        "and import the URLconf (views, forms), and whether it touches the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=10)
+
+    def handle(self, *args, **opts):
+        code = PROBE.format(
+            settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+            urlconf=settings.ROOT_URLCONF,
+        )
+
+        results = []
+        for _ in range(opts['runs']):
+            out = subprocess.run(
+                [sys.executable, '-W', 'ignore', '-c', code],
+                capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+        setup = [r['setup'] * 1000 for r in results]
+        total = [r['total'] * 1000 for r in results]
+        opened = sum(r['db_opened'] for r in results)
+
+        self.stdout.write(f"{opts['runs']} fresh processes")
+        self.stdout.write(
+            f"import + django.setup():  median {statistics.median(setup):6.1f}ms  min {min(setup):6.1f}ms"
+        )
+        self.stdout.write(
+            f"  + URLconf/views import:  median {statistics.median(total):6.1f}ms  min {min(total):6.1f}ms"
+        )
+        self.stdout.write(f"processes that opened a database connection while starting: {opened}/{opts['runs']}")
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaints.heatmap import MAX_TILES, cached_tiles, tiles_for_bbox
+
+# roughly Dhule city and its outskirts
+DHULE_BBOX = (20.80, 74.65, 21.00, 74.90)
+
+
+class Command(BaseCommand):
+    help = "Precompute the unfiltered heatmap tiles for the city at common zoom levels."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zooms', nargs='+', type=int, default=[11, 12, 13, 14, 15, 16])
+        parser.add_argument(
+            '--bbox', type=float, nargs=4, default=list(DHULE_BBOX),
+            metavar=('SOUTH', 'WEST', 'NORTH', 'EAST'),
+        )
+
+    def handle(self, *args, **opts):
+        for zoom in opts['zooms']:
+            start = time.perf_counter()
+            tiles = tiles_for_bbox(zoom, *opts['bbox'], max_tiles=None)
+
+            cells = 0
+            for i in range(0, len(tiles), MAX_TILES):
+                cells += sum(map(len, cached_tiles(zoom, tiles[i:i + MAX_TILES], {}).values()))
+
+            self.stdout.write(
+                f"zoom {zoom}: {len(tiles)} tiles, {cells} cells "
+                f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+            )
@@ -0,0 +1,316 @@
+"""
+Per-request timing: SQL, template rendering and named spans.
+
+``MetricsMiddleware`` times every request into a per-view duration
+histogram. A METRICS_SAMPLE_RATE share of requests is also instrumented
+in detail:
+
+- every SQL query, through an execute wrapper installed on each database
+  connection (``connection_created``);
+- template rendering, through the ``DjangoTemplates`` backend below;
+- ``span(name)`` / ``@timed(name)`` blocks around hot paths.
+
+Sampled requests feed the per-view histograms served as Prometheus text
+by ``metrics_view`` (staff or METRICS_TOKEN only) and, with
+METRICS_SERVER_TIMING, give staff a ``Server-Timing`` header. Unsampled
+requests cost two clock reads and one histogram update; their queries
+only pay a context-variable lookup.
+
+The record lives in a context variable, so it follows async views into
+``sync_to_async`` threads. Spans can overlap: SQL run while a template
+renders (lazy querysets, the session) counts as both ``db`` and ``tpl``.
+Histograms are per process; with several workers, scrape each of them.
+"""
+import bisect
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates
+from django.template.backends.django import Template as BaseTemplate
+from django.template.backends.django import reraise
+from django.utils.crypto import constant_time_compare
+
+from . import fragments
+
+_current = ContextVar('request_metrics', default=None)
+
+# seconds; requests, queries and spans share them
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Server-Timing names for the built-in measurements
+SQL = 'db'
+TEMPLATE = 'tpl'
+
+# any other request method is counted as "other", so clients cannot add series
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0])
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            counts, _ = series = self._series[labels]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+
+        for labels, counts, total in series:
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, labels))
+            sep = ',' if base else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {total}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram(
+    'jansamadhan_request_duration_seconds', "Time to produce a response, every request.",
+    ('view', 'method'), DURATION_BUCKETS,
+)
+SQL_QUERIES = Histogram(
+    'jansamadhan_request_sql_queries', "SQL queries per sampled request.",
+    ('view',), QUERY_BUCKETS,
+)
+SQL_DURATION = Histogram(
+    'jansamadhan_request_sql_seconds', "Total SQL time per sampled request.",
+    ('view',), DURATION_BUCKETS,
+)
+SPAN_DURATION = Histogram(
+    'jansamadhan_span_seconds', "Time in a named span (template rendering, hot paths) per sampled request.",
+    ('view', 'span'), DURATION_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_DURATION, SQL_QUERIES, SQL_DURATION, SPAN_DURATION)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'sql', 'spans')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        # name -> [seconds, calls]
+        self.spans = {}
+
+    def add(self, name, seconds):
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+def current():
+    """The sampled request's record, or None."""
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Time the block into the current sampled request, if any."""
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.add(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of ``span``."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ================= SQL =================
+def _sql_timer(execute, sql, params, many, context):
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.sql += time.perf_counter() - start
+        record.queries += 1
+
+
+@receiver(connection_created)
+def _install_sql_timer(sender, connection, **kwargs):
+    # fires again when a persistent connection wrapper reconnects
+    if _sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_timer)
+
+
+# ================= TEMPLATES =================
+class _TimedTemplate(BaseTemplate):
+    def render(self, context=None, request=None):
+        with span(TEMPLATE):
+            return super().render(context, request)
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """The stock backend, with top-level renders timed as the ``tpl`` span."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return _TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# ================= MIDDLEWARE =================
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+def _method(request):
+    return request.method if request.method in METHODS else 'other'
+
+
+def _is_staff(user):
+    return user is not None and user.is_staff
+
+
+def _start():
+    if random.random() >= settings.METRICS_SAMPLE_RATE:
+        return None, None
+    record = RequestMetrics()
+    return record, _current.set(record)
+
+
+def _wants_timing(record):
+    return record is not None and settings.METRICS_SERVER_TIMING
+
+
+def _finish(request, response, record, token, started, timing):
+    elapsed = time.perf_counter() - started
+    view = _view_name(request)
+    REQUEST_DURATION.observe((view, _method(request)), elapsed)
+    if record is None:
+        return
+
+    _current.reset(token)
+    SQL_QUERIES.observe((view,), record.queries)
+    SQL_DURATION.observe((view,), record.sql)
+    for name, (seconds, _) in record.spans.items():
+        SPAN_DURATION.observe((view, name), seconds)
+
+    # SQL and span timings are for staff only
+    if timing:
+        entries = [f'{SQL};dur={record.sql * 1000:.1f};desc="{record.queries} queries"']
+        entries += [
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="{calls} calls"' if calls > 1 else '')
+            for name, (seconds, calls) in record.spans.items()
+        ]
+        entries.append(f'total;dur={elapsed * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(entries)
+
+
+def MetricsMiddleware(get_response):
+    """Outermost middleware: times every request and instruments a sample."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = time.perf_counter()
+            record, token = _start()
+            try:
+                response = await get_response(request)
+            except BaseException:
+                if token is not None:
+                    _current.reset(token)
+                raise
+            timing = _wants_timing(record) and hasattr(request, 'auser') and (await request.auser()).is_staff
+            _finish(request, response, record, token, started, timing)
+            return response
+
+        return markcoroutinefunction(middleware)
+
+    def middleware(request):
+        started = time.perf_counter()
+        record, token = _start()
+        try:
+            response = get_response(request)
+        except BaseException:
+            if token is not None:
+                _current.reset(token)
+            raise
+        timing = _wants_timing(record) and _is_staff(getattr(request, 'user', None))
+        _finish(request, response, record, token, started, timing)
+        return response
+
+    return middleware
+
+
+MetricsMiddleware.sync_capable = True
+MetricsMiddleware.async_capable = True
+
+
+# ================= /metrics =================
+def _counter(name, help, value):
+    return [f'# HELP {name} {help}', f'# TYPE {name} counter', f'{name} {value}']
+
+
+def metrics_view(request):
+    """This process's histograms in the Prometheus text format; for staff or the METRICS_TOKEN bearer."""
+    token = settings.METRICS_TOKEN
+    bearer = token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not bearer and not request.user.is_staff:
+        return HttpResponseForbidden("Metrics token required")
+
+    cache = fragments.stats()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.expose()
+    lines += _counter('jansamadhan_card_cache_hits_total', "Complaint card fragments served from cache.", cache['hits'])
+    lines += _counter('jansamadhan_card_cache_misses_total', "Complaint card fragments rendered.", cache['misses'])
+
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
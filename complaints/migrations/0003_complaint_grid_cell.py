@@ -0,0 +1,38 @@
+# Generated by Django 5.2.11 on 2026-10-17 20:34
+
+from django.db import migrations, models
+
+from complaints.geo import grid_cell
+
+
+def backfill_grid_cell(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+
+    batch = []
+    for comp in Complaint.objects.exclude(latitude=None).exclude(longitude=None).only(
+        'id', 'latitude', 'longitude'
+    ).iterator(chunk_size=2000):
+        comp.grid_cell = grid_cell(comp.latitude, comp.longitude)
+        batch.append(comp)
+        if len(batch) >= 2000:
+            Complaint.objects.bulk_update(batch, ['grid_cell'])
+            batch = []
+
+    if batch:
+        Complaint.objects.bulk_update(batch, ['grid_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0002_complaint_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='grid_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+        migrations.RunPython(backfill_grid_cell, migrations.RunPython.noop),
+    ]
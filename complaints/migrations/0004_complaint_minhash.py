@@ -0,0 +1,55 @@
+# Generated by Django 5.2.11 on 2026-10-17 20:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from complaints.minhash import bucket_keys, signature
+
+
+def backfill_minhash(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    SimilarityBucket = apps.get_model('complaints', 'SimilarityBucket')
+
+    complaints, buckets = [], []
+
+    def flush():
+        Complaint.objects.bulk_update(complaints, ['minhash'])
+        SimilarityBucket.objects.bulk_create(buckets)
+        complaints.clear()
+        buckets.clear()
+
+    for comp in Complaint.objects.only('id', 'description').iterator(chunk_size=2000):
+        comp.minhash = signature(comp.description)
+        complaints.append(comp)
+        buckets.extend(
+            SimilarityBucket(complaint_id=comp.id, bucket=key)
+            for key in bucket_keys(comp.minhash)
+        )
+        if len(complaints) >= 2000:
+            flush()
+
+    flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0003_complaint_grid_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='minhash',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.CreateModel(
+            name='SimilarityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_buckets', to='complaints.complaint')),
+            ],
+        ),
+        migrations.RunPython(backfill_minhash, migrations.RunPython.noop),
+    ]
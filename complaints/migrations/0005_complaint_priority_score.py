@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-17 20:48
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_priority_score(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Complaint.objects.update(
+        priority_score=F('likes_count') * 3 + F('comments_count') * 2
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_complaint_minhash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='priority_score',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-priority_score', '-created_at', '-id'], name='complaint_priority_idx'),
+        ),
+        migrations.RunPython(backfill_priority_score, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.11 on 2026-10-17 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+from complaints.fingerprint import content_hash, simhash
+
+
+def backfill_fingerprints(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+
+    batch = []
+    for comp in Complaint.objects.only('id', 'description').iterator(chunk_size=2000):
+        comp.content_hash = content_hash(comp.description)
+        comp.simhash = simhash(comp.description)
+        batch.append(comp)
+        if len(batch) >= 2000:
+            Complaint.objects.bulk_update(batch, ['content_hash', 'simhash'])
+            batch = []
+
+    if batch:
+        Complaint.objects.bulk_update(batch, ['content_hash', 'simhash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0006_badword'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='simhash',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', 'content_hash', 'created_at'], name='complaint_user_hash_idx'),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
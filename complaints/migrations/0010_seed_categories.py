@@ -0,0 +1,32 @@
+from django.db import migrations
+
+DEFAULT_CATEGORIES = [
+    "Water Problem",
+    "Road Damage",
+    "Electricity Issue",
+    "Garbage Issue",
+    "Drainage Problem",
+    "Street Light Not Working",
+]
+
+
+def seed_categories(apps, schema_editor):
+    # previously done by ComplaintsConfig.ready() on every process start
+    Category = apps.get_model('complaints', 'Category')
+    existing = set(Category.objects.values_list('name', flat=True))
+    Category.objects.bulk_create([
+        Category(name=name)
+        for name in DEFAULT_CATEGORIES
+        if name not in existing
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_job_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_categories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from complaints import search
+
+
+def install(apps, schema_editor):
+    search.install(schema_editor.connection.alias)
+
+
+def uninstall(apps, schema_editor):
+    search.uninstall(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.11 on 2026-10-17 21:49
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def fill_stats(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintStat = apps.get_model('complaints', 'ComplaintStat')
+
+    rows = Complaint.objects.annotate(
+        day=TruncDate('created_at'),
+    ).values('day', 'category_id', 'status').annotate(n=Count('id')).order_by()
+
+    # no category is stored as 0 (stats.NO_CATEGORY). Complaints resolved before
+    # resolved_at existed have no resolution time, so ResolutionStat starts empty.
+    ComplaintStat.objects.bulk_create(
+        [
+            ComplaintStat(day=row['day'], category_id=row['category_id'] or 0, status=row['status'], count=row['n'])
+            for row in rows.iterator()
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0012_complaint_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category_id', models.IntegerField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResolutionStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category_id', models.IntegerField()),
+                ('bucket', models.SmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['created_at'], name='complaint_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='complaintstat',
+            constraint=models.UniqueConstraint(fields=('day', 'category_id', 'status'), name='complaint_stat_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='resolutionstat',
+            constraint=models.UniqueConstraint(fields=('day', 'category_id', 'bucket'), name='resolution_stat_key'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-17 22:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0013_complaint_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='card_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-17 22:27
+
+import complaints.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0015_comment_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaint',
+            name='created_at',
+            field=complaints.models.CreatedAtField(auto_now_add=True),
+        ),
+    ]
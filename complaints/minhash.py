@@ -0,0 +1,75 @@
+"""
+MinHash signatures and LSH bucket keys for near-duplicate text lookup.
+
+Descriptions are cut into character shingles (so English and Marathi
+both work), reduced to a fixed-size MinHash signature, and the signature
+is split into bands. Two texts share a bucket when any band matches,
+which happens with high probability once their shingle sets overlap.
+"""
+import hashlib
+import random
+import struct
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# fixed seed: signatures are persisted, so permutations must never change
+_rng = random.Random(0x4A53)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_SIGNATURE_FORMAT = f'<{NUM_PERM}I'
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def _hash32(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def shingles(text):
+    text = normalize(text)
+    if not text:
+        return set()
+    if len(text) <= SHINGLE_SIZE:
+        return {_hash32(text)}
+    return {
+        _hash32(text[i:i + SHINGLE_SIZE])
+        for i in range(len(text) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(text):
+    """Packed MinHash signature (bytes), or b"" for empty text."""
+    hashes = shingles(text)
+    if not hashes:
+        return b''
+
+    values = [
+        min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+    return struct.pack(_SIGNATURE_FORMAT, *values)
+
+
+def bucket_keys(sig):
+    """One signed 64-bit bucket key per band (fits a BigIntegerField)."""
+    if not sig:
+        return []
+
+    width = ROWS * 4
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * width:(band + 1) * width]
+        digest = hashlib.blake2b(struct.pack('<H', band) + chunk, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
@@ -1,5 +1,24 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+
+from .fingerprint import content_hash, simhash
+from .geo import grid_cell
+from .minhash import signature
+
+
+class CreatedAtField(models.DateTimeField):
+    """
+    ``auto_now_add`` that keeps a value already set on a new instance, so
+    imports and seeding can store their own timestamps. Per instance, unlike
+    switching ``auto_now_add`` off on the shared field.
+    """
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if add and value is not None:
+            return value
+        return super().pre_save(model_instance, add)
 
 
 class Category(models.Model):
@@ -10,6 +29,9 @@ class Category(models.Model):
 
 
 class Complaint(models.Model):
+    LIKE_WEIGHT = 3
+    COMMENT_WEIGHT = 2
+
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('progress', 'In Progress'),
@@ -21,34 +43,270 @@ class Complaint(models.Model):
     description = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     image = models.ImageField(upload_to='complaints/', blank=True, null=True)
+    # resized WebP/JPEG renditions of image, filled in by images.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     latitude = models.FloatField(blank=True, null=True)
     longitude = models.FloatField(blank=True, null=True)
     address = models.CharField(max_length=255, blank=True)
 
+    # spatial grid key (see geo.py), kept in sync with lat/lon on save
+    grid_cell = models.CharField(max_length=32, blank=True, db_index=True, editable=False)
+
+    # packed MinHash of the description (see minhash.py); LSH buckets live in SimilarityBucket
+    minhash = models.BinaryField(blank=True, default=b'', editable=False)
+
+    # normalized-text fingerprints for the duplicate cooldown (see fingerprint.py)
+    content_hash = models.CharField(max_length=40, blank=True, editable=False)
+    simhash = models.BigIntegerField(default=0, editable=False)
+
+    # nearby complaint with a similar description, found at submit time or by the job queue
+    similar_to = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        editable=False
+    )
+    similarity_score = models.FloatField(null=True, blank=True, editable=False)
+
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = CreatedAtField(auto_now_add=True)
+    # when status last became resolved, None otherwise; feeds the median resolution time (see stats.py)
+    resolved_at = models.DateTimeField(null=True, blank=True, editable=False)
     likes_count = models.PositiveIntegerField(default=0)
     comments_count = models.PositiveIntegerField(default=0)
 
+    # bumped whenever the cached card fragments go stale (see fragments.py)
+    card_version = models.BigIntegerField(default=0, editable=False)
+
+    # likes_count * LIKE_WEIGHT + comments_count * COMMENT_WEIGHT, stored so the list can be paged by index
+    priority_score = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-priority_score', '-created_at', '-id'],
+                name='complaint_priority_idx',
+            ),
+            models.Index(
+                fields=['user', 'content_hash', 'created_at'],
+                name='complaint_user_hash_idx',
+            ),
+            # duplicate cooldown: the user's complaints of the last few minutes
+            models.Index(
+                fields=['user', 'created_at'],
+                name='complaint_user_created_idx',
+            ),
+            # admin status filter, newest first
+            models.Index(
+                fields=['status', 'id'],
+                name='complaint_status_idx',
+            ),
+            # date ranges: heatmap and export filters, rebuild_stats partitions
+            models.Index(
+                fields=['created_at'],
+                name='complaint_created_idx',
+            ),
+            # heatmap bbox; complaints without coordinates never match it
+            models.Index(
+                fields=['latitude', 'longitude'],
+                name='complaint_geo_idx',
+                condition=models.Q(latitude__isnull=False, longitude__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
+    def _srcset(self, key):
+        return ', '.join(
+            f"{default_storage.url(v[key])} {v['width']}w"
+            for v in sorted(self.image_variants.values(), key=lambda v: v['width'])
+        )
+
+    @property
+    def image_srcset_webp(self):
+        return self._srcset('webp')
+
+    @property
+    def image_srcset_jpeg(self):
+        return self._srcset('jpeg')
+
+    @property
+    def image_medium(self):
+        """Fallback rendition for <img src> (url, width, height), or None."""
+        variant = self.image_variants.get('medium')
+        if not variant:
+            return None
+        return {
+            'url': default_storage.url(variant['jpeg']),
+            'width': variant['width'],
+            'height': variant['height'],
+        }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # lets save() skip the fingerprints when the text is unchanged
+        if 'description' in field_names:
+            instance._saved_description = instance.description
+        return instance
+
+    def _description_edited(self, update_fields):
+        if update_fields is not None:
+            return 'description' in update_fields
+        if 'description' in self.get_deferred_fields():
+            return False
+        return self.description != getattr(self, '_saved_description', None)
+
+    def save(self, *args, **kwargs):
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        self.priority_score = (
+            self.likes_count * self.LIKE_WEIGHT +
+            self.comments_count * self.COMMENT_WEIGHT
+        )
+
+        # MinHash, content hash and SimHash only follow the description
+        update_fields = kwargs.get('update_fields')
+        self._description_changed = False
+        if self._description_edited(update_fields):
+            new_minhash = signature(self.description)
+            self._description_changed = bytes(self.minhash or b'') != new_minhash
+            self.minhash = new_minhash
+            self.content_hash = content_hash(self.description)
+            self.simhash = simhash(self.description)
+
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'latitude', 'longitude'} & update_fields:
+                update_fields.add('grid_cell')
+            if 'status' in update_fields:
+                # set from the stored status by a pre_save signal
+                update_fields.add('resolved_at')
+            if {'likes_count', 'comments_count'} & update_fields:
+                update_fields.add('priority_score')
+            if 'description' in update_fields:
+                update_fields.update({'minhash', 'content_hash', 'simhash'})
+            kwargs['update_fields'] = update_fields
+
+        # the post_save stats delta commits with the row, even under autocommit (see stats.rebuild)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        if 'description' not in self.get_deferred_fields():
+            self._saved_description = self.description
+
+
+class SimilarityBucket(models.Model):
+    """One LSH band of a complaint's MinHash, used to look up near-duplicates."""
+    complaint = models.ForeignKey(
+        Complaint,
+        on_delete=models.CASCADE,
+        related_name='similarity_buckets'
+    )
+    bucket = models.BigIntegerField(db_index=True)
+
 
 class Comment(models.Model):
     complaint = models.ForeignKey(
         Complaint,
         on_delete=models.CASCADE,
-        related_name='comments'
+        related_name='comments',
+        # covered by comment_complaint_created_idx
+        db_index=False
     )
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # covered by comment_user_created_idx
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # comments of a complaint in display order (card preview, "show all")
+            models.Index(
+                fields=['complaint', 'created_at', 'id'],
+                name='comment_complaint_created_idx',
+            ),
+            # a user's comments in the last hour (comment rate limit)
+            models.Index(
+                fields=['user', 'created_at'],
+                name='comment_user_created_idx',
+            ),
+        ]
+
 
 class Like(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
     class Meta:
-        unique_together = ('complaint', 'user')
\ No newline at end of file
+        unique_together = ('complaint', 'user')
+
+class BadWord(models.Model):
+    """Extra words for the spam filter, on top of settings.BAD_WORDS_FILE."""
+    word = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.word
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by ``manage.py run_worker`` (see jobs.py)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField()
+    # a running job whose lease expires is picked up again by another worker
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class ComplaintStat(models.Model):
+    """Complaints created on ``day`` in a category that are now in ``status`` (see stats.py)."""
+    day = models.DateField()
+    # 0 for no category; a plain integer so deleting a category cannot cascade here
+    category_id = models.IntegerField()
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category_id', 'status'], name='complaint_stat_key'),
+        ]
+
+
+class ResolutionStat(models.Model):
+    """Complaints resolved on ``day`` in a category, per resolution-time bucket (see stats.py)."""
+    day = models.DateField()
+    category_id = models.IntegerField()
+    bucket = models.SmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category_id', 'bucket'], name='resolution_stat_key'),
+        ]
@@ -0,0 +1,73 @@
+"""
+Keyset (cursor) pagination over the priority ordering of complaints.
+
+Pages are addressed by the sort key of the last row already shown, so
+fetching page N is one indexed range scan rather than an OFFSET that
+grows with N.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+PAGE_SIZE = 20
+PRIORITY_ORDER = ('-priority_score', '-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(complaint):
+    """Cursor after ``complaint``, a model instance or a ``values()`` row."""
+    if isinstance(complaint, dict):
+        score, created_at, pk = complaint['priority_score'], complaint['created_at'], complaint['id']
+    else:
+        score, created_at, pk = complaint.priority_score, complaint.created_at, complaint.id
+    raw = f"{score}|{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, created_at, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        return int(score), datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _page_queryset(queryset, cursor, page_size):
+    queryset = queryset.order_by(*PRIORITY_ORDER)
+
+    if cursor:
+        score, created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(priority_score__lt=score) |
+            Q(priority_score=score, created_at__lt=created_at) |
+            Q(priority_score=score, created_at=created_at, id__lt=pk)
+        )
+
+    # one extra row tells us whether another page exists
+    return queryset[:page_size + 1]
+
+
+def _split(rows, page_size):
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def priority_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """
+    Return ``(complaints, next_cursor)`` for the page after ``cursor``.
+    ``next_cursor`` is None on the last page.
+    """
+    return _split(list(_page_queryset(queryset, cursor, page_size)), page_size)
+
+
+async def apriority_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """``priority_page`` for async views."""
+    rows = [c async for c in _page_queryset(queryset, cursor, page_size)]
+    return _split(rows, page_size)
@@ -0,0 +1,199 @@
+"""
+Per-action rate limiting backed by Django's cache framework.
+
+Policies come from ``settings.RATE_LIMITS``::
+
+    RATE_LIMITS = {
+        'complaint': {'limit': 3, 'period': 3600, 'algorithm': 'sliding_window'},
+    }
+
+``is_limited()`` is one cache read, so an obvious repeat is turned away
+before the database is touched. ``acquire()`` checks and records an
+action in one step and is what finally admits it.
+
+A limiter is ``atomic`` when its cache is shared by every worker and
+increments atomically (memcached, Redis) and it uses the sliding window.
+The local-memory cache is per process and forgets on restart, and the
+file cache and the token bucket read-modify-write, so for those callers
+must treat the database as the authority (see spam_guard.py).
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# per process, or without an atomic incr()
+LOCAL_CACHES = (LocMemCache, DummyCache, FileBasedCache)
+
+
+def is_shared(cache):
+    """Whether every worker sees ``cache``'s counters and incr() is atomic."""
+    return not isinstance(cache, LOCAL_CACHES)
+
+
+class RateLimiter(ABC):
+    atomic = False
+
+    def __init__(self, cache, action, limit, period):
+        self.cache = cache
+        self.action = action
+        self.limit = limit
+        self.period = period
+
+    def key(self, ident, *parts):
+        return ':'.join(['ratelimit', self.action, str(ident), *map(str, parts)])
+
+    @abstractmethod
+    def is_limited(self, ident, now=None):
+        """Whether one more action would be over the limit."""
+
+    @abstractmethod
+    def hit(self, ident, now=None):
+        """Record one action."""
+
+    @abstractmethod
+    def acquire(self, ident, now=None):
+        """Record one action unless it is over the limit; False if it is."""
+
+    @abstractmethod
+    def release(self, ident, now=None):
+        """Give back an action ``acquire()`` recorded but that did not happen."""
+
+
+class SlidingWindowLimiter(RateLimiter):
+    """
+    Sliding-window counter: the previous fixed window's count is weighted
+    by how much of it still overlaps the trailing ``period`` seconds.
+    """
+
+    def _keys(self, ident, now):
+        window = int(now // self.period)
+        return self.key(ident, window), self.key(ident, window - 1)
+
+    @property
+    def atomic(self):
+        return is_shared(self.cache)
+
+    def count(self, ident, now=None):
+        now = time.time() if now is None else now
+        current, previous = self._keys(ident, now)
+        counts = self.cache.get_many([current, previous])
+
+        overlap = 1 - (now % self.period) / self.period
+        return counts.get(previous, 0) * overlap + counts.get(current, 0)
+
+    def is_limited(self, ident, now=None):
+        return self.count(ident, now) >= self.limit
+
+    def _incr(self, current):
+        self.cache.add(current, 0, timeout=self.period * 2)
+        try:
+            return self.cache.incr(current)
+        except ValueError:
+            # expired between add() and incr()
+            self.cache.set(current, 1, timeout=self.period * 2)
+            return 1
+
+    def hit(self, ident, now=None):
+        now = time.time() if now is None else now
+        current, _ = self._keys(ident, now)
+        self._incr(current)
+
+    def acquire(self, ident, now=None):
+        # increment first: concurrent callers each see a different count
+        now = time.time() if now is None else now
+        current, previous = self._keys(ident, now)
+        count = self._incr(current)
+
+        overlap = 1 - (now % self.period) / self.period
+        if self.cache.get(previous, 0) * overlap + count <= self.limit:
+            return True
+        self.release(ident, now)
+        return False
+
+    def release(self, ident, now=None):
+        now = time.time() if now is None else now
+        current, _ = self._keys(ident, now)
+        try:
+            self.cache.decr(current)
+        except ValueError:
+            # expired meanwhile
+            pass
+
+
+class TokenBucketLimiter(RateLimiter):
+    """
+    ``limit`` tokens, refilled evenly over ``period`` seconds; each action
+    spends one. The bucket is read and written back, so ``acquire()`` is
+    only atomic within a process.
+    """
+
+    _lock = threading.Lock()
+
+    def _tokens(self, ident, now):
+        state = self.cache.get(self.key(ident))
+        if state is None:
+            return float(self.limit)
+
+        tokens, updated = state
+        refill = (now - updated) * self.limit / self.period
+        return min(float(self.limit), tokens + refill)
+
+    def is_limited(self, ident, now=None):
+        now = time.time() if now is None else now
+        return self._tokens(ident, now) < 1
+
+    def hit(self, ident, now=None):
+        now = time.time() if now is None else now
+        tokens = max(0.0, self._tokens(ident, now) - 1)
+        self.cache.set(self.key(ident), (tokens, now), timeout=self.period)
+
+    def acquire(self, ident, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens = self._tokens(ident, now)
+            if tokens < 1:
+                return False
+            self.cache.set(self.key(ident), (tokens - 1, now), timeout=self.period)
+            return True
+
+    def release(self, ident, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens = min(float(self.limit), self._tokens(ident, now) + 1)
+            self.cache.set(self.key(ident), (tokens, now), timeout=self.period)
+
+
+ALGORITHMS = {
+    'sliding_window': SlidingWindowLimiter,
+    'token_bucket': TokenBucketLimiter,
+}
+
+
+def get_limiter(action):
+    policy = settings.RATE_LIMITS[action]
+    limiter_class = ALGORITHMS[policy.get('algorithm', 'sliding_window')]
+
+    return limiter_class(
+        caches[settings.RATE_LIMIT_CACHE],
+        action,
+        policy['limit'],
+        policy['period'],
+    )
+
+
+def is_limited(action, ident):
+    return get_limiter(action).is_limited(ident)
+
+
+def hit(action, ident):
+    get_limiter(action).hit(ident)
+
+
+def acquire(action, ident):
+    return get_limiter(action).acquire(ident)
@@ -0,0 +1,189 @@
+"""
+Full-text search over complaint title, description and address.
+
+SQLite keeps an FTS5 table (external content, rowid = complaint id) in
+sync with triggers, so bulk_create and ``update()`` are covered too.
+Postgres keeps a generated, weighted ``tsvector`` column with a GIN index.
+``install()`` creates either; it is idempotent and also runs after every
+``migrate``, because SQLite drops a table's triggers when a migration
+rebuilds that table.
+
+Ranking is relevance * (1 + SEARCH_PRIORITY_WEIGHT * ln(1 + priority_score)),
+computed for the newest SEARCH_CANDIDATES matches only. Both indexes hand
+out matches in id order and stop early, so a word that matches most of the
+table costs the same as a rare one; older matches of very common queries
+are not returned.
+"""
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'complaints_complaint_fts'
+
+SQLITE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    title, description, address,
+    content='complaints_complaint', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON complaints_complaint BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description, address)
+            VALUES (new.id, new.title, new.description, new.address);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON complaints_complaint BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, address)
+            VALUES ('delete', old.id, old.title, old.description, old.address);
+        END
+    """,
+    # counter updates touch other columns and never reach this trigger
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF title, description, address ON complaints_complaint
+        WHEN old.title IS NOT new.title
+          OR old.description IS NOT new.description
+          OR old.address IS NOT new.address
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, address)
+            VALUES ('delete', old.id, old.title, old.description, old.address);
+            INSERT INTO {FTS_TABLE}(rowid, title, description, address)
+            VALUES (new.id, new.title, new.description, new.address);
+        END
+    """,
+}
+
+POSTGRES_INDEX = [
+    """
+    ALTER TABLE complaints_complaint ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(address, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS complaint_search_idx ON complaints_complaint USING GIN (search_vector)',
+]
+
+TOKEN = re.compile(r'\w+')
+
+
+def install(using=DEFAULT_DB_ALIAS):
+    """Create the search index and its triggers where missing; rebuild it if anything was."""
+    conn = connections[using]
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            for sql in POSTGRES_INDEX:
+                cursor.execute(sql)
+            return
+
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [f'{FTS_TABLE}%']
+        )
+        existing = {name for name, in cursor.fetchall()}
+        missing = [sql for name, sql in SQLITE_TRIGGERS.items() if name not in existing]
+        if FTS_TABLE in existing and not missing:
+            return
+
+        cursor.execute(SQLITE_TABLE)
+        for sql in missing:
+            cursor.execute(sql)
+        # rows written while a trigger was missing are not indexed
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(using=DEFAULT_DB_ALIAS):
+    conn = connections[using]
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute('ALTER TABLE complaints_complaint DROP COLUMN IF EXISTS search_vector')
+            return
+        for name in SQLITE_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def rebuild():
+    """Re-index every complaint (SQLite) or no-op (Postgres: the column is generated)."""
+    if connection.vendor == 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def parse(query, prefix=True):
+    """
+    ``query`` as a backend match expression: every word must match, the
+    last one as a prefix (search as you type). None if it has no words.
+    """
+    words = TOKEN.findall(query.lower())
+    if not words:
+        return None
+
+    if connection.vendor == 'postgresql':
+        terms = list(words)
+        if prefix:
+            terms[-1] += ':*'
+        return ' & '.join(terms)
+
+    terms = [f'"{w}"' for w in words]
+    if prefix:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def ranked_sql(expression, limit, offset=0):
+    """``(sql, params)`` selecting ``(id, score)`` for one page of results, best first."""
+    boost = "(1 + %s * ln(1 + c.priority_score))"
+    page = "ORDER BY score DESC, c.id DESC LIMIT %s OFFSET %s"
+    weight, candidates = settings.SEARCH_PRIORITY_WEIGHT, settings.SEARCH_CANDIDATES
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT c.id, ts_rank_cd(c.search_vector, to_tsquery('simple', %s)) * {boost} AS score "
+            "FROM (SELECT id FROM complaints_complaint "
+            "WHERE search_vector @@ to_tsquery('simple', %s) ORDER BY id DESC LIMIT %s) m "
+            f"JOIN complaints_complaint c ON c.id = m.id {page}"
+        )
+        return sql, [expression, weight, expression, candidates, limit, offset]
+
+    # bm25() is negative, lower is better; title counts most, then description, then address
+    sql = (
+        f"SELECT c.id, m.relevance * {boost} AS score "
+        f"FROM (SELECT rowid AS id, -bm25({FTS_TABLE}, 10.0, 4.0, 2.0) AS relevance FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s) m "
+        f"JOIN complaints_complaint c ON c.id = m.id {page}"
+    )
+    return sql, [weight, expression, candidates, limit, offset]
+
+
+def search(query, limit=20, offset=0):
+    """Ids of the complaints matching ``query``, best first."""
+    expression = parse(query)
+    if expression is None:
+        return []
+
+    sql, params = ranked_sql(expression, limit, offset)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [pk for pk, _ in cursor.fetchall()]
+
+
+def filter_matching(queryset, query):
+    """``queryset`` narrowed to every complaint matching ``query``, unranked."""
+    expression = parse(query)
+    if expression is None:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        sql = "SELECT id FROM complaints_complaint WHERE search_vector @@ to_tsquery('simple', %s)"
+    else:
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    return queryset.filter(id__in=RawSQL(sql, [expression]))
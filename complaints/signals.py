@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import categories, fragments, images, jobs, search, stats, tfidf
+from .changes import mark_changed
+from .badwords import matcher as bad_word_matcher
+from .minhash import bucket_keys
+from .models import BadWord, Category, Comment, Complaint, SimilarityBucket
+
+
+# ================= LSH BUCKETS =================
+@receiver(post_save, sender=Complaint)
+def sync_similarity_buckets(sender, instance, created, raw=False, **kwargs):
+    if raw or not (created or getattr(instance, '_description_changed', False)):
+        return
+
+    if not created:
+        SimilarityBucket.objects.filter(complaint=instance).delete()
+
+    SimilarityBucket.objects.bulk_create([
+        SimilarityBucket(complaint=instance, bucket=key)
+        for key in bucket_keys(bytes(instance.minhash))
+    ])
+
+
+# ================= TF-IDF INDEX =================
+@receiver(post_save, sender=Complaint)
+def index_complaint_text(sender, instance, created, raw=False, **kwargs):
+    if settings.SIMILARITY_BACKEND != 'tfidf' or raw:
+        return
+    if not (created or getattr(instance, '_description_changed', False)):
+        return
+
+    complaint_id, description = instance.pk, instance.description
+    transaction.on_commit(lambda: _compact_when_due(tfidf.get_index().add(complaint_id, description)))
+
+
+@receiver(post_delete, sender=Complaint)
+def unindex_complaint_text(sender, instance, **kwargs):
+    if settings.SIMILARITY_BACKEND != 'tfidf':
+        return
+
+    complaint_id = instance.pk
+    transaction.on_commit(lambda: _compact_when_due(tfidf.get_index().remove(complaint_id)))
+
+
+def _compact_when_due(due):
+    # rewriting the whole index is too slow for the request that happened to fill the delta
+    if due:
+        jobs.enqueue('compact_similarity_index')
+
+
+# ================= LAST-CHANGED STAMP =================
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+def touch_change_stamp(sender, **kwargs):
+    # invalidates heatmap tiles and the point feed's ETag
+    mark_changed()
+
+
+# ================= CARD FRAGMENT CACHE =================
+@receiver(post_save, sender=Complaint)
+def bump_card_version(sender, instance, created, raw=False, **kwargs):
+    # a new row starts at version 0 with nothing cached; a deleted one is never rendered again
+    if created or raw:
+        return
+    fragments.bump(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_parent_card_version(sender, instance, **kwargs):
+    fragments.bump(instance.complaint_id)
+
+
+@receiver(post_save, sender=Category)
+def bump_category_card_versions(sender, instance, created, raw=False, **kwargs):
+    # the category name is part of every card in it
+    if created or raw:
+        return
+    Complaint.objects.filter(category=instance).update(card_version=F('card_version') + 1)
+
+
+# ================= DASHBOARD STATS =================
+@receiver(pre_save, sender=Complaint)
+def remember_stats_row(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._stats_before = None
+    if raw:
+        return
+
+    before = None
+    if not instance._state.adding:
+        if update_fields is not None and not {'status', 'category', 'category_id'} & set(update_fields):
+            # likes, images, duplicate links: nothing the summary counts
+            before = stats.row(instance)
+        else:
+            before = Complaint.objects.filter(pk=instance.pk).values_list(*stats.ROW_FIELDS).first()
+
+    # resolved_at follows the stored status, which only this handler looks up
+    if instance.status != 'resolved':
+        instance.resolved_at = None
+    elif before is None or before[2] != 'resolved':
+        instance.resolved_at = instance.resolved_at or timezone.now()
+
+    instance._stats_before = before
+
+
+@receiver(post_save, sender=Complaint)
+def update_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    after, before = stats.row(instance), getattr(instance, '_stats_before', None)
+    if after != before:
+        stats.record(added=[after], removed=[before] if before else [])
+
+
+@receiver(post_delete, sender=Complaint)
+def remove_from_stats(sender, instance, **kwargs):
+    stats.record(removed=[stats.row(instance)])
+
+
+@receiver(post_delete, sender=Category)
+def move_stats_to_no_category(sender, instance, **kwargs):
+    # its complaints were set to no category with an UPDATE, without signals
+    stats.forget_category(instance.pk)
+
+
+# ================= CATEGORY CACHE =================
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def reload_categories(sender, **kwargs):
+    # after commit, so no process reloads before the change is visible
+    transaction.on_commit(categories.invalidate)
+
+
+# ================= IMAGE DERIVATIVES =================
+@receiver(post_delete, sender=Complaint)
+def delete_image_variants(sender, instance, **kwargs):
+    variants = instance.image_variants
+    transaction.on_commit(lambda: images.delete_variants(variants))
+
+
+# ================= BAD WORDS =================
+@receiver(post_save, sender=BadWord)
+@receiver(post_delete, sender=BadWord)
+def reload_bad_words(sender, **kwargs):
+    # other workers pick the change up within BAD_WORDS_RELOAD_SECONDS
+    bad_word_matcher.invalidate()
+
+
+# ================= SEARCH INDEX =================
+@receiver(post_migrate)
+def repair_search_index(sender, using, **kwargs):
+    # SQLite drops the FTS triggers whenever a migration rebuilds the complaints table
+    connection = connections[using]
+    if sender.name != 'complaints' or connection.vendor != 'sqlite':
+        return
+    if search.FTS_TABLE in connection.introspection.table_names():
+        search.install(using)
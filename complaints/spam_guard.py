@@ -1,59 +1,74 @@
+from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
-from .models import Complaint, Comment
+from . import ratelimit
+from .metrics import timed
+from .badwords import matcher as bad_word_matcher
+from .fingerprint import content_hash, hamming, simhash
+from .models import Comment, Complaint
 
 # ================= SETTINGS =================
 
-COMPLAINT_LIMIT_PER_HOUR = 3
-COMMENT_LIMIT_PER_HOUR = 10
+# posting limits live in settings.RATE_LIMITS; the bad-word list in
+# settings.BAD_WORDS_FILE plus the BadWord table (see badwords.py)
 DUPLICATE_COOLDOWN_MINUTES = 10
-
-BAD_WORDS = [
-    "stupid",
-    "idiot",
-    "nonsense",
-    "abuse",
-    "badword"
-]
-
+SIMHASH_MAX_DISTANCE = 8     # of 64 bits
 
 # ================= BAD WORD CHECK =================
+@timed('spam')
 def contains_bad_words(text: str) -> bool:
-    if not text:
-        return False
-
-    text_lower = text.lower()
-    return any(word in text_lower for word in BAD_WORDS)
+    return bad_word_matcher.contains(text)
 
 
 # ================= COMPLAINT RATE LIMIT =================
+@timed('spam')
 def is_complaint_rate_limited(user) -> bool:
-    one_hour_ago = timezone.now() - timedelta(hours=1)
+    """Early rejection from the cache; ``reserve_complaint`` decides."""
+    return ratelimit.is_limited('complaint', user.pk)
 
-    count = Complaint.objects.filter(
-        user=user,
-        created_at__gte=one_hour_ago
-    ).count()
 
-    return count >= COMPLAINT_LIMIT_PER_HOUR
+def reserve_complaint(user) -> bool:
+    """Count a complaint against the limit, or False if over; call in the transaction that saves it."""
+    return _reserve('complaint', user, Complaint.objects.filter(user=user))
 
 
 # ================= COMMENT RATE LIMIT =================
+@timed('spam')
 def is_comment_rate_limited(user) -> bool:
-    one_hour_ago = timezone.now() - timedelta(hours=1)
+    return ratelimit.is_limited('comment', user.pk)
 
-    count = Comment.objects.filter(
-        user=user,
-        created_at__gte=one_hour_ago
-    ).count()
 
-    return count >= COMMENT_LIMIT_PER_HOUR
+def reserve_comment(user) -> bool:
+    return _reserve('comment', user, Comment.objects.filter(user=user))
+
+
+def _reserve(action, user, rows):
+    limiter = ratelimit.get_limiter(action)
+    if not limiter.acquire(user.pk):
+        return False
+    if limiter.atomic:
+        return True
+
+    # per-process counters: the user's rows in the database are the authority.
+    # The user row lock (BEGIN IMMEDIATE on SQLite) orders concurrent posts.
+    list(User.objects.select_for_update().filter(pk=user.pk).values_list('pk'))
+    since = timezone.now() - timedelta(seconds=limiter.period)
+    if rows.filter(created_at__gte=since).count() < limiter.limit:
+        return True
+    # rejected after all: give the slot back, or the cache would count more than happened
+    limiter.release(user.pk)
+    return False
 
 
 # ================= DUPLICATE COOLDOWN =================
+@timed('spam')
 def is_duplicate_cooldown(user, text) -> bool:
     """
     Prevent same user posting very similar complaint quickly
+
+    An exact normalized-text match is one lookup on the
+    (user, content_hash, created_at) index; otherwise the SimHashes of the
+    user's few recent complaints are compared by Hamming distance.
     """
     if not text:
         return False
@@ -65,10 +80,11 @@ def is_duplicate_cooldown(user, text) -> bool:
         created_at__gte=cooldown_time
     )
 
-    text_lower = text.lower()
-
-    for comp in recent:
-        if comp.description and text_lower in comp.description.lower():
-            return True
+    if recent.filter(content_hash=content_hash(text)).exists():
+        return True
 
-    return False
\ No newline at end of file
+    new_simhash = simhash(text)
+    return any(
+        hamming(new_simhash, other) <= SIMHASH_MAX_DISTANCE
+        for other in recent.values_list('simhash', flat=True)
+    )
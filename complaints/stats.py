@@ -0,0 +1,284 @@
+"""
+Dashboard statistics kept in summary tables instead of GROUP BY over
+every complaint on each page view.
+
+- ComplaintStat: complaints per created day × category × current status.
+- ResolutionStat: resolved complaints per resolution day × category ×
+  resolution-time bucket. Buckets are a quarter of a doubling wide
+  (about 19%), so a median read off them is within about 9%.
+
+Writes are +1/-1 deltas in the same transaction as the complaint change:
+signals cover save() and delete(); the admin status action and
+bulk_create_complaints call ``record()`` themselves. ``rebuild()``
+(``manage.py rebuild_stats``) recomputes both tables from scratch while
+holding the write lock. Every delta is recorded in the transaction that
+changes the complaint (Complaint.save() and bulk_create_complaints open
+one), so a concurrent write either commits before the rebuild reads or
+applies its delta after it; writes that change complaints without a
+delta need ``rebuild_stats`` afterwards.
+
+Reads (``summary()``) touch only the summary tables and are cached
+under the complaints change stamp, so any complaint change invalidates
+them.
+"""
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .changes import last_changed_ns
+from .models import Complaint, ComplaintStat, ResolutionStat
+
+NO_CATEGORY = 0
+
+# a complaint's contribution is computed from these columns
+ROW_FIELDS = ('created_at', 'category_id', 'status', 'resolved_at')
+
+# bucket 0 is "under MIN_HOURS"; bucket b >= 1 covers MIN_HOURS * 2**((b-1)/4) to MIN_HOURS * 2**(b/4)
+MIN_HOURS = 0.25
+BUCKETS_PER_DOUBLING = 4
+MAX_BUCKET = 80   # ~ 130 years, i.e. never
+
+DAILY_DAYS = 30
+
+
+# ================= BUCKETS =================
+def bucket(hours):
+    if hours < MIN_HOURS:
+        return 0
+    return min(MAX_BUCKET, 1 + math.floor(BUCKETS_PER_DOUBLING * math.log2(hours / MIN_HOURS)))
+
+
+def bucket_hours(b):
+    """A representative resolution time for bucket ``b``: its geometric middle."""
+    if b == 0:
+        return MIN_HOURS / 2
+    return MIN_HOURS * 2 ** ((b - 0.5) / BUCKETS_PER_DOUBLING)
+
+
+# ================= INCREMENTAL UPDATES =================
+def _accumulate(rows, sign, status_counts, resolution_counts):
+    for created_at, category_id, status, resolved_at in rows:
+        category_id = category_id or NO_CATEGORY
+        status_counts[timezone.localdate(created_at), category_id, status] += sign
+        if resolved_at is not None:
+            hours = (resolved_at - created_at).total_seconds() / 3600
+            resolution_counts[timezone.localdate(resolved_at), category_id, bucket(hours)] += sign
+
+
+def _upsert(model, key, counts):
+    table = model._meta.db_table
+    sql = (
+        f"INSERT INTO {table} (day, category_id, {key}, count) VALUES (%s, %s, %s, %s) "
+        f"ON CONFLICT (day, category_id, {key}) DO UPDATE SET count = {table}.count + excluded.count"
+    )
+    params = [
+        (connection.ops.adapt_datefield_value(day), category_id, value, n)
+        for (day, category_id, value), n in counts.items() if n
+    ]
+    if params:
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+
+def record(added=(), removed=()):
+    """Add rows to the summary and take others out; rows are tuples in ROW_FIELDS order."""
+    status_counts, resolution_counts = Counter(), Counter()
+    _accumulate(added, 1, status_counts, resolution_counts)
+    _accumulate(removed, -1, status_counts, resolution_counts)
+    _upsert(ComplaintStat, 'status', status_counts)
+    _upsert(ResolutionStat, 'bucket', resolution_counts)
+
+
+def row(complaint):
+    return tuple(getattr(complaint, field) for field in ROW_FIELDS)
+
+
+def forget_category(category_id):
+    """Move a deleted category's counts to NO_CATEGORY, as SET_NULL did to its complaints."""
+    for model, key in ((ComplaintStat, 'status'), (ResolutionStat, 'bucket')):
+        moved = model.objects.filter(category_id=category_id)
+        counts = Counter({
+            (day, NO_CATEGORY, value): n
+            for day, value, n in moved.values_list('day', key, 'count')
+        })
+        moved.delete()
+        _upsert(model, key, counts)
+
+
+# ================= REBUILD =================
+def _partition_counts(start, end):
+    """Both tables' counts for complaints created in [start, end)."""
+    complaints = Complaint.objects.filter(created_at__gte=start, created_at__lt=end)
+    status_counts = Counter({
+        (day, category_id or NO_CATEGORY, status): n
+        for day, category_id, status, n in complaints.annotate(
+            day=TruncDate('created_at'),
+        ).values('day', 'category_id', 'status').annotate(
+            n=Count('id'),
+        ).values_list('day', 'category_id', 'status', 'n').order_by()
+    })
+
+    resolution_counts = Counter()
+    resolved = complaints.filter(resolved_at__isnull=False).values_list(*ROW_FIELDS)
+    _accumulate(resolved.iterator(chunk_size=5000), 1, Counter(), resolution_counts)
+    return status_counts, resolution_counts
+
+
+def _partition_counts_in_thread(bounds):
+    close_old_connections()
+    try:
+        return _partition_counts(*bounds)
+    finally:
+        connection.close()
+
+
+def partitions(days):
+    """``[start, end)`` created_at ranges of ``days`` days covering every complaint."""
+    bounds = Complaint.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None:
+        return []
+    start, step, ranges = bounds['first'], timedelta(days=days), []
+    while start <= bounds['last']:
+        ranges.append((start, start + step))
+        start += step
+    return ranges
+
+
+def _lock_for_rebuild():
+    """Make ``record()`` in other transactions wait until this one ends; readers are not blocked."""
+    if connection.vendor == 'postgresql':
+        tables = ', '.join(model._meta.db_table for model in (ComplaintStat, ResolutionStat))
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {tables} IN EXCLUSIVE MODE')
+    # on SQLite the DELETEs that follow take the database write lock
+
+
+def rebuild(workers=4, partition_days=31):
+    """
+    Recompute both tables, one date partition per task; returns the number
+    of partitions. Complaint writes block until it commits.
+    """
+    with transaction.atomic():
+        _lock_for_rebuild()
+        ComplaintStat.objects.all().delete()
+        ResolutionStat.objects.all().delete()
+
+        # the worker threads read committed rows. A complaint write commits its row and its
+        # delta together, so it is either counted here or waits for the lock and adds it after
+        ranges = partitions(partition_days)
+        status_counts, resolution_counts = Counter(), Counter()
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_partition_counts_in_thread, ranges))
+        else:
+            results = [_partition_counts(*r) for r in ranges]
+
+        for partial_status, partial_resolution in results:
+            status_counts.update(partial_status)
+            resolution_counts.update(partial_resolution)
+
+        ComplaintStat.objects.bulk_create(
+            [ComplaintStat(day=d, category_id=c, status=s, count=n) for (d, c, s), n in status_counts.items()],
+            batch_size=5000,
+        )
+        ResolutionStat.objects.bulk_create(
+            [ResolutionStat(day=d, category_id=c, bucket=b, count=n) for (d, c, b), n in resolution_counts.items()],
+            batch_size=5000,
+        )
+    return len(ranges)
+
+
+# ================= READS =================
+def parse_filters(params):
+    """``(category_id, since, until)`` from request parameters; ValueError if malformed."""
+    category = params.get('category')
+    category_id = int(category) if category else None
+
+    days = []
+    for param in ('since', 'until'):
+        value = params.get(param)
+        day = parse_date(value) if value else None
+        if value and day is None:
+            raise ValueError(f"Invalid {param} date")
+        days.append(day)
+    return category_id, *days
+
+
+def _filtered(model, category_id, since, until):
+    rows = model.objects.all()
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    if since:
+        rows = rows.filter(day__gte=since)
+    if until:
+        rows = rows.filter(day__lte=until)
+    return rows
+
+
+def median_hours(counts):
+    """Median of ``{bucket: count}``, or None if empty."""
+    total = sum(counts.values())
+    if not total:
+        return None
+    seen = 0
+    for b in sorted(counts):
+        seen += counts[b]
+        if seen * 2 >= total:
+            return bucket_hours(b)
+
+
+def _summary(category_id, since, until):
+    complaints = _filtered(ComplaintStat, category_id, since, until)
+    by_status = dict(complaints.values_list('status').annotate(n=Sum('count')).order_by())
+    by_category = Counter()
+    for cat, status, n in complaints.values_list('category_id', 'status').annotate(n=Sum('count')).order_by():
+        by_category[cat, status] = n
+
+    # the last DAILY_DAYS days of the range
+    last_day = until or timezone.localdate()
+    first_day = last_day - timedelta(days=DAILY_DAYS - 1)
+    if since and since > first_day:
+        first_day = since
+    daily = Counter()
+    for day, status, n in _filtered(ComplaintStat, category_id, first_day, last_day).values_list(
+        'day', 'status'
+    ).annotate(n=Sum('count')).order_by():
+        daily[day, status] = n
+
+    resolutions = dict(
+        _filtered(ResolutionStat, category_id, since, until).values_list('bucket').annotate(n=Sum('count')).order_by()
+    )
+
+    statuses = [value for value, _ in Complaint.STATUS_CHOICES]
+    categories = sorted({cat for cat, _ in by_category})
+    return {
+        'by_status': {s: by_status.get(s, 0) for s in statuses},
+        'total': sum(by_status.values()),
+        'by_category': {cat: {s: by_category[cat, s] for s in statuses} for cat in categories},
+        'daily': [
+            {'day': day.isoformat(), **{s: daily[day, s] for s in statuses}}
+            for day in (first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1))
+        ],
+        'resolved': sum(resolutions.values()),
+        'median_resolution_hours': median_hours(resolutions),
+    }
+
+
+def summary(category_id=None, since=None, until=None):
+    """Counts by status, by category and per day, and the median resolution time; cached."""
+    key = f'stats:{last_changed_ns()}:{category_id}:{since}:{until}:{timezone.localdate()}'
+    result = cache.get(key)
+    if result is None:
+        result = _summary(category_id, since, until)
+        cache.set(key, result, settings.STATS_CACHE_SECONDS)
+    return result
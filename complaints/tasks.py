@@ -0,0 +1,35 @@
+"""Background tasks run by ``manage.py run_worker`` (see jobs.py)."""
+from . import fragments, tfidf
+from .jobs import task
+from .models import Complaint
+from .utils import find_similar_complaint
+
+
+@task('detect_duplicate')
+def detect_duplicate(complaint_id):
+    """Look for a similar complaint nearby and record it on the complaint."""
+    complaint = Complaint.objects.filter(pk=complaint_id).only(
+        'id', 'description', 'latitude', 'longitude'
+    ).first()
+
+    if complaint is None or complaint.latitude is None or complaint.longitude is None:
+        return
+
+    match, score = find_similar_complaint(
+        complaint.description,
+        complaint.latitude,
+        complaint.longitude,
+        before_id=complaint.id
+    )
+
+    Complaint.objects.filter(pk=complaint_id).update(
+        similar_to=match,
+        similarity_score=score if match else None,
+    )
+    fragments.bump(complaint_id)
+
+
+@task('compact_similarity_index')
+def compact_similarity_index():
+    """Merge the TF-IDF index's delta into a new base generation."""
+    tfidf.get_index().compact()
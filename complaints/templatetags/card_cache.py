@@ -0,0 +1,37 @@
+from django import template
+
+from complaints import fragments
+
+register = template.Library()
+
+
+class CardCacheNode(template.Node):
+    def __init__(self, nodelist, complaint, part):
+        self.nodelist = nodelist
+        self.complaint = complaint
+        self.part = part
+
+    def render(self, context):
+        return fragments.cached(
+            self.complaint.resolve(context),
+            self.part.resolve(context),
+            lambda: self.nodelist.render(context)
+        )
+
+
+@register.tag('cardcache')
+def do_cardcache(parser, token):
+    """
+    Cache the enclosed, visitor-independent part of a complaint card::
+
+        {% cardcache c "header" %} ... {% endcardcache %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' takes a complaint and a fragment name"
+        )
+
+    nodelist = parser.parse(('endcardcache',))
+    parser.delete_first_token()
+    return CardCacheNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
@@ -1,3 +1,790 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+from io import BytesIO, StringIO
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import categories, counters, fragments, images, jobs, likes, metrics, ratelimit, search, stats, tfidf
+from .admin import EstimatedCountPaginator
+from .badwords import Automaton, matcher as bad_word_matcher, normalize
+from .changes import mark_changed
+from .minhash import signature
+from .models import BadWord, Category, Comment, Complaint, ComplaintStat, Job, Like, ResolutionStat
+from .spam_guard import DUPLICATE_COOLDOWN_MINUTES, is_duplicate_cooldown, reserve_complaint
+from .utils import bulk_create_complaints, find_similar_complaint
+from .views import LATEST_COMMENTS, POINT_RECORD, STATUS_CODES
+
+
+class ComplaintListQueryTests(TestCase):
+
+    def setUp(self):
+        # ids are reused after each test's rollback, so cached cards would leak between tests
+        cache.clear()
+        self.viewer = User.objects.create_user('viewer', password='pass12345')
+        # the category cache reloads on commit; a test never commits, so run the hook here
+        # and load the cache now rather than inside the first measured request
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name="Road Damage")
+        categories.get_categories()
+
+    def make_complaints(self, n, comments_each=5):
+        for i in range(n):
+            author = User.objects.create_user(f'author{Complaint.objects.count()}')
+            complaint = Complaint.objects.create(
+                user=author,
+                title=f"Complaint {i}",
+                description=f"Road damaged near square {i}",
+                category=self.category,
+            )
+            for j in range(comments_each):
+                Comment.objects.create(complaint=complaint, user=author, text=f"comment {j}")
+            complaint.comments_count = comments_each
+            complaint.save()
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('complaint_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_does_not_grow_with_complaints(self):
+        self.client.force_login(self.viewer)
+
+        self.make_complaints(2)
+        few, _ = self.count_list_queries()
+
+        self.make_complaints(12)
+        many, _ = self.count_list_queries()
+
+        self.assertEqual(few, many)
+
+    def test_only_latest_comments_are_rendered(self):
+        self.make_complaints(1, comments_each=LATEST_COMMENTS + 2)
+
+        _, response = self.count_list_queries()
+        card = response.context['complaints'][0]
+
+        self.assertEqual(
+            [c.text for c in card.latest_comments],
+            [f"comment {j}" for j in range(2, LATEST_COMMENTS + 2)],
+        )
+        self.assertEqual(card.more_comments, 2)
+        self.assertContains(response, "Show 2 earlier comments")
+
+    def test_cached_card_follows_the_version_in_the_row(self):
+        self.make_complaints(1, comments_each=0)
+        complaint = Complaint.objects.get()
+        self.count_list_queries()
+
+        # as another worker would: the row changes, this process's cache is untouched
+        Complaint.objects.filter(pk=complaint.pk).update(title="Renamed")
+        self.assertNotIn(b"Renamed", self.count_list_queries()[1].content)
+        fragments.bump(complaint.pk)
+        self.assertIn(b"Renamed", self.count_list_queries()[1].content)
+
+
+class ComplaintListPagingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('pager')
+        bulk_create_complaints([
+            Complaint(user=user, title=f"C{i}", description=f"d{i}", likes_count=i % 3) for i in range(47)
+        ])
+        # ties on both priority_score and created_at, so only the id decides
+        stamp = timezone.now() - timedelta(days=1)
+        Complaint.objects.filter(id__in=list(Complaint.objects.values_list('id', flat=True))[::2]).update(
+            created_at=stamp
+        )
+
+    def card_ids(self, html):
+        return [int(pk) for pk in re.findall(r'id="like-count-(\d+)"', html)]
+
+    def test_cursor_pages_cover_every_complaint_once_in_order(self):
+        response = self.client.get(reverse('complaint_list'))
+        seen = self.card_ids(response.content.decode())
+        cursor = response.context['next_cursor']
+
+        while cursor:
+            data = self.client.get(reverse('complaint_list_more'), {'cursor': cursor}).json()
+            seen += self.card_ids(data['html'])
+            self.assertEqual(data['count'], len(self.card_ids(data['html'])))
+            cursor = data['next_cursor']
+
+        expected = list(Complaint.objects.order_by('-priority_score', '-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 47)
+
+
+class ComplaintApiTests(TestCase):
+
+    def setUp(self):
+        self.viewer = User.objects.create_user('viewer', password='pass12345')
+        author = User.objects.create_user('author')
+        self.complaints = [
+            Complaint.objects.create(user=author, title=f"Complaint {i}", description=f"Pothole {i}")
+            for i in range(6)
+        ]
+        Like.objects.create(user=self.viewer, complaint=self.complaints[0])
+        self.client.force_login(self.viewer)
+
+    def get_page(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api_complaints'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_page_has_like_state_in_constant_queries(self):
+        few, _ = self.get_page(page_size=2)
+        many, data = self.get_page(page_size=6)
+
+        self.assertEqual(few, many)
+        liked = {c['id'] for c in data['complaints'] if c['liked']}
+        self.assertEqual(liked, {self.complaints[0].id})
+
+    def test_cursor_walks_every_complaint_once(self):
+        seen, cursor = [], ''
+        while True:
+            _, data = self.get_page(page_size=4, cursor=cursor)
+            seen += [c['id'] for c in data['complaints']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(sorted(seen), sorted(c.id for c in self.complaints))
+
+    def test_bulk_fetch_and_toggle(self):
+        ids = [self.complaints[1].id, self.complaints[0].id, 999999]
+
+        response = self.client.get(reverse('api_complaints_bulk'), {'ids': ','.join(map(str, ids))})
+        self.assertEqual([c['id'] for c in response.json()['complaints']], ids[:2])
+        self.assertEqual(response.json()['missing'], [999999])
+
+        response = self.client.post(
+            reverse('api_likes_bulk'), {'ids': ids}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['likes'],
+            [{'id': ids[0], 'liked': True, 'likes': 1}, {'id': ids[1], 'liked': False, 'likes': 0}],
+        )
+        self.assertEqual(
+            list(Like.objects.filter(user=self.viewer).values_list('complaint_id', flat=True)),
+            [ids[0]],
+        )
+
+    def test_single_toggle_keeps_the_count(self):
+        url = reverse('toggle_like', args=[self.complaints[1].id])
+        self.assertEqual(self.client.post(url).json(), {'liked': True, 'likes_count': 1})
+        self.assertEqual(self.client.post(url).json(), {'liked': False, 'likes_count': 0})
+        self.assertEqual(self.client.post(reverse('toggle_like', args=[999999])).status_code, 404)
+
+        with mock.patch.object(likes, 'toggle_many', wraps=likes.toggle_many) as toggle:
+            self.client.post(url)
+        toggle.assert_called_once_with(self.viewer, [self.complaints[1].id])
+        self.assertEqual(Complaint.objects.get(id=self.complaints[1].id).likes_count, 1)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+
+    def complaint(self, title, description, **fields):
+        return Complaint.objects.create(user=self.author, title=title, description=description, **fields)
+
+    def test_title_matches_rank_first_and_priority_lifts(self):
+        in_description = self.complaint("Road issue", "Big pothole near the bus stand")
+        in_title = self.complaint("Pothole near bus stand", "Road is damaged")
+        self.complaint("Garbage", "Not collected")
+
+        self.assertEqual(search.search("pothole"), [in_title.id, in_description.id])
+        self.assertEqual(search.search("bus pot"), [in_title.id, in_description.id])
+
+        Complaint.objects.filter(id=in_description.id).update(priority_score=500)
+        self.assertEqual(search.search("pothole")[0], in_description.id)
+
+    def test_index_follows_updates_and_deletes(self):
+        complaint = self.complaint("Water leak", "Pipeline leaking in Deopur")
+
+        Complaint.objects.filter(id=complaint.id).update(address="Sakri road")
+        self.assertEqual(search.search("sakri"), [complaint.id])
+
+        complaint.refresh_from_db()
+        complaint.description = "Fixed now"
+        complaint.save()
+        self.assertEqual(search.search("deopur"), [])
+
+        complaint.delete()
+        self.assertEqual(search.search("water"), [])
+
+    def test_admin_search_uses_the_index(self):
+        admin = User.objects.create_superuser('admin', password='pass12345')
+        match = self.complaint("Street light not working", "Dark lane")
+        self.complaint("Garbage", "Not collected")
+        self.client.force_login(admin)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin:complaints_complaint_changelist'), {'q': 'street lig'})
+
+        self.assertEqual(list(response.context['cl'].result_list), [match])
+        self.assertFalse(any(' LIKE ' in q['sql'] for q in ctx.captured_queries))
+
+
+class CounterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('counter')
+        self.complaints = [
+            Complaint.objects.create(user=self.user, title=f"C{i}", description=f"D{i}") for i in range(2)
+        ]
+
+    def counts(self, complaint):
+        return tuple(Complaint.objects.filter(pk=complaint.pk).values_list(
+            'likes_count', 'comments_count', 'priority_score').get())
+
+    def test_increments_are_single_updates(self):
+        first, second = self.complaints
+        stale = Complaint.objects.get(pk=first.pk)
+
+        with CaptureQueriesContext(connection) as ctx:
+            counters.bump(first.pk, likes=1)
+            counters.bump(first.pk, likes=1, comments=1)
+            counters.bump_many({first.pk: (-5, 0), second.pk: (2, 3)})
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertTrue(all(q['sql'].startswith('UPDATE') for q in ctx.captured_queries))
+
+        # the UPDATEs read the row, not a stale instance; likes never go below zero
+        self.assertEqual(stale.likes_count, 0)
+        self.assertEqual(self.counts(first), (0, 1, Complaint.COMMENT_WEIGHT))
+        self.assertEqual(self.counts(second), (2, 3, 2 * Complaint.LIKE_WEIGHT + 3 * Complaint.COMMENT_WEIGHT))
+
+    @override_settings(COUNTER_WRITE_BEHIND=True, COUNTER_FLUSH_INTERVAL=3600, COUNTER_FLUSH_SIZE=3)
+    def test_write_behind_buffers_until_flushed(self):
+        first, second = self.complaints
+        counters.bump(first.pk, likes=1)
+        counters.bump(second.pk, comments=1)
+
+        self.assertEqual(self.counts(first), (0, 0, 0))
+        self.assertEqual(counters.pending(first.pk), (1, 0))
+
+        # the third event reaches COUNTER_FLUSH_SIZE
+        counters.bump(first.pk, likes=1)
+        self.assertEqual(counters.pending(first.pk), (0, 0))
+        self.assertEqual(self.counts(first), (2, 0, 2 * Complaint.LIKE_WEIGHT))
+        self.assertEqual(self.counts(second), (0, 1, Complaint.COMMENT_WEIGHT))
+
+        counters.bump(second.pk, likes=1)
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(self.counts(second)[0], 1)
+
+    def test_reconcile_fixes_drift(self):
+        first, second = self.complaints
+        Like.objects.create(user=self.user, complaint=first)
+        Comment.objects.create(user=self.user, complaint=first, text="same here")
+        Complaint.objects.filter(pk=first.pk).update(likes_count=7, comments_count=0, priority_score=0)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn("1 out of sync", out.getvalue())
+        self.assertEqual(self.counts(first)[0], 7)
+
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.counts(first), (1, 1, Complaint.LIKE_WEIGHT + Complaint.COMMENT_WEIGHT))
+        self.assertEqual(self.counts(second), (0, 0, 0))
+
+
+class StatsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('ward', password='pass12345')
+        # the category cache reloads on commit, which TestCase never reaches
+        with self.captureOnCommitCallbacks(execute=True):
+            self.roads = Category.objects.create(name="Roads")
+            self.water = Category.objects.create(name="Water")
+        categories.get_categories()
+
+    def snapshot(self):
+        return (
+            sorted(ComplaintStat.objects.exclude(count=0).values_list('day', 'category_id', 'status', 'count')),
+            sorted(ResolutionStat.objects.exclude(count=0).values_list('day', 'category_id', 'bucket', 'count')),
+        )
+
+    def test_incremental_updates_match_a_rebuild(self):
+        pothole = Complaint.objects.create(user=self.user, title="Pothole", description="Deep", category=self.roads)
+        leak = Complaint.objects.create(user=self.user, title="Leak", description="Pipe", category=self.water)
+        gone = Complaint.objects.create(user=self.user, title="Gone", description="Gone", status='progress')
+        bulk_create_complaints([Complaint(user=self.user, title="Bulk", description="Bulk", category=self.water)])
+
+        pothole.status = 'resolved'
+        pothole.save()
+        leak.category = self.roads
+        leak.save()
+        leak.likes_count = 4
+        leak.save(update_fields=['likes_count'])
+        gone.delete()
+        self.water.delete()
+
+        self.assertIsNotNone(Complaint.objects.get(pk=pothole.pk).resolved_at)
+        incremental = self.snapshot()
+        stats.rebuild(workers=1)
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(sum(n for *_, n in incremental[0]), 3)
+
+    def test_summary_and_page_read_only_the_summary(self):
+        complaint = Complaint.objects.create(user=self.user, title="Pothole", description="Deep", category=self.roads)
+        Complaint.objects.filter(pk=complaint.pk).update(created_at=timezone.now() - timedelta(hours=10))
+        complaint.refresh_from_db()
+        complaint.status = 'resolved'
+        complaint.save()
+        Complaint.objects.create(user=self.user, title="Leak", description="Pipe")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('complaints_complaint"' in q['sql'] for q in ctx.captured_queries))
+
+        summary = response.context['summary']
+        self.assertEqual(summary['by_status'], {'pending': 1, 'progress': 0, 'resolved': 1})
+        self.assertEqual(summary['by_category'][self.roads.pk]['resolved'], 1)
+        self.assertAlmostEqual(summary['median_resolution_hours'], 10, delta=1)
+
+        data = self.client.get(reverse('api_stats'), {'category': self.roads.pk}).json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['by_category'], [{'category': "Roads", 'category_id': self.roads.pk,
+                                               'pending': 0, 'progress': 0, 'resolved': 1}])
+
+
+class ComplaintAdminTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='pass12345')
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:complaints_complaint_changelist')
+        self.add_complaints(3)
+
+    def add_complaints(self, n):
+        for i in range(n):
+            user = User.objects.create_user(f'citizen{Complaint.objects.count()}')
+            Complaint.objects.create(
+                user=user, title=f"Pothole {i}", description="Deep pothole",
+                category=Category.objects.create(name=f"Roads {i}"),
+            )
+
+    def changelist_queries(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries]
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        few = self.changelist_queries()
+        self.add_complaints(20)
+        self.assertEqual(len(self.changelist_queries()), len(few))
+
+    def test_large_unfiltered_changelist_is_not_counted(self):
+        with mock.patch.object(EstimatedCountPaginator, 'exact_below', 0):
+            queries = self.changelist_queries()
+            self.assertFalse(any('COUNT(' in sql and 'complaints_complaint' in sql for sql in queries))
+            # a filtered list is small enough to count exactly
+            filtered = self.changelist_queries({'status__exact': 'pending'})
+            self.assertTrue(any('COUNT(' in sql for sql in filtered))
+
+    def test_status_action_is_one_update(self):
+        complaints = list(Complaint.objects.order_by('id'))
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.url, {
+                'action': 'mark_resolved',
+                '_selected_action': [c.pk for c in complaints[:2]],
+            })
+
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "complaints_complaint"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(list(Complaint.objects.filter(status='resolved')), complaints[:2])
+        versions = dict(Complaint.objects.values_list('id', 'card_version'))
+        self.assertEqual(versions[complaints[0].pk], complaints[0].card_version + 1)
+        self.assertEqual(versions[complaints[2].pk], complaints[2].card_version)
+
+
+class BenchCommandTests(TestCase):
+
+    def test_seed_bench_and_bench_run(self):
+        call_command('seed_bench', complaints=200, users=20, stdout=StringIO())
+        self.assertEqual(Complaint.objects.count(), 200)
+        self.assertTrue(Like.objects.exists())
+
+        out = StringIO()
+        call_command('bench', iterations=3, warmup=1, baseline='/nonexistent/baseline.json', stdout=out)
+        for scenario in ('complaint_list', 'post_complaint:bad_words', 'toggle_like', 'add_comment'):
+            self.assertIn(scenario, out.getvalue())
+        # bench rolls its writes back
+        self.assertEqual(Complaint.objects.count(), 200)
+
+        call_command('seed_bench', complaints=0, clear=True, stdout=StringIO())
+        self.assertFalse(Complaint.objects.exists())
+
+
+class ExportImportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('ward', password='pass12345')
+        category = Category.objects.create(name="Roads")
+        Complaint.objects.create(
+            user=self.user, title="Pothole", description="Deep pothole, \"urgent\"\nnear the bus stand",
+            category=category, latitude=20.9, longitude=74.77, likes_count=2, comments_count=1,
+        )
+        Complaint.objects.create(user=self.user, title="Garbage", description="Not collected", status='resolved')
+
+    def test_round_trip(self):
+        for fmt in ('csv', 'ndjson'):
+            with self.subTest(fmt=fmt), tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, f'complaints.{fmt}')
+                before = list(Complaint.objects.order_by('id').values(
+                    'title', 'description', 'status', 'category__name', 'latitude', 'created_at',
+                    'priority_score', 'content_hash', 'simhash', 'grid_cell',
+                ))
+                call_command('export_complaints', path, chunk_size=1, stdout=StringIO())
+
+                Complaint.objects.all().delete()
+                User.objects.all().delete()
+                call_command('import_complaints', path, batch_size=1, create_users=True, stdout=StringIO())
+
+                after = list(Complaint.objects.order_by('id').values(*before[0]))
+                self.assertEqual(after, before)
+                self.assertEqual(User.objects.get().username, 'ward')
+
+    def test_bulk_create_keeps_created_at(self):
+        old = timezone.now() - timedelta(days=30)
+        [imported] = bulk_create_complaints([Complaint(user=self.user, title="Old", description="Old", created_at=old)])
+        fresh = Complaint.objects.create(user=self.user, title="New", description="New")
+
+        self.assertEqual(Complaint.objects.get(pk=imported.pk).created_at, old)
+        self.assertGreater(fresh.created_at, old + timedelta(days=29))
+
+    def test_download_needs_staff(self):
+        url = reverse('export_complaints')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url, {'status': 'resolved'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:4], ['id', 'title', 'description', 'status'])
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Garbage', lines[1])
+
+
+class ImageTests(TestCase):
+    def test_original_loses_its_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"
+        exif[0x8825] = {1: 'N', 2: (20.0, 54.0, 12.0)}   # GPS
+        buf = BytesIO()
+        xmp = b'<x:xmpmeta xmlns:x="adobe:ns:meta/"><exif:GPSLatitude>20,54.2N</exif:GPSLatitude></x:xmpmeta>'
+        Image.new('RGB', (1200, 900), 'red').save(buf, 'JPEG', exif=exif, xmp=xmp)
+
+        user = User.objects.create_user('snapper')
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            complaint = Complaint.objects.create(
+                user=user, title="Pothole", description="Deep",
+                image=SimpleUploadedFile('photo.jpg', buf.getvalue(), content_type='image/jpeg'),
+            )
+            uploaded = complaint.image.name
+            with Image.open(os.path.join(media, uploaded)) as original:
+                self.assertIn('xmp', original.info)
+
+            variants = images.process_complaint_image(complaint.id)
+            complaint.refresh_from_db()
+            with Image.open(os.path.join(media, complaint.image.name)) as stored:
+                self.assertEqual(dict(stored.getexif()), {})
+                self.assertNotIn('xmp', stored.info)
+                self.assertEqual(stored.size, (1200, 900))
+            self.assertFalse(os.path.exists(os.path.join(media, uploaded)))
+
+        self.assertEqual(set(variants), set(images.VARIANTS))
+
+    def test_failed_save_keeps_the_photo(self):
+        buf = BytesIO()
+        Image.new('RGB', (64, 64), 'blue').save(buf, 'JPEG')
+        user = User.objects.create_user('snapper')
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            complaint = Complaint.objects.create(
+                user=user, title="Pothole", description="Deep",
+                image=SimpleUploadedFile('photo.jpg', buf.getvalue(), content_type='image/jpeg'),
+            )
+            complaint = Complaint.objects.get(pk=complaint.pk)
+            name = complaint.image.name
+            with mock.patch.object(complaint.image.storage, 'save', side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    images.strip_metadata(complaint)
+            self.assertTrue(os.path.exists(os.path.join(media, name)))
+            self.assertEqual(Complaint.objects.get(pk=complaint.pk).image.name, name)
+
+    def test_worker_errors_are_logged(self):
+        with override_settings(IMAGE_WORKERS=1), \
+                mock.patch.object(images, 'process_complaint_image', side_effect=RuntimeError("boom")), \
+                self.assertLogs('complaints.images', 'ERROR'):
+            images._submit(0)
+            images._get_executor().submit(lambda: None).result()
+
+
+class JobTests(TestCase):
+    def test_expired_lease_is_retried_until_attempts_run_out(self):
+        job = jobs.enqueue('detect_duplicate', max_attempts=2, complaint_id=0)
+        expired = timezone.now() - timedelta(seconds=1)
+
+        self.assertEqual([j.id for j in jobs.claim('w1')], [job.id])
+        Job.objects.filter(id=job.id).update(locked_until=expired)
+        self.assertEqual([j.id for j in jobs.claim('w2')], [job.id])
+
+        # the second worker died too: no third run
+        Job.objects.filter(id=job.id).update(locked_until=expired)
+        with self.assertLogs('complaints.jobs', 'WARNING'):
+            self.assertEqual(jobs.claim('w3'), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+
+class HeatmapTests(TestCase):
+    def test_bad_bbox_is_a_400(self):
+        url = reverse('heatmap_tiles')
+        for bbox in ('20.8,74.6,21,inf', 'nan,74.6,21,74.9', '-1e300,-1e300,1e300,1e300', '21,74.6,20.8,74.9', '0,0,60,170'):
+            with self.subTest(bbox=bbox):
+                self.assertEqual(self.client.get(url, {'zoom': 13, 'bbox': bbox}).status_code, 400)
+
+        self.assertEqual(self.client.get(url, {'zoom': 13, 'bbox': '20.85,74.7,20.95,74.8'}).status_code, 200)
+
+    def test_point_feed_formats_and_conditional_get(self):
+        user = User.objects.create_user('mapper')
+        Complaint.objects.create(user=user, title="A", description="a", latitude=20.9, longitude=74.77)
+        Complaint.objects.create(user=user, title="B", description="b", latitude=20.91, longitude=74.78, status='resolved')
+        Complaint.objects.create(user=user, title="No place", description="c")
+        url = reverse('heatmap_points_feed')
+
+        response = self.client.get(url)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(lat, lon, status) for lat, lon, status, _ in lines],
+                         [(20.9, 74.77, 'pending'), (20.91, 74.78, 'resolved')])
+
+        body = b''.join(self.client.get(url, {'format': 'bin'}).streaming_content)
+        records = list(POINT_RECORD.iter_unpack(body))
+        self.assertEqual(len(records), 2)
+        self.assertAlmostEqual(records[1][0], 20.91, places=5)
+        self.assertEqual(records[1][3], STATUS_CODES['resolved'])
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # another format or filter is another representation
+        self.assertEqual(self.client.get(url, {'format': 'bin'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        mark_changed()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class SimilarityTests(TestCase):
+    def test_fingerprints_follow_only_the_description(self):
+        user = User.objects.create_user('editor')
+        complaint = Complaint.objects.create(user=user, title="Pothole", description="Deep pothole near school")
+        complaint = Complaint.objects.get(pk=complaint.pk)
+
+        with mock.patch('complaints.models.signature', wraps=signature) as sign:
+            complaint.status = 'progress'
+            complaint.save(update_fields=['status'])
+            complaint.title = "Pothole on MG road"
+            complaint.save()
+            self.assertEqual(sign.call_count, 0)
+
+            before = complaint.simhash
+            complaint.description = "Deep pothole near the girls' school gate"
+            complaint.save()
+            self.assertEqual(sign.call_count, 1)
+
+        complaint.refresh_from_db()
+        self.assertNotEqual(complaint.simhash, before)
+        self.assertEqual(bytes(complaint.minhash), signature(complaint.description))
+
+    def test_tfidf_finds_a_neighbour_behind_many_distant_matches(self):
+        user = User.objects.create_user('reporter', password='x')
+        text = "Garbage has not been collected near the bus stand for a week"
+        far = [
+            Complaint(user=user, title="far", description=text, latitude=21.1, longitude=74.77)
+            for _ in range(tfidf.MAX_CANDIDATES + 1)
+        ]
+        near = Complaint(user=user, title="near", description=text, latitude=20.9, longitude=74.77)
+        bulk_create_complaints(far + [near])
+
+        with tempfile.TemporaryDirectory() as path, \
+                override_settings(SIMILARITY_BACKEND='tfidf', SIMILARITY_INDEX_DIR=path):
+            tfidf.get_index().rebuild(Complaint.objects.values_list('id', 'description'))
+            match, score = find_similar_complaint(text, 20.901, 74.77)
+
+        self.assertEqual(match.title, "near")
+        self.assertGreater(score, 0.7)
+
+    def test_compaction_is_queued_not_run_in_the_request(self):
+        user = User.objects.create_user('reporter', password='x')
+        with tempfile.TemporaryDirectory() as path, \
+                override_settings(SIMILARITY_BACKEND='tfidf', SIMILARITY_INDEX_DIR=path), \
+                mock.patch.object(tfidf, 'COMPACT_AFTER', 2):
+            for i in range(3):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Complaint.objects.create(user=user, title=f"c{i}", description=f"Broken street light {i}")
+
+            index = tfidf.get_index()
+            self.assertIsNone(index.snapshot()[0])
+            job = Job.objects.get(task='compact_similarity_index')
+
+            jobs.run(jobs.claim('w1')[0])
+            base, delta = index.snapshot()
+            self.assertEqual(len(base['ids']), 3)
+            self.assertEqual(len(delta['ids']), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+
+
+class BadWordTests(TestCase):
+    def test_obfuscated_words_match(self):
+        automaton = Automaton(["kill", "stupid", "फ़ालतू"])
+        for text in (
+            "I will ｋｉｌｌ you",           # fullwidth, NFKC
+            "k\u200bi\u200dll",             # zero-width characters
+            "K.I.L.L",                      # separators
+            "s7up1d",                       # leetspeak
+            "killll them",                  # stretched
+            "stuuuuupid",
+            "फालतू काम",                    # without the nukta
+            "\u095eालतू",                   # precomposed nukta letter
+        ):
+            with self.subTest(text=text):
+                self.assertTrue(automaton.contains(text))
+
+        self.assertFalse(automaton.contains("skilful work on the road"))
+        self.assertEqual(normalize("Heeeelp"), "heelp")
+
+    @override_settings(BAD_WORDS_FILE='/nonexistent/bad_words.txt')
+    def test_table_changes_apply_without_restart(self):
+        self.assertFalse(bad_word_matcher.contains("what a scoundrel"))
+        word = BadWord.objects.create(word="scoundrel")
+        self.assertTrue(bad_word_matcher.contains("what a scoundrel"))
+        word.delete()
+        self.assertFalse(bad_word_matcher.contains("what a scoundrel"))
+
+
+class DuplicateCooldownTests(TestCase):
+    TEXT = (
+        "Street light on Station Road near the post office has not worked "
+        "for two weeks, the lane is completely dark at night"
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user('repeater')
+        self.complaint = Complaint.objects.create(user=self.user, title="Light", description=self.TEXT)
+
+    def test_exact_repeat_after_normalization(self):
+        self.assertTrue(is_duplicate_cooldown(self.user, f"  {self.TEXT.upper()} "))
+        self.assertFalse(is_duplicate_cooldown(User.objects.create_user('neighbour'), self.TEXT))
+
+    def test_near_duplicate_within_simhash_distance(self):
+        self.assertTrue(is_duplicate_cooldown(self.user, self.TEXT.replace("two", "three")))
+        self.assertFalse(is_duplicate_cooldown(
+            self.user, "Garbage is piling up behind the vegetable market and nobody has collected it"
+        ))
+
+    def test_cooldown_expires(self):
+        Complaint.objects.filter(pk=self.complaint.pk).update(
+            created_at=timezone.now() - timedelta(minutes=DUPLICATE_COOLDOWN_MINUTES, seconds=1)
+        )
+        self.assertFalse(is_duplicate_cooldown(self.user, self.TEXT))
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('poster', password='x')
+
+    def test_acquire_stops_at_the_limit(self):
+        limiter = ratelimit.get_limiter('complaint')
+        self.assertEqual([limiter.acquire(self.user.pk) for _ in range(limiter.limit + 1)][-2:], [True, False])
+        self.assertTrue(limiter.is_limited(self.user.pk))
+
+    def test_database_decides_when_the_cache_is_per_process(self):
+        self.assertFalse(ratelimit.get_limiter('complaint').atomic)
+        # posted through another worker: this process's cache has not seen them
+        for i in range(3):
+            Complaint.objects.create(user=self.user, title=f"c{i}", description="d")
+        self.assertFalse(reserve_complaint(self.user))
+
+        limiter = ratelimit.get_limiter('complaint')
+        self.assertEqual(limiter.count(self.user.pk), 0)
+
+        Complaint.objects.filter(user=self.user).update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertTrue(reserve_complaint(self.user))
+        self.assertEqual(limiter.count(self.user.pk), 1)
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        for histogram in metrics.HISTOGRAMS:
+            histogram.reset()
+
+    @override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_SERVER_TIMING=True)
+    def test_sampled_request_reports_timings(self):
+        user = User.objects.create_user('sam', password='pass12345', is_staff=True)
+        Complaint.objects.create(user=user, title="Pothole", description="Deep pothole")
+        self.client.force_login(user)
+
+        timing = self.client.get(reverse('complaint_list'))['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('tpl;dur=', timing)
+
+        timing = self.client.post(reverse('post_complaint'), {'title': "Pothole", 'description': "Pothole"})['Server-Timing']
+        self.assertIn('spam;dur=', timing)
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('jansamadhan_request_duration_seconds_count{view="complaint_list",method="GET"} 1', body)
+        self.assertIn('jansamadhan_span_seconds_bucket{view="complaint_list",span="tpl",le="+Inf"} 1', body)
+
+    @override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_SERVER_TIMING=True)
+    def test_closed_to_the_public(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('home')))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        self.client.generic('BREW', reverse('home'))
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('jansamadhan_request_duration_seconds_count{view="home",method="other"} 1', body)
+
+    @override_settings(METRICS_SAMPLE_RATE=0.0, METRICS_TOKEN='secret')
+    def test_unsampled_request_and_token(self):
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('Server-Timing', response)
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        body = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('jansamadhan_request_duration_seconds_count{view="home",method="GET"} 1', body)
+        self.assertNotIn('jansamadhan_request_sql_queries_count{view="home"}', body)
+
+
+class QueryPlanTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        # raises CommandError if any hot query falls back to a full table scan
+        call_command('check_query_plans', stdout=StringIO())
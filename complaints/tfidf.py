@@ -0,0 +1,394 @@
+"""
+Character n-gram TF-IDF index over complaint descriptions.
+
+The index lives on disk as plain ``.npy`` arrays so every gunicorn worker
+memory-maps the same pages instead of rebuilding it at boot:
+
+    <SIMILARITY_INDEX_DIR>/
+        CURRENT         name of the live base generation
+        gen-000001/     base segment, feature-major (CSC) postings
+        delta.npz       rows added/removed since the base was built
+        lock            flock() target for writers
+
+Signals append to the small delta; each time it grows by another
+``COMPACT_AFTER`` rows a ``compact_similarity_index`` job is queued, and
+``run_worker`` merges it into a new base generation off the request path. IDF weights are frozen
+when a base is built and reused for delta rows until the next merge.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+NGRAM_SIZES = (3, 4)
+N_FEATURES = 1 << 18
+COMPACT_AFTER = 1000
+MAX_CANDIDATES = 500
+
+_BASE_ARRAYS = ('ids', 'indptr', 'rows', 'tf', 'weights', 'idf')
+
+
+# ================= FILE LOCK =================
+def _lock(fh):
+    # imported here: fcntl is POSIX-only, msvcrt Windows-only
+    if os.name == 'nt':
+        import msvcrt
+        fh.seek(0)
+        while True:
+            try:
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after ten seconds; keep waiting like flock()
+                continue
+    else:
+        import fcntl
+        fcntl.flock(fh, fcntl.LOCK_EX)
+
+
+def _unlock(fh):
+    if os.name == 'nt':
+        import msvcrt
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+# ================= VECTORIZING =================
+def features(text):
+    """Sorted hashed n-gram ids of ``text`` and their sublinear term frequencies."""
+    text = f" {' '.join((text or '').lower().split())} "
+    counts = {}
+
+    for n in NGRAM_SIZES:
+        for i in range(len(text) - n + 1):
+            feature = zlib.crc32(text[i:i + n].encode('utf-8')) & (N_FEATURES - 1)
+            counts[feature] = counts.get(feature, 0) + 1
+
+    ids = np.array(sorted(counts), dtype=np.int32)
+    tf = 1 + np.log(np.array([counts[f] for f in ids], dtype=np.float32))
+    return ids, tf.astype(np.float32)
+
+
+def _idf(df, n_docs):
+    return (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+
+
+def _empty_delta():
+    return {
+        'ids': np.empty(0, dtype=np.int64),
+        'indptr': np.zeros(1, dtype=np.int64),
+        'features': np.empty(0, dtype=np.int32),
+        'tf': np.empty(0, dtype=np.float32),
+        'deleted': np.empty(0, dtype=np.int64),
+    }
+
+
+def _delta_rows(delta):
+    return len(delta['ids']) + len(delta['deleted'])
+
+
+def _segments(starts, lengths):
+    """Flat positions covering the slices [start, start + length)."""
+    total = int(lengths.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    return np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+
+
+# ================= INDEX =================
+class TfidfIndex:
+    def __init__(self, path):
+        self.path = str(path)
+        self._snapshot = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    # ---------- files ----------
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _writing(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file('lock'), 'a+b') as fh:
+            _lock(fh)
+            try:
+                yield
+            finally:
+                _unlock(fh)
+
+    def _mtime(self, name):
+        try:
+            return os.stat(self._file(name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load_base(self):
+        try:
+            with open(self._file('CURRENT')) as fh:
+                generation = fh.read().strip()
+        except FileNotFoundError:
+            return None
+
+        folder = self._file(generation)
+        base = {name: np.load(os.path.join(folder, f'{name}.npy'), mmap_mode='r') for name in _BASE_ARRAYS}
+        base['generation'] = generation
+        return base
+
+    def _load_delta(self):
+        try:
+            with np.load(self._file('delta.npz')) as data:
+                return {key: data[key] for key in data.files}
+        except FileNotFoundError:
+            return _empty_delta()
+
+    def _save_delta(self, delta):
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.npz')
+        with os.fdopen(fd, 'wb') as fh:
+            np.savez(fh, **delta)
+        os.replace(tmp, self._file('delta.npz'))
+
+    def snapshot(self):
+        """Current (base, delta), reloaded only when another process changed them."""
+        stamp = (self._mtime('CURRENT'), self._mtime('delta.npz'))
+        with self._lock:
+            if self._snapshot is None or stamp != self._stamp:
+                self._snapshot = (self._load_base(), self._load_delta())
+                self._stamp = stamp
+            return self._snapshot
+
+    # ---------- queries ----------
+    def query(self, text, threshold=0.0, limit=MAX_CANDIDATES, candidates=None):
+        """
+        [(complaint_id, cosine)] above ``threshold``, best first. With
+        ``candidates``, only those complaint ids are ranked, so nothing
+        outside them can push one past ``limit``.
+        """
+        base, delta = self.snapshot()
+        q_features, q_tf = features(text)
+        if not len(q_features):
+            return []
+
+        idf = base['idf'] if base is not None else np.ones(N_FEATURES, dtype=np.float32)
+        q_weights = q_tf * idf[q_features]
+        q_weights /= np.linalg.norm(q_weights)
+
+        ids, scores = [], []
+
+        if base is not None and len(base['ids']):
+            starts = base['indptr'][q_features]
+            lengths = base['indptr'][q_features + 1] - starts
+            positions = _segments(starts, lengths)
+
+            base_scores = np.bincount(
+                base['rows'][positions],
+                weights=base['weights'][positions] * np.repeat(q_weights, lengths),
+                minlength=len(base['ids']),
+            )
+
+            if len(delta['deleted']):
+                # rows replaced or removed since the base was built
+                hit = np.searchsorted(base['ids'], delta['deleted'])
+                hit = hit[hit < len(base['ids'])]
+                hit = hit[np.isin(base['ids'][hit], delta['deleted'])]
+                base_scores[hit] = 0
+
+            ids.append(np.asarray(base['ids']))
+            scores.append(base_scores)
+
+        if len(delta['ids']):
+            dense_query = np.zeros(N_FEATURES, dtype=np.float32)
+            dense_query[q_features] = q_weights
+
+            row_of = np.repeat(np.arange(len(delta['ids'])), np.diff(delta['indptr']))
+            weights = delta['tf'] * idf[delta['features']]
+            norms = np.sqrt(np.bincount(row_of, weights=weights ** 2, minlength=len(delta['ids'])))
+            dots = np.bincount(row_of, weights=weights * dense_query[delta['features']], minlength=len(delta['ids']))
+
+            ids.append(delta['ids'])
+            scores.append(dots / np.maximum(norms, 1e-12))
+
+        if not ids:
+            return []
+
+        ids = np.concatenate(ids)
+        scores = np.concatenate(scores)
+        if candidates is not None:
+            scores[~np.isin(ids, np.asarray(candidates, dtype=np.int64))] = 0
+
+        keep = np.flatnonzero(scores > threshold)
+        keep = keep[np.argsort(-scores[keep], kind='stable')[:limit]]
+        return [(int(ids[i]), float(scores[i])) for i in keep]
+
+    # ---------- incremental updates ----------
+    def add(self, complaint_id, text):
+        """Index ``text`` for the complaint; True when the delta is due for ``compact()``."""
+        with self._writing():
+            before = self._load_delta()
+            delta = self._drop(dict(before), complaint_id)
+            f, tf = features(text)
+
+            delta['ids'] = np.append(delta['ids'], np.int64(complaint_id))
+            delta['indptr'] = np.append(delta['indptr'], delta['indptr'][-1] + len(f))
+            delta['features'] = np.concatenate([delta['features'], f])
+            delta['tf'] = np.concatenate([delta['tf'], tf])
+
+            return self._commit(before, delta)
+
+    def remove(self, complaint_id):
+        with self._writing():
+            before = self._load_delta()
+            return self._commit(before, self._drop(dict(before), complaint_id))
+
+    def _drop(self, delta, complaint_id):
+        """Remove a complaint from the delta and tombstone any base row for it."""
+        matches = np.flatnonzero(delta['ids'] == complaint_id)
+        if len(matches):
+            row = int(matches[0])
+            start, end = delta['indptr'][row], delta['indptr'][row + 1]
+            delta['ids'] = np.delete(delta['ids'], row)
+            delta['features'] = np.delete(delta['features'], np.s_[start:end])
+            delta['tf'] = np.delete(delta['tf'], np.s_[start:end])
+            delta['indptr'] = np.concatenate([delta['indptr'][:row + 1], delta['indptr'][row + 2:] - (end - start)])
+
+        base = self._load_base()
+        if base is not None and complaint_id not in delta['deleted']:
+            pos = np.searchsorted(base['ids'], complaint_id)
+            if pos < len(base['ids']) and base['ids'][pos] == complaint_id:
+                delta['deleted'] = np.append(delta['deleted'], np.int64(complaint_id))
+        return delta
+
+    def _commit(self, before, delta):
+        self._save_delta(delta)
+        # due each time the delta passes another multiple, so a lost job is asked for again
+        return _delta_rows(before) // COMPACT_AFTER < _delta_rows(delta) // COMPACT_AFTER
+
+    def compact(self):
+        """Merge the delta into a new base generation; the slow part, run by a background job."""
+        with self._writing():
+            delta = self._load_delta()
+            if _delta_rows(delta):
+                self._compact(delta)
+
+    # ---------- building ----------
+    def rebuild(self, rows):
+        """Replace the whole index with ``rows`` of (complaint_id, description)."""
+        ids, indptr, feats, tfs = [], [0], [], []
+        for complaint_id, text in rows:
+            f, tf = features(text)
+            ids.append(complaint_id)
+            feats.append(f)
+            tfs.append(tf)
+            indptr.append(indptr[-1] + len(f))
+
+        delta = _empty_delta()
+        if ids:
+            delta.update(
+                ids=np.array(ids, dtype=np.int64),
+                indptr=np.array(indptr, dtype=np.int64),
+                features=np.concatenate(feats),
+                tf=np.concatenate(tfs),
+            )
+
+        with self._writing():
+            self._compact(delta, keep_base=False)
+
+    def _compact(self, delta, keep_base=True):
+        """Merge base + delta into a fresh generation with recomputed IDF."""
+        base = self._load_base() if keep_base else None
+
+        row_ids = [delta['ids']]
+        row_of = [np.repeat(np.arange(len(delta['ids'])), np.diff(delta['indptr']))]
+        feats = [delta['features']]
+        tfs = [delta['tf']]
+
+        if base is not None and len(base['ids']):
+            base_ids = np.asarray(base['ids'])
+            alive = ~np.isin(base_ids, delta['deleted'])
+            new_row = np.cumsum(alive) - 1 + len(delta['ids'])
+
+            posting_feature = np.repeat(
+                np.arange(N_FEATURES, dtype=np.int32), np.diff(base['indptr'])
+            )
+            posting_row = np.asarray(base['rows'])
+            keep = alive[posting_row]
+
+            row_ids.append(base_ids[alive])
+            row_of.append(new_row[posting_row[keep]])
+            feats.append(posting_feature[keep])
+            tfs.append(np.asarray(base['tf'])[keep])
+
+        ids = np.concatenate(row_ids)
+        rows = np.concatenate(row_of)
+        feats = np.concatenate(feats).astype(np.int32)
+        tf = np.concatenate(tfs).astype(np.float32)
+
+        # rows ordered by complaint id so tombstones can be found with searchsorted
+        order = np.argsort(ids, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        ids = ids[order]
+        rows = rank[rows].astype(np.int32)
+
+        df = np.bincount(feats, minlength=N_FEATURES)
+        idf = _idf(df, len(ids))
+        weights = tf * idf[feats]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(ids)))
+        weights = (weights / np.maximum(norms[rows], 1e-12)).astype(np.float32)
+
+        postings = np.lexsort((rows, feats))
+        arrays = {
+            'ids': ids,
+            'indptr': np.concatenate([[0], np.cumsum(df)]).astype(np.int64),
+            'rows': rows[postings],
+            'tf': tf[postings],
+            'weights': weights[postings],
+            'idf': idf,
+        }
+
+        previous = base['generation'] if base is not None else self._current_generation()
+        number = int(previous.split('-')[1]) + 1 if previous else 1
+        generation = f'gen-{number:06d}'
+
+        staging = tempfile.mkdtemp(dir=self.path)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f'{name}.npy'), array)
+        os.rename(staging, self._file(generation))
+
+        fd, tmp = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(generation)
+        os.replace(tmp, self._file('CURRENT'))
+        self._save_delta(_empty_delta())
+
+        # open mmaps of older generations stay valid after unlinking
+        for name in os.listdir(self.path):
+            if name.startswith('gen-') and name != generation:
+                shutil.rmtree(self._file(name), ignore_errors=True)
+
+    def _current_generation(self):
+        try:
+            with open(self._file('CURRENT')) as fh:
+                return fh.read().strip()
+        except FileNotFoundError:
+            return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None or _index.path != str(settings.SIMILARITY_INDEX_DIR):
+            _index = TfidfIndex(settings.SIMILARITY_INDEX_DIR)
+        return _index
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, metrics, views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -10,10 +10,26 @@ urlpatterns = [
 
     path('post-complaint/', views.post_complaint, name='post_complaint'),
     path('complaints/', views.complaint_list, name='complaint_list'),
+    path('complaints/more/', views.complaint_list_more, name='complaint_list_more'),
 
     path('like/<int:complaint_id>/', views.toggle_like, name='toggle_like'),
     path('comment/<int:complaint_id>/', views.add_comment, name='add_comment'),
+    path('comments/<int:complaint_id>/', views.complaint_comments, name='complaint_comments'),
     path('delete/<int:complaint_id>/', views.delete_complaint, name='delete_complaint'),
     path('heatmap/', views.heatmap_view, name='heatmap'),
+    path('heatmap/tiles/', views.heatmap_tiles, name='heatmap_tiles'),
+    path('heatmap/points/', views.heatmap_points_feed, name='heatmap_points_feed'),
+
+    path('stats/', views.stats_view, name='stats'),
+    path('complaints/export/', views.export_complaints, name='export_complaints'),
+
+    path('api/v1/complaints/', api.complaints_page, name='api_complaints'),
+    path('api/v1/complaints/bulk/', api.complaints_bulk, name='api_complaints_bulk'),
+    path('api/v1/likes/bulk/', api.likes_bulk, name='api_likes_bulk'),
+    path('api/v1/search/', api.search_complaints, name='api_search'),
+    path('api/v1/stats/', api.stats_summary, name='api_stats'),
+
+    path('metrics/', metrics.metrics_view, name='metrics'),
+
     path('set-language/<str:lang_code>/', views.set_language_view, name='set_language'),
 ]
\ No newline at end of file
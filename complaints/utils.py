@@ -1,5 +1,13 @@
 from difflib import SequenceMatcher
-from .models import Complaint
+from django.conf import settings
+from django.db import transaction
+from . import stats, tfidf
+from .changes import mark_changed
+from .fingerprint import content_hash, simhash
+from .geo import cells_within, grid_cell, haversine_km
+from .metrics import timed
+from .minhash import bucket_keys, signature
+from .models import Complaint, SimilarityBucket
 
 
 def text_similarity(a, b):
@@ -8,25 +16,110 @@ def text_similarity(a, b):
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
 
-def find_similar_complaint(description, lat, lon, radius_km=1.0, threshold=0.7):
+@timed('similarity')
+def find_similar_complaint(description, lat, lon, radius_km=1.0, threshold=0.7, before_id=None):
     """
     Lightweight duplicate detection (Render-friendly)
+
+    Candidates must share an LSH bucket with the new description and lie in
+    a grid cell overlapping ``radius_km``; only those few rows are trimmed to
+    the exact circle and scored with SequenceMatcher.
+
+    ``before_id`` limits the search to complaints created before that one,
+    so a complaint that is already saved can be checked like a new one.
+
+    With ``SIMILARITY_BACKEND = "tfidf"`` the score is the TF-IDF cosine
+    instead (see tfidf.py).
     """
 
-    complaints = Complaint.objects.exclude(
-        latitude=None
-    ).exclude(
-        longitude=None
+    if settings.SIMILARITY_BACKEND == 'tfidf':
+        return _find_similar_tfidf(description, lat, lon, radius_km, threshold, before_id)
+
+    keys = bucket_keys(signature(description))
+    if not keys:
+        return None, 0
+
+    candidate_ids = SimilarityBucket.objects.filter(
+        bucket__in=keys
+    ).values('complaint_id')
+
+    complaints = Complaint.objects.filter(
+        id__in=candidate_ids,
+        grid_cell__in=cells_within(lat, lon, radius_km)
     )
+    if before_id is not None:
+        complaints = complaints.filter(id__lt=before_id)
+
+    complaints = complaints.only('id', 'description', 'latitude', 'longitude')
 
     best_match = None
     best_score = 0
 
     for comp in complaints:
+        if haversine_km(lat, lon, comp.latitude, comp.longitude) > radius_km:
+            continue
+
         score = text_similarity(description, comp.description)
 
         if score > threshold and score > best_score:
             best_match = comp
             best_score = score
 
-    return best_match, best_score
\ No newline at end of file
+    return best_match, best_score
+
+
+def _find_similar_tfidf(description, lat, lon, radius_km, threshold, before_id=None):
+    # the radius first: ranking city-wide and cutting at MAX_CANDIDATES could drop the neighbour
+    nearby = Complaint.objects.filter(grid_cell__in=cells_within(lat, lon, radius_km))
+    if before_id is not None:
+        nearby = nearby.filter(id__lt=before_id)
+    candidates = [
+        pk for pk, c_lat, c_lon in nearby.values_list('id', 'latitude', 'longitude')
+        if haversine_km(lat, lon, c_lat, c_lon) <= radius_km
+    ]
+    if not candidates:
+        return None, 0
+
+    ranked = tfidf.get_index().query(description, threshold, limit=1, candidates=candidates)
+    if not ranked:
+        return None, 0
+
+    best_id, best_score = ranked[0]
+    best_match = Complaint.objects.only('id', 'description', 'latitude', 'longitude').filter(pk=best_id).first()
+    if best_match is None:
+        # deleted since the index last saw it
+        return None, 0
+    return best_match, best_score
+
+
+def bulk_create_complaints(complaints, batch_size=2000):
+    """
+    bulk_create() skips Complaint.save() and signals, so fill in the
+    derived columns and LSH buckets here.
+    """
+    for comp in complaints:
+        comp.grid_cell = grid_cell(comp.latitude, comp.longitude)
+        comp.priority_score = (
+            comp.likes_count * Complaint.LIKE_WEIGHT +
+            comp.comments_count * Complaint.COMMENT_WEIGHT
+        )
+        comp.minhash = signature(comp.description)
+        comp.content_hash = content_hash(comp.description)
+        comp.simhash = simhash(comp.description)
+
+    # rows and their stats deltas commit together (see stats.rebuild)
+    with transaction.atomic():
+        created = Complaint.objects.bulk_create(complaints, batch_size=batch_size)
+
+        SimilarityBucket.objects.bulk_create(
+            [
+                SimilarityBucket(complaint_id=comp.id, bucket=key)
+                for comp in created
+                for key in bucket_keys(comp.minhash)
+            ],
+            batch_size=batch_size * 4,
+        )
+        stats.record(added=[stats.row(comp) for comp in created])
+    mark_changed()
+    return created
+
@@ -1,12 +1,30 @@
+import json
+import struct
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponseForbidden
-from django.db.models import F, ExpressionWrapper, IntegerField
-
+from django.http import Http404, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import condition, require_GET
+from django.db import transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+
+from . import categories, counters, exports, images, jobs, likes, search, stats
 from .forms import RegisterForm, LoginForm, ComplaintForm, CommentForm
-from .models import Complaint, Like
+from .changes import last_changed, last_changed_ns
+from .heatmap import heat_points, parse_bbox
+from .models import Complaint, Comment
+from .pagination import PAGE_SIZE, InvalidCursor, apriority_page, priority_page
 from .utils import find_similar_complaint
 
 from .spam_guard import (
@@ -14,12 +32,15 @@ from .spam_guard import (
     is_comment_rate_limited,
     contains_bad_words,
     is_duplicate_cooldown,
+    reserve_complaint,
+    reserve_comment,
 )
 
 
 # ================= HOME =================
 def home(request):
-    return render(request, 'home.html')
+    # from the cached summary tables, not a COUNT over complaints
+    return render(request, 'home.html', {'stats': stats.summary()})
 
 
 # ================= REGISTER =================
@@ -61,6 +82,14 @@ def logout_view(request):
 @login_required
 def post_complaint(request):
     if request.method == 'POST':
+        # 🚨 rate limit first: a cache lookup, before the form touches the DB
+        if is_complaint_rate_limited(request.user):
+            messages.error(
+                request,
+                "🚫 You are posting complaints too frequently. Please try later."
+            )
+            return redirect('post_complaint')
+
         form = ComplaintForm(request.POST, request.FILES)
 
         if form.is_valid():
@@ -70,14 +99,6 @@ def post_complaint(request):
 
             # 🚨 ================= SPAM PROTECTION =================
 
-            # rate limit
-            if is_complaint_rate_limited(request.user):
-                messages.error(
-                    request,
-                    "🚫 You are posting complaints too frequently. Please try later."
-                )
-                return redirect('post_complaint')
-
             # bad language
             if contains_bad_words(new_description):
                 messages.error(
@@ -97,8 +118,9 @@ def post_complaint(request):
             # 🤖 ================= SMART DUPLICATE AI =================
             similar_complaint = None
             score = 0
+            check_now = not settings.DUPLICATE_CHECK_ASYNC
 
-            if new_description and new_lat is not None and new_lon is not None:
+            if check_now and new_description and new_lat is not None and new_lon is not None:
                 similar_complaint, score = find_similar_complaint(
                     new_description,
                     new_lat,
@@ -114,7 +136,29 @@ def post_complaint(request):
             # ✅ save complaint
             complaint = form.save(commit=False)
             complaint.user = request.user
-            complaint.save()
+            if similar_complaint:
+                complaint.similar_to = similar_complaint
+                complaint.similarity_score = score
+
+            # the limit is checked and recorded with the save, so parallel posts cannot all pass
+            with transaction.atomic():
+                allowed = reserve_complaint(request.user)
+                if allowed:
+                    complaint.save()
+            if not allowed:
+                messages.error(
+                    request,
+                    "🚫 You are posting complaints too frequently. Please try later."
+                )
+                return redirect('post_complaint')
+
+            # ⏳ otherwise run_worker attaches the result later
+            if not check_now:
+                jobs.enqueue('detect_duplicate', complaint_id=complaint.id)
+
+            # 🖼 thumbnails/WebP are encoded in the background
+            if complaint.image:
+                images.schedule(complaint.id)
 
             messages.success(request, "Complaint posted successfully!")
             return redirect('complaint_list')
@@ -125,58 +169,153 @@ def post_complaint(request):
 
 
 # ================= LIST WITH PRIORITY =================
+LATEST_COMMENTS = 3
+
+
+def complaint_cards_queryset():
+    """
+    Everything a complaint card renders, in a fixed number of queries:
+    the user is joined, categories come from the in-memory cache
+    (see _prepare_cards) and only the newest LATEST_COMMENTS comments
+    per complaint are prefetched (ROW_NUMBER() window, one query per page).
+    """
+    return Complaint.objects.select_related(
+        'user'
+    ).prefetch_related(
+        Prefetch('comments', queryset=latest_comments_queryset(), to_attr='latest_comments')
+    ).defer('minhash')
+
+
+def latest_comments_queryset():
+    return Comment.objects.select_related('user').annotate(
+        recent_rank=Window(
+            RowNumber(),
+            partition_by=F('complaint_id'),
+            order_by=[F('created_at').desc(), F('id').desc()]
+        )
+    ).filter(
+        recent_rank__lte=LATEST_COMMENTS
+    ).order_by('created_at', 'id')
+
+
+def _prepare_cards(complaints, user=None):
+    # like buttons sit outside the cached fragments; one query for the whole page
+    liked = likes.liked_ids(user, [c.id for c in complaints]) if user else set()
+    for c in complaints:
+        c.more_comments = max(0, c.comments_count - len(c.latest_comments))
+        c.liked = c.id in liked
+    categories.attach(complaints)
+    return complaints
+
+
 def complaint_list(request):
-    complaints = Complaint.objects.annotate(
-        priority_score=ExpressionWrapper(
-            (F('likes_count') * 3) +
-            (F('comments_count') * 2),
-            output_field=IntegerField()
+    query = request.GET.get('q', '').strip()
+
+    if query:
+        # best matches only; the JSON API pages further (api.search_complaints)
+        ids = search.search(query, PAGE_SIZE)
+        by_id = complaint_cards_queryset().in_bulk(ids)
+        complaints, next_cursor = [by_id[pk] for pk in ids if pk in by_id], None
+    else:
+        try:
+            complaints, next_cursor = priority_page(
+                complaint_cards_queryset(),
+                request.GET.get('cursor')
+            )
+        except InvalidCursor:
+            complaints, next_cursor = priority_page(complaint_cards_queryset())
+
+    _prepare_cards(complaints, request.user)
+
+    return render(request, 'complaint_list.html', {
+        'complaints': complaints,
+        'next_cursor': next_cursor,
+        'query': query,
+    })
+
+
+# ================= LIST: LOAD MORE (JSON) =================
+def _render_cards(request, complaints):
+    _prepare_cards(complaints, request.user)
+    return render_to_string(
+        'complaint_cards.html',
+        {'complaints': complaints},
+        request=request
+    )
+
+
+async def complaint_list_more(request):
+    # async: under ASGI a slow client or query does not hold a worker thread
+    try:
+        complaints, next_cursor = await apriority_page(
+            complaint_cards_queryset(),
+            request.GET.get('cursor')
         )
-    ).order_by('-priority_score', '-created_at')
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    # templates read the session/user lazily, which is sync-only
+    html = await sync_to_async(_render_cards)(request, complaints)
+
+    return JsonResponse({
+        'html': html,
+        'count': len(complaints),
+        'next_cursor': next_cursor,
+    })
+
+
+# ================= ALL COMMENTS OF ONE COMPLAINT (JSON) =================
+def complaint_comments(request, complaint_id):
+    comments = Comment.objects.filter(
+        complaint_id=complaint_id
+    ).order_by('created_at', 'id').values_list('user__username', 'text')
 
-    return render(request, 'complaint_list.html', {'complaints': complaints})
+    return JsonResponse({
+        'comments': [
+            {'user': username, 'text': text}
+            for username, text in comments
+        ]
+    })
 
 
 # ================= LIKE =================
 @login_required
-def toggle_like(request, complaint_id):
-    complaint = get_object_or_404(Complaint, id=complaint_id)
+async def toggle_like(request, complaint_id):
+    user = await request.auser()
 
-    like, created = Like.objects.get_or_create(
-        user=request.user,
-        complaint=complaint
-    )
+    # the same locked path as the bulk API, so a double click cannot count twice
+    toggled = await sync_to_async(likes.toggle_many)(user, [complaint_id])
+    if complaint_id not in toggled:
+        raise Http404("No Complaint matches the given query.")
 
-    if not created:
-        like.delete()
-        complaint.likes_count = max(0, complaint.likes_count - 1)
-    else:
-        complaint.likes_count += 1
-
-    complaint.save()
+    likes_count = await Complaint.objects.values_list(
+        'likes_count', flat=True
+    ).aget(id=complaint_id)
 
-    return JsonResponse({'likes_count': complaint.likes_count})
+    return JsonResponse({
+        'liked': toggled[complaint_id],
+        'likes_count': max(0, likes_count + counters.pending(complaint_id)[0])
+    })
 
 
 # ================= COMMENT (WITH SPAM GUARD) =================
 @login_required
 def add_comment(request, complaint_id):
-    complaint = get_object_or_404(Complaint, id=complaint_id)
-
     if request.method == 'POST':
+        # 🚨 rate limit (cache only, checked before any query)
+        if is_comment_rate_limited(request.user):
+            messages.error(
+                request,
+                "🚫 You are commenting too frequently."
+            )
+            return redirect('complaint_list')
+
+        complaint = get_object_or_404(Complaint.objects.only('id'), id=complaint_id)
         form = CommentForm(request.POST)
 
         if form.is_valid():
             text = form.cleaned_data.get('text')
 
-            # 🚨 rate limit
-            if is_comment_rate_limited(request.user):
-                messages.error(
-                    request,
-                    "🚫 You are commenting too frequently."
-                )
-                return redirect('complaint_list')
-
             # 🚨 bad words
             if contains_bad_words(text):
                 messages.error(
@@ -189,10 +328,19 @@ def add_comment(request, complaint_id):
             comment = form.save(commit=False)
             comment.user = request.user
             comment.complaint = complaint
-            comment.save()
 
-            complaint.comments_count += 1
-            complaint.save()
+            with transaction.atomic():
+                allowed = reserve_comment(request.user)
+                if allowed:
+                    comment.save()
+            if not allowed:
+                messages.error(
+                    request,
+                    "🚫 You are commenting too frequently."
+                )
+                return redirect('complaint_list')
+
+            counters.bump(complaint.id, comments=1)
 
     return redirect('complaint_list')
 
@@ -213,24 +361,179 @@ def delete_complaint(request, complaint_id):
 
 
 # ================= HEATMAP =================
-def heatmap_view(request):
-    complaints = Complaint.objects.exclude(
+async def heatmap_view(request):
+    # points are fetched per viewport from heatmap_tiles
+    return await sync_to_async(render)(request, 'heatmap.html', {
+        'statuses': Complaint.STATUS_CHOICES,
+        'categories': await categories.aget_categories(),
+    })
+
+
+# ================= HEATMAP TILES (JSON) =================
+def _heatmap_filters(params):
+    filters = {}
+
+    status = params.get('status')
+    if status:
+        if status not in dict(Complaint.STATUS_CHOICES):
+            raise ValueError("Unknown status")
+        filters['status'] = status
+
+    category = params.get('category')
+    if category:
+        filters['category_id'] = int(category)
+
+    # datetime bounds instead of created_at__date: no per-row date conversion, indexable
+    for param, lookup, offset in (('since', 'created_at__gte', 0), ('until', 'created_at__lt', 1)):
+        value = params.get(param)
+        if value:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f"Invalid {param} date")
+            start = datetime.combine(day + timedelta(days=offset), datetime.min.time())
+            filters[lookup] = timezone.make_aware(start)
+
+    return filters
+
+
+def heatmap_tiles(request):
+    try:
+        zoom = int(request.GET.get('zoom', 13))
+        bbox = parse_bbox(request.GET['bbox'])
+        filters = _heatmap_filters(request.GET)
+        points = heat_points(zoom, bbox, filters)
+    except (KeyError, ValueError) as exc:
+        return JsonResponse({'error': str(exc) or 'Invalid request'}, status=400)
+
+    return JsonResponse({'points': points})
+
+# ================= RAW POINT FEED (ANALYSTS) =================
+POINT_RECORD = struct.Struct('<ffIB')   # lat, lon, created_at (unix s), status index
+STATUS_CODES = {value: i for i, (value, _) in enumerate(Complaint.STATUS_CHOICES)}
+FEED_CHUNK = 2000
+
+
+def _feed_format(request):
+    return 'bin' if request.GET.get('format') == 'bin' else 'ndjson'
+
+
+def _feed_etag(request):
+    return f'"{last_changed_ns()}-{_feed_format(request)}-{request.GET.urlencode()}"'
+
+
+def _feed_last_modified(request):
+    return last_changed()
+
+
+def _ndjson_points(rows):
+    for lat, lon, status, created_at in rows:
+        yield json.dumps([lat, lon, status, created_at.isoformat()]) + '\n'
+
+
+def _binary_points(rows):
+    buf = bytearray()
+    for lat, lon, status, created_at in rows:
+        buf += POINT_RECORD.pack(lat, lon, int(created_at.timestamp()), STATUS_CODES.get(status, 255))
+        if len(buf) >= POINT_RECORD.size * FEED_CHUNK:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+@require_GET
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def heatmap_points_feed(request):
+    """
+    Every geotagged complaint as ``[lat, lon, status, created_at]`` NDJSON
+    lines, or with ``?format=bin`` as packed little-endian records
+    (float32 lat, float32 lon, uint32 created_at, uint8 status index).
+    Accepts the heatmap filters. Unchanged data answers 304 from the
+    ETag/Last-Modified stamp alone.
+    """
+    try:
+        filters = _heatmap_filters(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    rows = Complaint.objects.exclude(
         latitude=None
     ).exclude(
         longitude=None
-    )
+    ).filter(
+        **filters
+    ).order_by('id').values_list(
+        'latitude', 'longitude', 'status', 'created_at'
+    ).iterator(chunk_size=FEED_CHUNK)
+
+    if _feed_format(request) == 'bin':
+        response = StreamingHttpResponse(_binary_points(rows), content_type='application/octet-stream')
+        response['X-Record-Format'] = 'lat:float32,lon:float32,created_at:uint32,status:uint8'
+        response['X-Status-Codes'] = ','.join(STATUS_CODES)
+    else:
+        response = StreamingHttpResponse(_ndjson_points(rows), content_type='application/x-ndjson')
+
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+# ================= STATS =================
+def _duration(hours):
+    if hours is None:
+        return None
+    return f"{hours / 24:.1f} days" if hours >= 48 else f"{hours:.1f} hours"
+
+
+def stats_view(request):
+    """Counts by status, category and day plus the median resolution time, from stats.py."""
+    try:
+        category_id, since, until = stats.parse_filters(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    summary = stats.summary(category_id, since, until)
+    names = {c.pk: c.name for c in categories.get_categories()}
+    statuses = [value for value, _ in Complaint.STATUS_CHOICES]
+
+    return render(request, 'stats.html', {
+        'summary': summary,
+        'median_resolution': _duration(summary['median_resolution_hours']),
+        'statuses': Complaint.STATUS_CHOICES,
+        'status_totals': [(label, summary['by_status'][value]) for value, label in Complaint.STATUS_CHOICES],
+        'categories': categories.get_categories(),
+        'category_rows': [
+            (names.get(cat, "Uncategorised"), [counts[s] for s in statuses], sum(counts.values()))
+            for cat, counts in summary['by_category'].items()
+        ],
+        'daily_rows': [(day['day'], [day[s] for s in statuses]) for day in reversed(summary['daily'])],
+        'filters': {'category': category_id, 'since': since, 'until': until},
+    })
 
-    heat_data = [
-        [c.latitude, c.longitude]
-        for c in complaints
-    ]
 
-    return render(request, 'heatmap.html', {
-        'heat_data': heat_data
-    })
+# ================= EXPORT (WARD REPORTS) =================
+@staff_member_required
+@require_GET
+def export_complaints(request):
+    """
+    Download matching complaints as CSV (or ``?format=ndjson``), streamed
+    in chunks like ``manage.py export_complaints``. Accepts the heatmap
+    filters: status, category, since, until.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return JsonResponse({'error': 'Unknown format'}, status=400)
+    try:
+        filters = _heatmap_filters(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    name = '-'.join(['complaints', *filter(None, (request.GET.get('since'), request.GET.get('until')))])
+    response = StreamingHttpResponse(exports.export_chunks(fmt, filters), content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
 
 from django.utils import translation
-from django.conf import settings
 
 
 def set_language_view(request, lang_code):
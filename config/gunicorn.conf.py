@@ -0,0 +1,27 @@
+"""
+gunicorn settings: ``gunicorn -c config/gunicorn.conf.py``
+
+SERVER_PROFILE=wsgi (default): sync workers, one request per worker at a time.
+SERVER_PROFILE=asgi: uvicorn workers running config.asgi; the async views
+(load-more list, heatmap page, like toggle) wait on the database and slow
+clients without blocking the worker, so one process serves many
+concurrent mobile clients.
+"""
+import multiprocessing
+import os
+
+SERVER_PROFILE = os.environ.get("SERVER_PROFILE", "wsgi")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count() * 2 + 1)))
+timeout = 30
+graceful_timeout = 20
+keepalive = 5
+accesslog = '-'
+
+if SERVER_PROFILE == "asgi":
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'sync'
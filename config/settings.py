@@ -34,6 +34,9 @@ INSTALLED_APPS = [
 
 # ================= MIDDLEWARE =================
 MIDDLEWARE = [
+    # first, so its timings cover every other middleware
+    'complaints.metrics.MetricsMiddleware',
+
     'django.middleware.security.SecurityMiddleware',
 
     # WhiteNoise (safe for both)
@@ -53,7 +56,8 @@ ROOT_URLCONF = 'config.urls'
 # ================= TEMPLATES =================
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # the stock backend with render timing (see complaints/metrics.py)
+        'BACKEND': 'complaints.metrics.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -69,12 +73,61 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # ================= DATABASE =================
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default) or postgres
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+# wsgi or asgi, see config/gunicorn.conf.py
+SERVER_PROFILE = os.environ.get("SERVER_PROFILE", "wsgi")
+
+if DB_ENGINE == "postgres":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("DB_NAME", "jansamadhan"),
+            'USER': os.environ.get("DB_USER", "postgres"),
+            'PASSWORD': os.environ.get("DB_PASSWORD", ""),
+            'HOST': os.environ.get("DB_HOST", "localhost"),
+            'PORT': os.environ.get("DB_PORT", "5432"),
+            # keep connections open between requests, and check them before reuse;
+            # not under ASGI, where every sync_to_async thread would keep its own
+            'CONN_MAX_AGE': 0 if SERVER_PROFILE == "asgi" else int(os.environ.get("DB_CONN_MAX_AGE", "300")),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
     }
-}
+
+    # Django's own pool (psycopg 3 with the pool extra); use instead of CONN_MAX_AGE
+    if os.environ.get("DB_POOL", "False") == "True":
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get("DB_POOL_MIN", "2")),
+            'max_size': int(os.environ.get("DB_POOL_MAX", "10")),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("SQLITE_PATH", str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {},
+        }
+    }
+
+    # WAL lets readers run alongside the single writer; BEGIN IMMEDIATE takes the
+    # write lock up front, so a transaction waits for it instead of failing with
+    # "database is locked" when it tries to upgrade a read lock
+    if os.environ.get("SQLITE_TUNING", "True") == "True":
+        DATABASES['default']['OPTIONS'] = {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,   # busy_timeout, seconds
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA cache_size=-65536;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        }
 
 # ================= PASSWORD VALIDATION =================
 AUTH_PASSWORD_VALIDATORS = [
@@ -110,6 +163,94 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# ================= CACHE =================
+# local memory by default; CACHE_DIR switches to a file cache shared by all workers
+if os.environ.get("CACHE_DIR"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ["CACHE_DIR"],
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'jansamadhan',
+            # room for the card fragments (3 keys per complaint) and heatmap tiles
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
+# mtime = when complaints last changed; shared by all workers (see complaints/changes.py)
+CHANGE_STAMP_FILE = os.environ.get("CHANGE_STAMP_FILE", str(BASE_DIR / 'var' / 'complaints.stamp'))
+# same for categories, which every process keeps in memory (see complaints/categories.py)
+CATEGORY_STAMP_FILE = os.environ.get("CATEGORY_STAMP_FILE", str(BASE_DIR / 'var' / 'categories.stamp'))
+
+# ================= CARD FRAGMENT CACHE =================
+# rendered complaint cards (see complaints/fragments.py); versions live in the complaint
+# row, so a per-process cache never serves a stale card, it only hits less often
+FRAGMENT_CACHE = 'default'
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# ================= RATE LIMITS =================
+# algorithm: "sliding_window" or "token_bucket" (see complaints/ratelimit.py).
+# Unless the cache is shared with atomic increments (memcached, Redis), posts are
+# also counted in the database, so the limit holds across workers and restarts.
+RATE_LIMIT_CACHE = os.environ.get("RATE_LIMIT_CACHE", "default")
+RATE_LIMITS = {
+    'complaint': {'limit': 3, 'period': 60 * 60, 'algorithm': 'sliding_window'},
+    'comment': {'limit': 10, 'period': 60 * 60, 'algorithm': 'sliding_window'},
+}
+
+# ================= BAD WORDS =================
+# one word per line; the BadWord table (admin) adds more. Reloaded when either changes.
+BAD_WORDS_FILE = Path(os.environ.get("BAD_WORDS_FILE", BASE_DIR / 'complaints' / 'data' / 'bad_words.txt'))
+BAD_WORDS_RELOAD_SECONDS = 5
+
+# ================= DUPLICATE DETECTION =================
+# "minhash" (LSH buckets in the database) or "tfidf" (NumPy index on disk)
+SIMILARITY_BACKEND = os.environ.get("SIMILARITY_BACKEND", "minhash")
+SIMILARITY_INDEX_DIR = Path(os.environ.get("SIMILARITY_INDEX_DIR", BASE_DIR / 'var' / 'tfidf'))
+
+# ================= LIKE / COMMENT COUNTERS =================
+# buffer counter deltas in-process and write them in batches (see complaints/counters.py)
+COUNTER_WRITE_BEHIND = os.environ.get("COUNTER_WRITE_BEHIND", "False") == "True"
+COUNTER_FLUSH_INTERVAL = 5   # seconds
+COUNTER_FLUSH_SIZE = 100     # buffered events
+
+# ================= IMAGE DERIVATIVES =================
+# threads encoding thumbnails after upload; 0 = inline, after the request's transaction commits
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "2"))
+
+# ================= BACKGROUND JOBS =================
+# run_worker leases a job for this long; an unfinished job is then retried elsewhere
+JOB_VISIBILITY_TIMEOUT = 300   # seconds
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 30         # seconds, doubled on each retry
+# check new complaints for nearby duplicates in run_worker instead of in the request
+DUPLICATE_CHECK_ASYNC = os.environ.get("DUPLICATE_CHECK_ASYNC", "False") == "True"
+
+# ================= SEARCH =================
+# how much priority_score lifts a match: relevance * (1 + weight * ln(1 + priority_score))
+SEARCH_PRIORITY_WEIGHT = 0.1
+# newest matches that are ranked; results stop there (keeps common words cheap)
+SEARCH_CANDIDATES = 1000
+
+# ================= METRICS =================
+# share of requests whose SQL, template and span timings are recorded;
+# every request is counted in the per-view duration histogram
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", "0.05"))
+# send the sampled timings back to staff as a Server-Timing header
+METRICS_SERVER_TIMING = os.environ.get("METRICS_SERVER_TIMING", "False") == "True"
+# /metrics/ is for staff, or scrapers sending "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# ================= DASHBOARD STATS =================
+# /stats/ reads the summary tables (see complaints/stats.py); any complaint change invalidates the cache
+STATS_CACHE_SECONDS = 300
+
 # ================= AUTH =================
 LOGIN_URL = 'login'
 